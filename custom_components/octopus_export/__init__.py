@@ -1,46 +1,124 @@
 """The Octopus Agile integration."""
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta, timezone
-
-import async_timeout
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
+from homeassistant.const import CONF_API_KEY, Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-
-from .const import CONF_REGION, DOMAIN, LOGGER
-from .octopus_api import AgileRates, AgileTariff, ProductService
-
-_PLATFORMS: list[Platform] = [Platform.SENSOR]
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+
+from .catalogue import async_get_catalogue
+from .client import async_get_api_client
+from .const import (
+    CONF_METER_SERIAL,
+    CONF_MPAN,
+    CONF_REGION,
+    CONF_SHARED_REFRESH,
+    DOMAIN,
+)
+from .coordinator import OctopusTariffUpdateCoordinator
+from .octopus_api import AgileTariff, ExportMeter, get_start_of_current_interval
+from .services import async_setup_services
+from .storage import TariffCache
+
+_PLATFORMS: list[Platform] = [
+    Platform.BINARY_SENSOR,
+    Platform.CALENDAR,
+    Platform.SENSOR,
+]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Octopus Agile integration."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Octopus Agile from a config entry."""
-
-    session = async_get_clientsession(hass)
-    product_svc = ProductService(session)
-
-    try:
-        product = await product_svc.async_get_export_product()
-
-        product_code = product.code
-        region_code = entry.data.get(CONF_REGION)
-        tariff_code = product.tariff_codes[region_code]
-        tariff = AgileTariff(session, product_code, tariff_code)
-
-        coordinator = OctopusTariffUpdateCoordinator(hass, tariff)
-        await coordinator.async_config_entry_first_refresh()
+    """
+    Set up Octopus Agile from a config entry.
+
+    Setup never waits for the API. The platforms are set up straight away from any
+    rates saved by a previous run, or with no rates at all, and the product, rates
+    and earnings are then brought up to date in the background.
+    """
+    client = async_get_api_client(hass)
+    cache = TariffCache(hass, entry.entry_id)
+    region_code = entry.data[CONF_REGION]
+    coordinator = OctopusTariffUpdateCoordinator(hass, entry, cache)
+    refresh = True
+
+    cached = await cache.async_load(region_code)
+    if cached is not None:
+        paired = None
+        product_checked = cached.product_checked
+        if coordinator.with_import:
+            if cached.import_product_code and cached.import_tariff_code:
+                paired = AgileTariff(
+                    client, cached.import_product_code, cached.import_tariff_code
+                )
+            else:
+                # Find the import tariff as soon as the first refresh runs
+                product_checked = None
+        coordinator.tariff = AgileTariff(
+            client, cached.product_code, cached.tariff_code, paired
+        )
+        coordinator.async_restore(
+            cached.rates,
+            product_checked,
+            cached.import_rates if paired is not None else None,
+        )
+    else:
+        catalogue = async_get_catalogue(hass)
+        product = catalogue.async_get_cached_product(coordinator.with_import)
+        if product is not None:
+            tariff_code = product.tariff_codes[region_code]
+            coordinator.tariff = AgileTariff.for_region(
+                client, product, region_code, coordinator.with_import
+            )
+            coordinator.product_checked = catalogue.product_fetched
+
+            # Use any rates just fetched by the config flow, rather than asking again
+            seeded = catalogue.async_pop_rates(tariff_code)
+            if seeded is not None and seeded.get(get_start_of_current_interval()):
+                await coordinator.async_seed(seeded)
+                # Only export rates are seeded, so any import rates are still needed
+                refresh = coordinator.tariff.paired is not None
+
+    if entry.options.get(CONF_SHARED_REFRESH, False):
+        # pylint: disable-next=import-outside-toplevel
+        from .hub import async_get_hub
+
+        async_get_hub(hass).async_add(coordinator)
+
+    if all(
+        entry.options.get(key) for key in (CONF_MPAN, CONF_METER_SERIAL, CONF_API_KEY)
+    ):
+        # Earnings are optional, so their module is only loaded when configured
+        # pylint: disable-next=import-outside-toplevel
+        from .earnings import EarningsCoordinator
+
+        meter = ExportMeter(
+            client,
+            entry.options[CONF_MPAN],
+            entry.options[CONF_METER_SERIAL],
+            entry.options[CONF_API_KEY],
+        )
+        coordinator.earnings = EarningsCoordinator(hass, meter, coordinator, cache)
+        await coordinator.earnings.async_load()
 
-        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
-        await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
 
-        entry.async_on_unload(entry.add_update_listener(async_reload_entry))
-        return True
-    except Exception as ex:  # pylint: disable=broad-except
-        raise ConfigEntryNotReady from ex
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_create_background_task(
+        hass,
+        coordinator.async_start(refresh),
+        f"{DOMAIN} start {entry.entry_id}",
+    )
+    return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -49,94 +127,21 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry, _PLATFORMS
     )
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN].pop(
+            entry.entry_id
+        )
+        if coordinator.hub is not None:
+            coordinator.hub.async_remove(coordinator)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached tariff data when a config entry is deleted."""
+    await TariffCache(hass, entry.entry_id).async_remove()
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
     await async_setup_entry(hass, entry)
-
-
-class OctopusTariffUpdateCoordinator(DataUpdateCoordinator[AgileRates]):
-    """Update coordinator that enables efficient batched updates to all entities associated with an inverter."""
-
-    rates: AgileRates = {}
-
-    def __init__(self, hass: HomeAssistant, tariff: AgileTariff) -> None:
-        """Initialize my coordinator."""
-        super().__init__(
-            hass,
-            LOGGER,
-            name="Agile Tariff",
-            update_interval=timedelta(seconds=900),
-        )
-        self.tariff = tariff
-
-    async def _async_update_data(self) -> AgileRates:
-        """Fetch data from API endpoint.
-
-        This is the place to pre-process the data to lookup tables
-        so entities can quickly look up their data.
-        """
-        try:
-            async with async_timeout.timeout(10):
-                raw_data = await self.tariff.fetch_data()
-                self.rates = dict(sorted(raw_data.items()))
-                return self.rates
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
-
-    @property
-    def rates_today(self) -> AgileRates:
-        """
-        Get today's rates in the current timezone.
-
-        The dictionary keys reflect the start of the agile pricing slot, e.g. '18:30'.
-        """
-        today = datetime.now().date()
-        return {
-            self._local_time_from_utc_timestamp(key): value
-            for (key, value) in filter(
-                lambda entry: self._is_date(entry[0], today),
-                self.rates.items(),
-            )
-        }
-
-    @property
-    def rates_tomorrow(self) -> AgileRates:
-        """
-        Get tomorrow's rates in the current timezone.
-
-        The dictionary keys reflect the start of the agile pricing slot, e.g. '18:30'.
-        """
-        today = datetime.now().date()
-        tomorrow = today + timedelta(days=1)
-        return {
-            self._local_time_from_utc_timestamp(key): value
-            for (key, value) in filter(
-                lambda entry: self._is_date(entry[0], tomorrow),
-                self.rates.items(),
-            )
-        }
-
-    def _is_date(self, timestamp: str, date_to_match: date) -> bool:
-        """Check whether the timestamp occurs on the date to be matched."""
-        parsed_date = (
-            datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
-            .replace(tzinfo=timezone.utc)
-            .astimezone()
-            .date()
-        )
-        return parsed_date == date_to_match
-
-    def _local_time_from_utc_timestamp(self, timestamp: str) -> str:
-        """Get the local HH:mm representation of a UTC timestamp."""
-        return (
-            datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
-            .replace(tzinfo=timezone.utc)
-            .astimezone()
-            .strftime("%H:%M")
-        )
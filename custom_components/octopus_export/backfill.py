@@ -0,0 +1,96 @@
+"""Backfilling of rate history into long-term statistics."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, LOGGER
+from .octopus_api import AgileTariff
+from .rate_series import SLOT_SECONDS, RateSeries, slot_of, slot_start
+from .storage import BackfillCheckpoint, TariffCache
+
+# Statistics are hourly, so each hour combines two slots
+_SLOTS_PER_HOUR = 3600 // SLOT_SECONDS
+
+
+def statistic_id(region_code: str) -> str:
+    """Get the id of the external statistic holding a region's rate history."""
+    return f"{DOMAIN}:agile_export_rate_{region_code.lower()}"
+
+
+def hourly_statistics(rates: RateSeries) -> list[dict[str, Any]]:
+    """Summarise rates as the mean, min and max for each hour with any rates."""
+    by_hour: dict[int, list[float]] = {}
+    for slot, value in rates.items():
+        by_hour.setdefault(slot // _SLOTS_PER_HOUR, []).append(value)
+
+    return [
+        {
+            "start": slot_start(hour * _SLOTS_PER_HOUR),
+            "mean": round(sum(values) / len(values), 5),
+            "min": min(values),
+            "max": max(values),
+        }
+        for hour, values in sorted(by_hour.items())
+    ]
+
+
+async def async_backfill_statistics(
+    hass: HomeAssistant,
+    tariff: AgileTariff,
+    cache: TariffCache,
+    region_code: str,
+    start: datetime,
+    end: datetime,
+) -> None:
+    """
+    Import the rate history for a period into long-term statistics.
+
+    History is fetched a week at a time, and each week is imported as its own batch
+    before the next is fetched, so memory use doesn't grow with the period. After
+    each batch, progress is checkpointed in the cache, so that repeating a backfill
+    that was interrupted resumes where it stopped.
+    """
+    # Start on an hour boundary, so that no hour is split between batches
+    start = slot_start(slot_of(start) // _SLOTS_PER_HOUR * _SLOTS_PER_HOUR)
+
+    checkpoint = await cache.async_load_checkpoint()
+    resume_from = start
+    if (
+        checkpoint is not None
+        and checkpoint.start == start
+        and checkpoint.end == end
+        and start < checkpoint.until
+    ):
+        resume_from = checkpoint.until
+        LOGGER.debug("Resuming backfill from %s", resume_from)
+
+    metadata = {
+        "has_mean": True,
+        "has_sum": False,
+        "name": f"Agile export rate {region_code}",
+        "source": DOMAIN,
+        "statistic_id": statistic_id(region_code),
+        "unit_of_measurement": "£/kWh",
+    }
+
+    async for until, rates in tariff.iter_history(resume_from, end):
+        if statistics := hourly_statistics(rates):
+            _import_statistics(hass, metadata, statistics)
+            LOGGER.debug("Imported %d hours of rate history", len(statistics))
+        await cache.async_save_checkpoint(BackfillCheckpoint(start, end, until))
+
+
+def _import_statistics(
+    hass: HomeAssistant, metadata: dict[str, Any], statistics: list[dict[str, Any]]
+) -> None:
+    """Queue a batch of statistics for import by the recorder."""
+    # The recorder is only needed when a backfill is requested
+    # pylint: disable-next=import-outside-toplevel
+    from homeassistant.components.recorder.statistics import (
+        async_add_external_statistics,
+    )
+
+    async_add_external_statistics(hass, metadata, statistics)
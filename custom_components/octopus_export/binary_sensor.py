@@ -0,0 +1,208 @@
+"""Home Assistant binary sensor descriptions."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_REGION, CONF_THRESHOLDS, CONF_TOP_SLOTS, DOMAIN
+from .coordinator import OctopusTariffUpdateCoordinator
+from .entity import OctopusAgileTariffEntity
+from .rate_series import slot_of
+from .transitions import Transitions, TransitionTimer, find_transitions
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Add binary sensors for passed config_entry in HA."""
+    coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    timer = TransitionTimer(hass)
+
+    entities: list[TransitionBinarySensor] = [
+        RateAboveThresholdSensor(coordinator, config_entry, timer, threshold)
+        for threshold in config_entry.options.get(CONF_THRESHOLDS, [])
+    ]
+    top_slots = config_entry.options.get(CONF_TOP_SLOTS, 0)
+    if top_slots:
+        entities.append(InTopSlotsSensor(coordinator, config_entry, timer, top_slots))
+
+    if coordinator.with_import:
+        entities.append(ExportBeatsImportSensor(coordinator, config_entry, timer))
+
+    async_add_entities(entities)
+
+
+class TransitionBinarySensor(OctopusAgileTariffEntity, BinarySensorEntity):
+    """
+    A binary sensor whose state changes only at precomputed slot boundaries.
+
+    Each time the rates change, every future transition is worked out, and a timer
+    shared by the entry's binary sensors applies them as they fall due.
+    """
+
+    _attr_is_on = False
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        timer: TransitionTimer,
+        description: BinarySensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+        self._timer = timer
+
+    async def async_added_to_hass(self) -> None:
+        """Run when the entity is added to hass."""
+        await super().async_added_to_hass()
+        self.async_on_remove(lambda: self._timer.async_remove(self._async_transition))
+        self._async_update_transitions()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Recompute transitions when the rates change."""
+        self._async_update_transitions()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_update_transitions(self) -> None:
+        """Recompute transitions from the current slot onwards."""
+        self._timer.async_set(
+            self._async_transition, self._find_transitions(slot_of(dt_util.utcnow()))
+        )
+
+    @callback
+    def _async_transition(self, is_on: bool) -> None:
+        """Apply a transition, writing state if it has changed."""
+        if is_on == self._attr_is_on:
+            return
+        self._attr_is_on = is_on
+        if self.hass is not None and self.entity_id is not None:
+            self.async_write_ha_state()
+
+    def _find_transitions(self, start_slot: int) -> Transitions:
+        """Find the state at the start slot, and each later change."""
+        raise NotImplementedError
+
+
+class RateAboveThresholdSensor(TransitionBinarySensor):
+    """On while the export rate is above a threshold."""
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        timer: TransitionTimer,
+        threshold: float,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            config_entry,
+            timer,
+            BinarySensorEntityDescription(
+                key=f"rate_above_{threshold:g}",
+                name=f"Agile Export Rate Above {threshold:g}",
+                icon="mdi:cash-plus",
+            ),
+        )
+        self._threshold = threshold
+
+    def _find_transitions(self, start_slot: int) -> Transitions:
+        """Find when the rate crosses the threshold."""
+        rates = self.coordinator.rates
+
+        def is_on(slot: int) -> bool:
+            rate = rates.get_slot(slot)
+            return rate is not None and rate > self._threshold
+
+        return find_transitions(start_slot, rates.end_slot, is_on)
+
+
+class InTopSlotsSensor(TransitionBinarySensor):
+    """On during the best-paying slots of each day."""
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        timer: TransitionTimer,
+        count: int,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            config_entry,
+            timer,
+            BinarySensorEntityDescription(
+                key=f"top_{count}_slots",
+                name=f"In Top {count} Agile Export Slots Today",
+                icon="mdi:trophy",
+            ),
+        )
+        self._count = count
+
+    def _find_transitions(self, start_slot: int) -> Transitions:
+        """Find when each day's best slots start and end."""
+        rates = self.coordinator.rates
+        top_slots: set[int] = set()
+        day = dt_util.as_local(dt_util.utcnow()).date()
+        while True:
+            day_start = slot_of(dt_util.start_of_local_day(day))
+            if day_start >= rates.end_slot:
+                break
+            day = day + timedelta(days=1)
+            day_end = slot_of(dt_util.start_of_local_day(day))
+
+            # The day's best slots are chosen from all of its slots, even past ones
+            best = self.coordinator.windows.find(
+                self._count, day_start, day_end, contiguous=False
+            )
+            if best is not None:
+                top_slots.update(best.slots)
+
+        return find_transitions(start_slot, rates.end_slot, top_slots.__contains__)
+
+
+class ExportBeatsImportSensor(TransitionBinarySensor):
+    """On while the export rate is above the paired import rate."""
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        timer: TransitionTimer,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator,
+            config_entry,
+            timer,
+            BinarySensorEntityDescription(
+                key="export_beats_import",
+                name="Agile Export Beats Import",
+                icon="mdi:scale-unbalanced",
+            ),
+        )
+
+    def _find_transitions(self, start_slot: int) -> Transitions:
+        """Find when export starts and stops beating import."""
+        spread = self.coordinator.spread
+        return find_transitions(start_slot, spread.end_slot, spread.export_beats_import)
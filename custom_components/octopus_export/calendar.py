@@ -0,0 +1,115 @@
+"""Home Assistant calendars of notable export periods."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_REGION, DOMAIN
+from .coordinator import OctopusTariffUpdateCoordinator
+from .entity import OctopusAgileTariffEntity
+from .periods import PeriodIndex, RatePeriod
+from .rate_series import SLOT_SECONDS, slot_of
+
+
+@dataclass(frozen=True)
+class RatePeriodCalendarEntityDescription(EntityDescription):
+    """Describes a calendar of periods found in the rates."""
+
+    index_fn: Callable[
+        [OctopusTariffUpdateCoordinator], PeriodIndex
+    ] = lambda coordinator: PeriodIndex(())
+
+
+WINDOWS_CALENDAR = RatePeriodCalendarEntityDescription(
+    key="windows",
+    name="Agile Export Windows",
+    icon="mdi:calendar-star",
+    index_fn=lambda coordinator: coordinator.window_periods,
+)
+
+THRESHOLDS_CALENDAR = RatePeriodCalendarEntityDescription(
+    key="rate_above_thresholds",
+    name="Agile Export Rate Above Thresholds",
+    icon="mdi:calendar-arrow-right",
+    index_fn=lambda coordinator: coordinator.threshold_periods,
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Add calendars for passed config_entry in HA."""
+    coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+
+    entities = [RatePeriodCalendar(coordinator, config_entry, WINDOWS_CALENDAR)]
+    if coordinator.thresholds:
+        entities.append(
+            RatePeriodCalendar(coordinator, config_entry, THRESHOLDS_CALENDAR)
+        )
+    async_add_entities(entities)
+
+
+def _calendar_event(period: RatePeriod) -> CalendarEvent:
+    """Describe a period as a calendar event."""
+    return CalendarEvent(
+        start=period.start,
+        end=period.end,
+        summary=period.summary,
+        description=period.description,
+    )
+
+
+class RatePeriodCalendar(OctopusAgileTariffEntity, CalendarEntity):
+    """
+    A calendar of periods found in the rates held.
+
+    The periods are found once after the rates change, and indexed by start, so
+    both the current event and any range of events are found by bisection. The
+    calendar schedules its own state changes at the start and end of each event.
+    """
+
+    entity_description: RatePeriodCalendarEntityDescription
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        description: RatePeriodCalendarEntityDescription,
+    ) -> None:
+        """Initialize the calendar."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def event(self) -> CalendarEvent | None:
+        """Return the event in progress, or else the next to start."""
+        index = self.entity_description.index_fn(self.coordinator)
+        period = index.current_or_next(slot_of(dt_util.utcnow()))
+        return None if period is None else _calendar_event(period)
+
+    async def async_get_events(
+        self, hass: HomeAssistant, start_date: datetime, end_date: datetime
+    ) -> list[CalendarEvent]:
+        """Return the events overlapping a range of time."""
+        index = self.entity_description.index_fn(self.coordinator)
+        # The range is widened to whole slots, which periods are made of
+        end_slot = -(-int(end_date.timestamp()) // SLOT_SECONDS)
+        return [
+            _calendar_event(period)
+            for period in index.overlapping(slot_of(start_date), end_slot)
+        ]
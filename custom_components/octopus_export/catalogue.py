@@ -0,0 +1,114 @@
+"""Product discovery shared by all config entries and config flows."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .client import async_get_api_client
+from .const import DATA_CATALOGUE, DOMAIN
+from .octopus_api import OctopusProduct, ProductService
+from .rate_series import RateSeries
+
+# How long a discovered product is reused before the API is asked again
+CATALOGUE_TTL = timedelta(hours=12)
+
+# How long rates fetched by a config flow are kept for the entry it creates
+SEED_TTL = timedelta(minutes=10)
+
+
+class ProductCatalogue:
+    """
+    Domain-wide cache of the current export product.
+
+    Concurrent callers share a single in-flight discovery, and the result is reused
+    until it expires, so setting up any number of regions costs one discovery.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the catalogue."""
+        self._hass = hass
+        self._product: OctopusProduct | None = None
+        self.product_fetched: datetime | None = None
+        # Once any entry pairs an import product, every discovery looks for one
+        self._with_import = False
+        self._found_with_import = False
+        self._pending: asyncio.Task[OctopusProduct] | None = None
+        self._seeds: dict[str, tuple[datetime, RateSeries]] = {}
+
+    @callback
+    def async_get_cached_product(
+        self, with_import: bool = False
+    ) -> OctopusProduct | None:
+        """Get the export product if it was discovered recently, without the API."""
+        if (
+            self._product is not None
+            and self.product_fetched is not None
+            and dt_util.utcnow() - self.product_fetched < CATALOGUE_TTL
+            and (self._found_with_import or not with_import)
+        ):
+            return self._product
+        return None
+
+    async def async_get_export_product(
+        self, with_import: bool = False
+    ) -> OctopusProduct:
+        """
+        Get the current export product, discovering it if necessary.
+
+        With with_import, the product is only returned once its paired import
+        product has been looked for.
+        """
+        self._with_import |= with_import
+        if (product := self.async_get_cached_product(with_import)) is not None:
+            return product
+
+        if self._pending is None:
+            self._pending = self._hass.async_create_task(self._async_discover())
+
+        # Shield the shared task, so one caller giving up doesn't cancel the others
+        product = await asyncio.shield(self._pending)
+        if with_import and not self._found_with_import:
+            # Joined a discovery that started before the import product was wanted
+            return await self.async_get_export_product(with_import)
+        return product
+
+    async def _async_discover(self) -> OctopusProduct:
+        """Discover the export product from the API."""
+        try:
+            with_import = self._with_import
+            product_svc = ProductService(async_get_api_client(self._hass))
+            product = await product_svc.async_get_export_product(
+                self._product, with_import
+            )
+            self._product = product
+            self._found_with_import = with_import
+            self.product_fetched = dt_util.utcnow()
+            return product
+        finally:
+            self._pending = None
+
+    @callback
+    def async_seed_rates(self, tariff_code: str, rates: RateSeries) -> None:
+        """Keep rates fetched outside a coordinator for the entry that will use them."""
+        self._seeds[tariff_code] = (dt_util.utcnow(), rates)
+
+    @callback
+    def async_pop_rates(self, tariff_code: str) -> RateSeries | None:
+        """Take any recently seeded rates for a tariff."""
+        seed = self._seeds.pop(tariff_code, None)
+        if seed is None or dt_util.utcnow() - seed[0] > SEED_TTL:
+            return None
+        return seed[1]
+
+
+@callback
+def async_get_catalogue(hass: HomeAssistant) -> ProductCatalogue:
+    """Get the product catalogue shared across the integration."""
+    domain_data: dict[str, object] = hass.data.setdefault(DOMAIN, {})
+    catalogue = domain_data.get(DATA_CATALOGUE)
+    if not isinstance(catalogue, ProductCatalogue):
+        catalogue = domain_data[DATA_CATALOGUE] = ProductCatalogue(hass)
+    return catalogue
@@ -0,0 +1,20 @@
+"""Access to the API client shared across the integration."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import DATA_CLIENT, DOMAIN
+from .octopus_api import OctopusApiClient
+
+
+@callback
+def async_get_api_client(hass: HomeAssistant) -> OctopusApiClient:
+    """Get the API client, whose rate limit and statistics span all entries."""
+    domain_data: dict[str, object] = hass.data.setdefault(DOMAIN, {})
+    client = domain_data.get(DATA_CLIENT)
+    if not isinstance(client, OctopusApiClient):
+        client = domain_data[DATA_CLIENT] = OctopusApiClient(
+            async_get_clientsession(hass)
+        )
+    return client
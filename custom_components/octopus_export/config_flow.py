@@ -1,19 +1,50 @@
 """Config flow for GivEnergy integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
+from datetime import timedelta
 from typing import Any
 
-import async_timeout
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import selector
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
 import voluptuous as vol
 
-from .const import CONF_REGION, DOMAIN, LOGGER
-from .octopus_api import AgileTariff, ProductService
+from .catalogue import async_get_catalogue
+from .client import async_get_api_client
+from .const import (
+    CONF_BATTERY_CAPACITY,
+    CONF_BATTERY_CHARGE_POWER,
+    CONF_BATTERY_DISCHARGE_POWER,
+    CONF_BATTERY_EFFICIENCY,
+    CONF_BATTERY_RESERVE,
+    CONF_BATTERY_SOC_ENTITY,
+    CONF_FORECAST_DAYS,
+    CONF_IMPORT_RATES,
+    CONF_METER_SERIAL,
+    CONF_MPAN,
+    CONF_REGION,
+    CONF_RETENTION_DAYS,
+    CONF_SHARED_REFRESH,
+    CONF_SLIM_ATTRIBUTES,
+    CONF_THRESHOLDS,
+    CONF_TOP_SLOTS,
+    CONF_WINDOW_SLOTS,
+    DEFAULT_BATTERY_EFFICIENCY,
+    DEFAULT_BATTERY_POWER,
+    DEFAULT_BATTERY_RESERVE,
+    DEFAULT_FORECAST_DAYS,
+    DEFAULT_RETENTION_DAYS,
+    DEFAULT_WINDOW_SLOTS,
+    DOMAIN,
+    LOGGER,
+)
+from .octopus_api import AgileTariff
+from .scheduler import PUBLICATION_HORIZON
 
 DNO_REGIONS = [
     selector.SelectOptionDict(value="A", label="A/10: Eastern England"),
@@ -41,22 +72,163 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 )
 
 
+def _options_schema(options: Mapping[str, Any]) -> vol.Schema:
+    """Build the options schema, defaulting to the currently configured values."""
+    return vol.Schema(
+        {
+            vol.Required(
+                CONF_RETENTION_DAYS,
+                default=options.get(CONF_RETENTION_DAYS, DEFAULT_RETENTION_DAYS),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=1, max=30, mode=selector.NumberSelectorMode.BOX
+                ),
+            ),
+            vol.Required(
+                CONF_SHARED_REFRESH,
+                default=options.get(CONF_SHARED_REFRESH, False),
+            ): selector.BooleanSelector(),
+            vol.Required(
+                CONF_SLIM_ATTRIBUTES,
+                default=options.get(CONF_SLIM_ATTRIBUTES, False),
+            ): selector.BooleanSelector(),
+            vol.Required(
+                CONF_WINDOW_SLOTS,
+                default=options.get(CONF_WINDOW_SLOTS, DEFAULT_WINDOW_SLOTS),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=1, max=48, mode=selector.NumberSelectorMode.BOX
+                ),
+            ),
+            vol.Optional(
+                CONF_THRESHOLDS,
+                default=", ".join(
+                    f"{threshold:g}" for threshold in options.get(CONF_THRESHOLDS, [])
+                ),
+            ): selector.TextSelector(),
+            vol.Required(
+                CONF_TOP_SLOTS,
+                default=options.get(CONF_TOP_SLOTS, 0),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0, max=48, mode=selector.NumberSelectorMode.BOX
+                ),
+            ),
+            vol.Required(
+                CONF_FORECAST_DAYS,
+                default=options.get(CONF_FORECAST_DAYS, DEFAULT_FORECAST_DAYS),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0, max=7, mode=selector.NumberSelectorMode.BOX
+                ),
+            ),
+            vol.Required(
+                CONF_IMPORT_RATES,
+                default=options.get(CONF_IMPORT_RATES, False),
+            ): selector.BooleanSelector(),
+            vol.Required(
+                CONF_BATTERY_CAPACITY,
+                default=options.get(CONF_BATTERY_CAPACITY, 0),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=100,
+                    step=0.1,
+                    unit_of_measurement="kWh",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            ),
+            vol.Required(
+                CONF_BATTERY_CHARGE_POWER,
+                default=options.get(CONF_BATTERY_CHARGE_POWER, DEFAULT_BATTERY_POWER),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=50,
+                    step=0.1,
+                    unit_of_measurement="kW",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            ),
+            vol.Required(
+                CONF_BATTERY_DISCHARGE_POWER,
+                default=options.get(
+                    CONF_BATTERY_DISCHARGE_POWER, DEFAULT_BATTERY_POWER
+                ),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=50,
+                    step=0.1,
+                    unit_of_measurement="kW",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            ),
+            vol.Required(
+                CONF_BATTERY_EFFICIENCY,
+                default=options.get(
+                    CONF_BATTERY_EFFICIENCY, DEFAULT_BATTERY_EFFICIENCY
+                ),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=50,
+                    max=100,
+                    unit_of_measurement="%",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            ),
+            vol.Required(
+                CONF_BATTERY_RESERVE,
+                default=options.get(CONF_BATTERY_RESERVE, DEFAULT_BATTERY_RESERVE),
+            ): selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=100,
+                    unit_of_measurement="%",
+                    mode=selector.NumberSelectorMode.BOX,
+                ),
+            ),
+            vol.Optional(
+                CONF_BATTERY_SOC_ENTITY,
+                description={"suggested_value": options.get(CONF_BATTERY_SOC_ENTITY)},
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="sensor"),
+            ),
+            vol.Optional(
+                CONF_MPAN, default=options.get(CONF_MPAN, "")
+            ): selector.TextSelector(),
+            vol.Optional(
+                CONF_METER_SERIAL, default=options.get(CONF_METER_SERIAL, "")
+            ): selector.TextSelector(),
+            vol.Optional(
+                CONF_API_KEY, default=options.get(CONF_API_KEY, "")
+            ): selector.TextSelector(
+                selector.TextSelectorConfig(type=selector.TextSelectorType.PASSWORD)
+            ),
+        }
+    )
+
+
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
     try:
-        session = async_get_clientsession(hass)
-        product_svc = ProductService(session)
-        product = await product_svc.async_get_export_product()
+        catalogue = async_get_catalogue(hass)
+        product = await catalogue.async_get_export_product()
 
         product_code = product.code
         region_code = data[CONF_REGION]
         tariff_code = product.tariff_codes[region_code]
-        tariff = AgileTariff(session, product_code, tariff_code)
-        async with async_timeout.timeout(10):
-            await tariff.fetch_data()
+        tariff = AgileTariff(async_get_api_client(hass), product_code, tariff_code)
+
+        # Fetch the rates the new entry will start with, proving connectivity too
+        now = dt_util.utcnow()
+        rates = await tariff.fetch_data(
+            now - timedelta(days=DEFAULT_RETENTION_DAYS), now + PUBLICATION_HORIZON
+        )
+        catalogue.async_seed_rates(tariff_code, rates)
 
         return {CONF_REGION: region_code}
     except Exception:  # pylint: disable=broad-except
@@ -95,6 +267,73 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignore[call
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler()
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle options for Octopus Agile."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                thresholds = _parse_thresholds(user_input.get(CONF_THRESHOLDS, ""))
+            except ValueError:
+                errors[CONF_THRESHOLDS] = "invalid_thresholds"
+            else:
+                return self.async_create_entry(
+                    title="",
+                    data={
+                        CONF_RETENTION_DAYS: int(user_input[CONF_RETENTION_DAYS]),
+                        CONF_SHARED_REFRESH: user_input[CONF_SHARED_REFRESH],
+                        CONF_SLIM_ATTRIBUTES: user_input[CONF_SLIM_ATTRIBUTES],
+                        CONF_WINDOW_SLOTS: int(user_input[CONF_WINDOW_SLOTS]),
+                        CONF_THRESHOLDS: thresholds,
+                        CONF_TOP_SLOTS: int(user_input[CONF_TOP_SLOTS]),
+                        CONF_FORECAST_DAYS: int(user_input[CONF_FORECAST_DAYS]),
+                        CONF_IMPORT_RATES: user_input[CONF_IMPORT_RATES],
+                        CONF_BATTERY_CAPACITY: user_input[CONF_BATTERY_CAPACITY],
+                        CONF_BATTERY_CHARGE_POWER: user_input[
+                            CONF_BATTERY_CHARGE_POWER
+                        ],
+                        CONF_BATTERY_DISCHARGE_POWER: user_input[
+                            CONF_BATTERY_DISCHARGE_POWER
+                        ],
+                        CONF_BATTERY_EFFICIENCY: int(
+                            user_input[CONF_BATTERY_EFFICIENCY]
+                        ),
+                        CONF_BATTERY_RESERVE: int(user_input[CONF_BATTERY_RESERVE]),
+                        CONF_BATTERY_SOC_ENTITY: user_input.get(
+                            CONF_BATTERY_SOC_ENTITY, ""
+                        ),
+                        CONF_MPAN: user_input.get(CONF_MPAN, "").strip(),
+                        CONF_METER_SERIAL: user_input.get(
+                            CONF_METER_SERIAL, ""
+                        ).strip(),
+                        CONF_API_KEY: user_input.get(CONF_API_KEY, "").strip(),
+                    },
+                )
+
+        entry = self.hass.config_entries.async_get_entry(self.handler)
+        options = entry.options if entry is not None else {}
+        return self.async_show_form(
+            step_id="init", data_schema=_options_schema(options), errors=errors
+        )
+
+
+def _parse_thresholds(text: str) -> list[float]:
+    """Parse a comma-separated list of rates, in £/kWh, into a sorted list."""
+    return sorted({float(part) for part in text.split(",") if part.strip()})
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
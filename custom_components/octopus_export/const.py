@@ -5,4 +5,32 @@ from logging import Logger, getLogger
 DOMAIN = "octopus_export"
 LOGGER: Logger = getLogger(__package__)
 
+DATA_CATALOGUE = "product_catalogue"
+DATA_CLIENT = "api_client"
+DATA_HUB = "tariff_hub"
+DATA_SLOT_CLOCK = "slot_clock"
+
 CONF_REGION = "region"
+CONF_RETENTION_DAYS = "retention_days"
+CONF_SHARED_REFRESH = "shared_refresh"
+CONF_SLIM_ATTRIBUTES = "slim_attributes"
+CONF_WINDOW_SLOTS = "window_slots"
+CONF_THRESHOLDS = "thresholds"
+CONF_TOP_SLOTS = "top_slots"
+CONF_FORECAST_DAYS = "forecast_days"
+CONF_IMPORT_RATES = "import_rates"
+CONF_BATTERY_CAPACITY = "battery_capacity"
+CONF_BATTERY_CHARGE_POWER = "battery_charge_power"
+CONF_BATTERY_DISCHARGE_POWER = "battery_discharge_power"
+CONF_BATTERY_EFFICIENCY = "battery_efficiency"
+CONF_BATTERY_RESERVE = "battery_reserve"
+CONF_BATTERY_SOC_ENTITY = "battery_soc_entity"
+CONF_MPAN = "export_mpan"
+CONF_METER_SERIAL = "export_meter_serial"
+
+DEFAULT_RETENTION_DAYS = 2
+DEFAULT_WINDOW_SLOTS = 4
+DEFAULT_FORECAST_DAYS = 0
+DEFAULT_BATTERY_POWER = 3.0
+DEFAULT_BATTERY_EFFICIENCY = 90
+DEFAULT_BATTERY_RESERVE = 10
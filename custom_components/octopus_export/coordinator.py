@@ -0,0 +1,600 @@
+"""Coordination of updates to the rates of a tariff."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, cast
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .catalogue import async_get_catalogue
+from .client import async_get_api_client
+from .const import (
+    CONF_BATTERY_CAPACITY,
+    CONF_BATTERY_CHARGE_POWER,
+    CONF_BATTERY_DISCHARGE_POWER,
+    CONF_BATTERY_EFFICIENCY,
+    CONF_BATTERY_RESERVE,
+    CONF_BATTERY_SOC_ENTITY,
+    CONF_FORECAST_DAYS,
+    CONF_IMPORT_RATES,
+    CONF_REGION,
+    CONF_RETENTION_DAYS,
+    CONF_THRESHOLDS,
+    CONF_WINDOW_SLOTS,
+    DEFAULT_BATTERY_EFFICIENCY,
+    DEFAULT_BATTERY_POWER,
+    DEFAULT_BATTERY_RESERVE,
+    DEFAULT_FORECAST_DAYS,
+    DEFAULT_RETENTION_DAYS,
+    DEFAULT_WINDOW_SLOTS,
+    LOGGER,
+)
+from .forecast import SLOTS_PER_DAY, SeasonalRateModel
+from .octopus_api import AgileTariff, EndpointStats, get_start_of_current_interval
+from .periods import PeriodIndex, find_daily_windows, find_runs_above
+from .planner import BatterySpec, DispatchPlan, DispatchPlanner
+from .ranks import RateRanks, RollingStats
+from .rate_series import RateSeries, slot_of, slot_start
+from .scheduler import INITIAL_RETRY_DELAY, PUBLICATION_HORIZON, RefreshScheduler
+from .spread import RateSpread
+from .storage import CachedTariff, TariffCache
+from .windows import WindowEngine
+
+if TYPE_CHECKING:
+    from .earnings import EarningsCoordinator
+    from .hub import TariffHub
+
+# How long product details restored from the cache are trusted before rediscovery
+_PRODUCT_CHECK_INTERVAL = timedelta(days=1)
+
+
+def _tariff_codes(tariff: AgileTariff) -> tuple[str, str | None]:
+    """Get the codes of a tariff and its paired import tariff, if it has one."""
+    return tariff.tariff, tariff.paired.tariff if tariff.paired is not None else None
+
+
+def _battery_spec(options: Mapping[str, Any]) -> BatterySpec | None:
+    """Get the battery described by an entry's options, if it has one."""
+    capacity = float(options.get(CONF_BATTERY_CAPACITY, 0))
+    if capacity <= 0:
+        return None
+    return BatterySpec(
+        capacity=capacity,
+        charge_power=float(
+            options.get(CONF_BATTERY_CHARGE_POWER, DEFAULT_BATTERY_POWER)
+        ),
+        discharge_power=float(
+            options.get(CONF_BATTERY_DISCHARGE_POWER, DEFAULT_BATTERY_POWER)
+        ),
+        efficiency=options.get(CONF_BATTERY_EFFICIENCY, DEFAULT_BATTERY_EFFICIENCY)
+        / 100,
+        reserve=capacity
+        * options.get(CONF_BATTERY_RESERVE, DEFAULT_BATTERY_RESERVE)
+        / 100,
+    )
+
+
+@dataclass
+class CoordinatorStats:
+    """Counters and timings, in seconds, of the work done by a coordinator."""
+
+    updates: int = 0
+    failed_updates: int = 0
+    last_update_duration: float | None = None
+    total_update_duration: float = 0.0
+    view_builds: int = 0
+    last_view_build_duration: float | None = None
+    total_view_build_duration: float = 0.0
+    forecast_fits: int = 0
+    last_forecast_fit_duration: float | None = None
+
+    def record_update(self, duration: float) -> None:
+        """Count an update of the rates, successful or not."""
+        self.updates += 1
+        self.last_update_duration = duration
+        self.total_update_duration += duration
+
+    def record_view_build(self, duration: float) -> None:
+        """Count a build of the daily rate tables."""
+        self.view_builds += 1
+        self.last_view_build_duration = duration
+        self.total_view_build_duration += duration
+
+    def record_forecast_fit(self, duration: float) -> None:
+        """Count a fit of the forecast model."""
+        self.forecast_fits += 1
+        self.last_forecast_fit_duration = duration
+
+
+class OctopusTariffUpdateCoordinator(DataUpdateCoordinator[RateSeries]):
+    """Update coordinator that enables efficient batched updates to all entities associated with an inverter."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        cache: TariffCache,
+        tariff: AgileTariff | None = None,
+    ) -> None:
+        """
+        Initialize my coordinator.
+
+        Without a tariff, the current product is discovered by the first refresh.
+        """
+        super().__init__(
+            hass,
+            LOGGER,
+            name="Agile Tariff",
+            # Listeners aren't notified when a refresh leaves the rates unchanged
+            always_update=False,
+            # Replaced before each refresh is scheduled
+            update_interval=INITIAL_RETRY_DELAY,
+        )
+        self.tariff = tariff
+        self.with_import: bool = entry.options.get(CONF_IMPORT_RATES, False)
+        self.retention = timedelta(
+            days=entry.options.get(CONF_RETENTION_DAYS, DEFAULT_RETENTION_DAYS)
+        )
+        self._rates = RateSeries()
+        self._import_rates = RateSeries()
+        self._spread: RateSpread | None = None
+        self._daily_views: tuple[date, dict[str, float], dict[str, float]] | None = None
+        self._windows: WindowEngine | None = None
+        self._ranks_today: tuple[date, RateRanks] | None = None
+        self._horizon: RollingStats | None = None
+        self.window_slots = int(
+            entry.options.get(CONF_WINDOW_SLOTS, DEFAULT_WINDOW_SLOTS)
+        )
+        self.thresholds: list[float] = entry.options.get(CONF_THRESHOLDS, [])
+        self._window_periods: PeriodIndex | None = None
+        self._threshold_periods: PeriodIndex | None = None
+        self.forecast_days = int(
+            entry.options.get(CONF_FORECAST_DAYS, DEFAULT_FORECAST_DAYS)
+        )
+        self.forecast_model: SeasonalRateModel | None = None
+        self._forecast: RateSeries | None = None
+        spec = _battery_spec(entry.options)
+        self.planner = None if spec is None else DispatchPlanner(spec)
+        self.battery_soc_entity: str = entry.options.get(CONF_BATTERY_SOC_ENTITY, "")
+        self.product_checked: datetime | None = None
+        self.next_refresh: datetime | None = None
+        self.hub: TariffHub | None = None
+        self._scheduler = RefreshScheduler()
+        self._cache = cache
+        self._region_code: str = entry.data[CONF_REGION]
+        self.backfilling = False
+        self.earnings: EarningsCoordinator | None = None
+        self.stats = CoordinatorStats()
+        self._refetch_from: int | None = None
+
+    @callback
+    def async_restore(
+        self,
+        rates: RateSeries,
+        product_checked: datetime | None,
+        import_rates: RateSeries | None = None,
+    ) -> None:
+        """Populate the coordinator with previously cached rates."""
+        cutoff = self._retention_cutoff(datetime.now(timezone.utc))
+        self.rates = rates.trim(cutoff)
+        if import_rates is not None:
+            self.import_rates = import_rates.trim(cutoff)
+        self.product_checked = product_checked
+        self.async_set_updated_data(self.rates)
+
+    async def async_seed(self, rates: RateSeries) -> None:
+        """Populate the coordinator with fresh rates fetched elsewhere."""
+        self.async_restore(rates, self.product_checked)
+        await self._async_save_cache()
+
+    async def async_start(self, refresh: bool) -> None:
+        """Bring the coordinator up to date once its entities have been set up."""
+        if refresh:
+            await self.async_refresh()
+        if self.earnings is not None:
+            await self.earnings.async_refresh()
+
+    async def _async_discover_tariff(self) -> AgileTariff:
+        """
+        Find the current product, and switch to its tariff for the region.
+
+        The tariff is swapped in place, so entities are unaffected. Rates already
+        held are kept, and those from the current slot on are fetched again from
+        the new tariff by the refresh in progress.
+        """
+        catalogue = async_get_catalogue(self.hass)
+        product = await catalogue.async_get_export_product(self.with_import)
+        tariff = AgileTariff.for_region(
+            async_get_api_client(self.hass),
+            product,
+            self._region_code,
+            self.with_import,
+        )
+        if self.tariff is None or _tariff_codes(tariff) != _tariff_codes(self.tariff):
+            if self.tariff is not None:
+                LOGGER.info(
+                    "Switching from tariff %s to %s",
+                    " and ".join(filter(None, _tariff_codes(self.tariff))),
+                    " and ".join(filter(None, _tariff_codes(tariff))),
+                )
+                self._refetch_from = slot_of(get_start_of_current_interval())
+            self.tariff = tariff
+        self.product_checked = catalogue.product_fetched
+        return self.tariff
+
+    async def async_backfill_statistics(self, start: datetime, end: datetime) -> None:
+        """Import the rate history for a period into long-term statistics."""
+        if self.tariff is None:
+            return
+
+        # Backfills are rare, so their module isn't imported during setup
+        # pylint: disable-next=import-outside-toplevel
+        from .backfill import async_backfill_statistics
+
+        self.backfilling = True
+        try:
+            await async_backfill_statistics(
+                self.hass, self.tariff, self._cache, self._region_code, start, end
+            )
+        finally:
+            self.backfilling = False
+
+    @property
+    def api_stats(self) -> EndpointStats:
+        """Get the statistics of requests for rates, shared by all entries."""
+        return async_get_api_client(self.hass).stats.get(
+            "standard-unit-rates", EndpointStats()
+        )
+
+    @property
+    def rates_until(self) -> datetime | None:
+        """Get the end of the last slot held, if any."""
+        return self.rates.end
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next refresh for when new rates are expected."""
+        if self.hub is not None:
+            self.hub.async_schedule_refresh()
+            return
+
+        now = dt_util.utcnow()
+        self.next_refresh = self._scheduler.next_refresh(now, self.rates_until)
+        self.update_interval = self.next_refresh - now
+        LOGGER.debug("Next refresh scheduled for %s", self.next_refresh)
+        super()._schedule_refresh()
+
+    def _retention_cutoff(self, now: datetime) -> int:
+        """Get the number of the first slot within the retention window."""
+        return slot_of(now - self.retention)
+
+    async def _async_save_cache(self) -> None:
+        """Save the current tariff and rates to disk."""
+        if self.tariff is None:
+            return
+        paired = self.tariff.paired
+        await self._cache.async_save(
+            CachedTariff(
+                self.tariff.product,
+                self.tariff.tariff,
+                self.rates,
+                self.product_checked,
+                paired.product if paired is not None else None,
+                paired.tariff if paired is not None else None,
+                self.import_rates,
+            )
+        )
+
+    async def _async_update_data(self) -> RateSeries:
+        """Fetch data from API endpoint, timing the update."""
+        start = perf_counter()
+        try:
+            return await self._async_update_rates()
+        except UpdateFailed:
+            self.stats.failed_updates += 1
+            raise
+        finally:
+            self.stats.record_update(perf_counter() - start)
+
+    async def _async_update_rates(self) -> RateSeries:
+        """Fetch data from API endpoint.
+
+        This is the place to pre-process the data to lookup tables
+        so entities can quickly look up their data.
+        """
+        # The product is checked now and then, so a new version is picked up without
+        # reloading the entry
+        tariff = self.tariff
+        product_checked = self.product_checked
+        if tariff is None:
+            try:
+                tariff = await self._async_discover_tariff()
+            except Exception as err:
+                raise UpdateFailed(f"Unable to discover the product: {err}") from err
+        elif (
+            product_checked is None
+            or dt_util.utcnow() - product_checked > _PRODUCT_CHECK_INTERVAL
+        ):
+            try:
+                tariff = await self._async_discover_tariff()
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.warning("Unable to check for product changes: %s", err)
+
+        now = datetime.now(timezone.utc)
+        cutoff = self._retention_cutoff(now)
+        window_start = now - self.retention
+        period_from = self._period_from(self.rates, cutoff, window_start)
+        if tariff.paired is not None:
+            # Both tariffs are fetched for the same period, which is usually the
+            # same for each anyway
+            period_from = min(
+                period_from, self._period_from(self.import_rates, cutoff, window_start)
+            )
+        if self._refetch_from is not None:
+            period_from = min(period_from, slot_start(self._refetch_from))
+
+        # End the period at a midnight beyond the publication horizon, so that the
+        # same URL is requested throughout the day, allowing it to be revalidated
+        period_to = datetime.combine(
+            (now + PUBLICATION_HORIZON).date() + timedelta(days=1),
+            time(),
+            timezone.utc,
+        )
+
+        try:
+            new_rates, new_import_rates = await tariff.fetch_pair_if_modified(
+                period_from, period_to
+            )
+        except Exception as err:
+            raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        self._refetch_from = None
+        rates = self.rates
+        if new_rates is not None:
+            rates = rates.merge(new_rates)
+        rates = rates.trim(cutoff)
+        import_rates = RateSeries()
+        if tariff.paired is not None:
+            import_rates = self.import_rates
+            if new_import_rates is not None:
+                import_rates = import_rates.merge(new_import_rates)
+            import_rates = import_rates.trim(cutoff)
+
+        rates_changed = rates != self.rates
+        import_changed = import_rates != self.import_rates
+        if rates_changed:
+            self.rates = rates
+        if import_changed:
+            self.import_rates = import_rates
+            if not rates_changed:
+                # Listeners are only notified by the refresh when the export rates
+                # change, which is the data they're given
+                self.async_update_listeners()
+        if rates_changed or import_changed or self.product_checked != product_checked:
+            await self._async_save_cache()
+
+        return self.rates
+
+    @staticmethod
+    def _period_from(
+        rates: RateSeries, cutoff: int, window_start: datetime
+    ) -> datetime:
+        """
+        Get the start of the period to fetch, given the rates already held.
+
+        Only slots beyond those already held are requested. If nothing is held, or
+        the retention window has been extended beyond the oldest slot held,
+        everything within the window is.
+        """
+        if rates and rates.start_slot <= cutoff:
+            return max(cast(datetime, rates.end), window_start)
+        return window_start
+
+    @property
+    def rates(self) -> RateSeries:
+        """Get the rates held."""
+        return self._rates
+
+    @rates.setter
+    def rates(self, rates: RateSeries) -> None:
+        """Replace the rates held, invalidating views derived from them."""
+        self._rates = rates
+        self._daily_views = None
+        self._windows = None
+        self._forecast = None
+        self._spread = None
+        self._ranks_today = None
+        self._horizon = None
+        self._window_periods = None
+        self._threshold_periods = None
+
+    @property
+    def import_rates(self) -> RateSeries:
+        """Get the paired import tariff's rates held, if it's fetched."""
+        return self._import_rates
+
+    @import_rates.setter
+    def import_rates(self, rates: RateSeries) -> None:
+        """Replace the import rates held, invalidating the spread."""
+        self._import_rates = rates
+        self._spread = None
+
+    @property
+    def spread(self) -> RateSpread:
+        """Get the export rates compared with import, cached until either changes."""
+        if self._spread is None:
+            self._spread = RateSpread(self._rates, self._import_rates)
+        return self._spread
+
+    @property
+    def windows(self) -> WindowEngine:
+        """Get searches for the best slots, cached until the rates change."""
+        if self._windows is None:
+            self._windows = WindowEngine(self._rates)
+        return self._windows
+
+    @property
+    def ranks_today(self) -> RateRanks:
+        """
+        Get today's rates ranked, in Home Assistant's time zone.
+
+        The index is rebuilt after the rates change, or when the local date rolls
+        over, so ranking the current slot costs only a bisection.
+        """
+        today = dt_util.now().date()
+        if self._ranks_today is None or self._ranks_today[0] != today:
+            self._ranks_today = (
+                today,
+                RateRanks(
+                    self._rates,
+                    slot_of(dt_util.start_of_local_day(today)),
+                    slot_of(dt_util.start_of_local_day(today + timedelta(days=1))),
+                ),
+            )
+        return self._ranks_today[1]
+
+    @property
+    def rates_ahead(self) -> RollingStats:
+        """
+        Get statistics of the rates over the next 24 hours, from the current slot.
+
+        The horizon is kept from one slot to the next, and only rebuilt after the
+        rates change.
+        """
+        if self._horizon is None:
+            self._horizon = RollingStats(self._rates, SLOTS_PER_DAY)
+        self._horizon.advance(slot_of(get_start_of_current_interval()))
+        return self._horizon
+
+    @property
+    def window_periods(self) -> PeriodIndex:
+        """Get each local day's peak and lowest windows, cached until rates change."""
+        if self._window_periods is None:
+            self._window_periods = PeriodIndex(
+                find_daily_windows(self._rates, self.window_slots)
+            )
+        return self._window_periods
+
+    @property
+    def threshold_periods(self) -> PeriodIndex:
+        """Get the runs of rates above each threshold, cached until the rates change."""
+        if self._threshold_periods is None:
+            self._threshold_periods = PeriodIndex(
+                period
+                for threshold in self.thresholds
+                for period in find_runs_above(self._rates, threshold)
+            )
+        return self._threshold_periods
+
+    @property
+    def forecast(self) -> RateSeries:
+        """
+        Get rates forecast for the days following the last one published.
+
+        The model is only refitted when newer rates arrive, and the forecast is
+        cached until the rates change. Forecast slots never overlap published ones.
+        """
+        if self._forecast is None:
+            self._forecast = self._build_forecast()
+        return self._forecast
+
+    @property
+    def rates_with_forecast(self) -> RateSeries:
+        """Get the rates held, followed by any forecast rates."""
+        return self._rates.merge(self.forecast)
+
+    def _build_forecast(self) -> RateSeries:
+        """Forecast rates from those held, refitting the model if necessary."""
+        rates = self._rates
+        if not self.forecast_days or not rates:
+            return RateSeries()
+
+        model = self.forecast_model
+        if model is None or model.fitted_until != rates.end_slot:
+            start = perf_counter()
+            model = self.forecast_model = SeasonalRateModel.fit(rates)
+            self.stats.record_forecast_fit(perf_counter() - start)
+        if model is None:
+            return RateSeries()
+        return model.predict(rates.end_slot, self.forecast_days * SLOTS_PER_DAY)
+
+    @property
+    def battery_soc(self) -> float | None:
+        """Get the battery's state of charge in kWh, if its sensor reports one."""
+        if self.planner is None or not self.battery_soc_entity:
+            return None
+        state = self.hass.states.get(self.battery_soc_entity)
+        if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return None
+        try:
+            percent = float(state.state)
+        except ValueError:
+            return None
+        return self.planner.spec.capacity * percent / 100
+
+    def battery_plan(self, soc: float | None = None) -> DispatchPlan | None:
+        """
+        Plan the battery's dispatch from the current slot, if there is a battery.
+
+        The plan runs to the end of any forecast rates, and starts from the given
+        state of charge in kWh, or else from that reported by the battery's sensor.
+        """
+        if self.planner is None:
+            return None
+        return self.planner.plan(
+            self.rates_with_forecast,
+            slot_of(get_start_of_current_interval()),
+            self.battery_soc if soc is None else soc,
+        )
+
+    @property
+    def rates_today(self) -> dict[str, float]:
+        """
+        Get today's rates in Home Assistant's time zone.
+
+        The dictionary keys reflect the start of the agile pricing slot, e.g. '18:30'.
+        """
+        return self._get_daily_views()[1]
+
+    @property
+    def rates_tomorrow(self) -> dict[str, float]:
+        """
+        Get tomorrow's rates in Home Assistant's time zone.
+
+        The dictionary keys reflect the start of the agile pricing slot, e.g. '18:30'.
+        """
+        return self._get_daily_views()[2]
+
+    def _get_daily_views(self) -> tuple[date, dict[str, float], dict[str, float]]:
+        """
+        Get today's and tomorrow's rates, building them only when necessary.
+
+        The views are rebuilt after the rates change, or when the local date rolls
+        over, rather than on every state write.
+        """
+        today = dt_util.now().date()
+        if self._daily_views is None or self._daily_views[0] != today:
+            start = perf_counter()
+            self._daily_views = (
+                today,
+                self._rates_for_date(today),
+                self._rates_for_date(today + timedelta(days=1)),
+            )
+            self.stats.record_view_build(perf_counter() - start)
+        return self._daily_views
+
+    def _rates_for_date(self, day: date) -> dict[str, float]:
+        """Get the rates for slots starting on the given local date."""
+        start = dt_util.start_of_local_day(day)
+        end = dt_util.start_of_local_day(day + timedelta(days=1))
+        return {
+            dt_util.as_local(slot_start(slot)).strftime("%H:%M"): value
+            for slot, value in self.rates.slice(start, end).items()
+        }
@@ -0,0 +1,83 @@
+"""Diagnostics support for the Octopus Agile integration."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import HomeAssistant
+
+from .client import async_get_api_client
+from .const import CONF_METER_SERIAL, CONF_MPAN, DOMAIN
+from .coordinator import OctopusTariffUpdateCoordinator
+from .octopus_api import LATENCY_BUCKETS
+from .rate_series import slot_start
+
+TO_REDACT = {CONF_API_KEY, CONF_METER_SERIAL, CONF_MPAN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    rates = coordinator.rates
+    forecast = coordinator.forecast
+    model = coordinator.forecast_model
+    client = async_get_api_client(hass)
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "tariff": None
+        if coordinator.tariff is None
+        else {
+            "product": coordinator.tariff.product,
+            "tariff": coordinator.tariff.tariff,
+            "product_checked": coordinator.product_checked,
+            "import_tariff": None
+            if coordinator.tariff.paired is None
+            else coordinator.tariff.paired.tariff,
+        },
+        "rates": {
+            "slots_held": len(rates),
+            "start": rates.start,
+            "end": rates.end,
+        },
+        "forecast": None
+        if model is None
+        else {
+            "fitted_until": slot_start(model.fitted_until),
+            "level": model.level,
+            "slots": len(forecast),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "next_refresh": coordinator.next_refresh,
+            "shared_refresh": coordinator.hub is not None,
+            **asdict(coordinator.stats),
+        },
+        "earnings": None
+        if coordinator.earnings is None
+        else {
+            "last_update_success": coordinator.earnings.last_update_success,
+            "until": coordinator.earnings.data.until
+            if coordinator.earnings.data
+            else None,
+        },
+        "api": {
+            "latency_buckets": [*LATENCY_BUCKETS, None],
+            "endpoints": {
+                endpoint: {
+                    **asdict(stats),
+                    "retries": stats.retries,
+                    "cache_hit_ratio": stats.cache_hit_ratio,
+                }
+                for endpoint, stats in client.stats.items()
+            },
+        },
+    }
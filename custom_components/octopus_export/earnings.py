@@ -0,0 +1,158 @@
+"""Export earnings, from meter readings joined with the rates for each slot."""
+from __future__ import annotations
+
+from datetime import date, timedelta
+import math
+from operator import mul
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import LOGGER
+from .octopus_api import ExportMeter
+from .rate_series import RateSeries, slot_of, slot_start
+from .storage import EarningsTotals, TariffCache
+
+if TYPE_CHECKING:
+    from .coordinator import OctopusTariffUpdateCoordinator
+
+# Readings are published a day or so late, so there's little point asking often
+EARNINGS_UPDATE_INTERVAL = timedelta(hours=1)
+
+
+def earnings_by_day(readings: RateSeries, rates: RateSeries) -> dict[date, float]:
+    """
+    Total the earnings for each local day, from slots with both a reading and a rate.
+
+    Each day's readings and rates are sliced out as aligned arrays and multiplied
+    pairwise, so no slot is looked up individually. Gaps in either produce NaN
+    products, which are left out of the sum.
+    """
+    first = max(readings.start_slot, rates.start_slot)
+    last = min(readings.end_slot, rates.end_slot)
+    totals: dict[date, float] = {}
+    if not readings or not rates or first >= last:
+        return totals
+
+    day = dt_util.as_local(readings.start or dt_util.utcnow()).date()
+    day_start = slot_of(dt_util.start_of_local_day(day))
+    while day_start < last:
+        next_day = day + timedelta(days=1)
+        day_end = slot_of(dt_util.start_of_local_day(next_day))
+        start, end = max(first, day_start), min(last, day_end)
+        if start < end:
+            day_readings = readings.values[
+                start - readings.start_slot : end - readings.start_slot
+            ]
+            day_rates = rates.values[start - rates.start_slot : end - rates.start_slot]
+            products = map(mul, day_readings, day_rates)
+            totals[day] = math.fsum(value for value in products if value == value)
+        day, day_start = next_day, day_end
+
+    return totals
+
+
+class EarningsCoordinator(DataUpdateCoordinator[EarningsTotals]):
+    """
+    Keeps running totals of export earnings for each day.
+
+    Each update fetches only the readings since the last, joins them with the
+    tariff's rates, and adds them to the saved totals. Days before the start of the
+    previous month are forgotten.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        meter: ExportMeter,
+        tariff_coordinator: OctopusTariffUpdateCoordinator,
+        cache: TariffCache,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            LOGGER,
+            name="Agile Export Earnings",
+            update_interval=EARNINGS_UPDATE_INTERVAL,
+        )
+        self._meter = meter
+        self._tariff_coordinator = tariff_coordinator
+        self._cache = cache
+
+    async def async_load(self) -> None:
+        """Restore the totals saved by a previous run."""
+        self.async_set_updated_data(await self._cache.async_load_earnings())
+
+    @property
+    def earned_today(self) -> float | None:
+        """Get the earnings for today, in Home Assistant's time zone."""
+        if self.data is None:
+            return None
+        return round(self.data.days.get(dt_util.now().date(), 0.0), 2)
+
+    @property
+    def earned_this_month(self) -> float | None:
+        """Get the earnings for the current month, in Home Assistant's time zone."""
+        if self.data is None:
+            return None
+        today = dt_util.now().date()
+        return round(
+            math.fsum(
+                total
+                for day, total in self.data.days.items()
+                if (day.year, day.month) == (today.year, today.month)
+            ),
+            2,
+        )
+
+    async def _async_update_data(self) -> EarningsTotals:
+        """Add the earnings from readings since the last update."""
+        totals = self.data or EarningsTotals()
+        now = dt_util.utcnow()
+        month_start = dt_util.start_of_local_day(dt_util.now().date().replace(day=1))
+        since = totals.until or month_start
+
+        try:
+            readings = await self._meter.fetch_readings(since, now)
+            rates = await self._async_get_rates(readings)
+        except Exception as err:  # pylint: disable=broad-except
+            raise UpdateFailed(err) from err
+
+        # Slots with readings but no rates yet are fetched again next time
+        until = min(readings.end_slot, rates.end_slot) if readings and rates else None
+        if until is None or until <= slot_of(since):
+            return totals
+
+        days = dict(totals.days)
+        for day, earned in earnings_by_day(
+            readings.slice_slots(slot_of(since), until), rates
+        ).items():
+            days[day] = days.get(day, 0.0) + earned
+
+        previous_month = (month_start - timedelta(days=1)).date().replace(day=1)
+        updated = EarningsTotals(
+            slot_start(until),
+            {day: total for day, total in days.items() if day >= previous_month},
+        )
+        await self._cache.async_save_earnings(updated)
+        return updated
+
+    async def _async_get_rates(self, readings: RateSeries) -> RateSeries:
+        """Get rates for the slots read, fetching any too old to still be held."""
+        rates = self._tariff_coordinator.rates
+        tariff = self._tariff_coordinator.tariff
+        if (
+            not readings
+            or tariff is None
+            or (rates and rates.start_slot <= readings.start_slot)
+        ):
+            return rates
+
+        history_end = rates.start_slot if rates else readings.end_slot
+        async for _, chunk in tariff.iter_history(
+            slot_start(readings.start_slot), slot_start(history_end)
+        ):
+            rates = chunk.merge(rates)
+        return rates
@@ -1,15 +1,32 @@
 """Home Assistant entity descriptions."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import OctopusTariffUpdateCoordinator
 from .const import CONF_REGION, DOMAIN
+from .coordinator import OctopusTariffUpdateCoordinator
+from .earnings import EarningsCoordinator
 from .octopus_api import DNO_REGIONS
+from .slot_clock import async_get_slot_clock
 
 
 class OctopusAgileTariffEntity(CoordinatorEntity[OctopusTariffUpdateCoordinator]):
-    """An entity associated with a "tariff" device."""
+    """
+    An entity associated with a "tariff" device.
+
+    Entities whose state depends on the current slot set _tracks_slots, and are then
+    updated by the shared slot clock. State is only written at a slot boundary when
+    the slot-dependent state has actually changed.
+    """
+
+    _tracks_slots = False
+    _last_slot_state: Any = None
 
     def __init__(
         self, coordinator: OctopusTariffUpdateCoordinator, config_entry: ConfigEntry
@@ -21,13 +38,68 @@ class OctopusAgileTariffEntity(CoordinatorEntity[OctopusTariffUpdateCoordinator]
     @property
     def device_info(self) -> DeviceInfo:
         """Tariff device information for the entity."""
+        return _tariff_device_info(self.config_entry)
+
+    async def async_added_to_hass(self) -> None:
+        """Run when the entity is added to hass."""
+        await super().async_added_to_hass()
+        if self._tracks_slots:
+            self._last_slot_state = self._slot_state()
+            self.async_on_remove(
+                async_get_slot_clock(self.hass).async_subscribe(
+                    self._async_slot_started
+                )
+            )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._last_slot_state = self._slot_state()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_slot_started(self, _slot_start: datetime) -> None:
+        """Write state if the start of a new slot has changed it."""
+        self._async_write_if_changed()
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write state if the slot-dependent parts of it have changed."""
+        state = self._slot_state()
+        if state == self._last_slot_state:
+            return
+        self._last_slot_state = state
+        self.async_write_ha_state()
+
+    def _slot_state(self) -> Any:
+        """Get the parts of the entity's state that may change between slots."""
+        return (self.state, self.extra_state_attributes)
+
+
+class OctopusExportEarningsEntity(CoordinatorEntity[EarningsCoordinator]):
+    """An entity reporting export earnings, associated with the "tariff" device."""
+
+    def __init__(
+        self, coordinator: EarningsCoordinator, config_entry: ConfigEntry
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Tariff device information for the entity."""
+        return _tariff_device_info(self.config_entry)
+
 
-        region_code = self.config_entry.data[CONF_REGION]
-        region_name = DNO_REGIONS[region_code]
+def _tariff_device_info(config_entry: ConfigEntry) -> DeviceInfo:
+    """Get information about the "tariff" device for a config entry."""
+    region_code = config_entry.data[CONF_REGION]
+    region_name = DNO_REGIONS[region_code]
 
-        return DeviceInfo(
-            identifiers={(DOMAIN, f"agile-export-{region_code}")},
-            name="Octopus Agile Tariff",
-            model=region_name,
-            manufacturer="Octopus Energy",
-        )
+    return DeviceInfo(
+        identifiers={(DOMAIN, f"agile-export-{region_code}")},
+        name="Octopus Agile Tariff",
+        model=region_name,
+        manufacturer="Octopus Energy",
+    )
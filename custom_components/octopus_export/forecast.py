@@ -0,0 +1,140 @@
+"""Forecasts of rates beyond those published, from the rates held."""
+from __future__ import annotations
+
+from array import array
+import math
+from zoneinfo import ZoneInfo
+
+from .rate_series import SLOT_SECONDS, RateSeries, slot_start
+
+SLOTS_PER_DAY = 48
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+
+# Agile rates follow the UK's day, so slots are matched by their UK local time
+_UK = ZoneInfo("Europe/London")
+
+# The most recent rates, which set the level of the forecast
+_LEVEL_SLOTS = SLOTS_PER_WEEK
+
+
+def _offset_slots(slot: int) -> int:
+    """Get the UK's offset from UTC at the start of a slot, in slots."""
+    offset = slot_start(slot).astimezone(_UK).utcoffset()
+    return int(offset.total_seconds()) // SLOT_SECONDS if offset else 0
+
+
+def _offset_runs(start_slot: int, end_slot: int) -> list[tuple[int, int, int]]:
+    """
+    Split a range of slots into runs with the same UK offset from UTC.
+
+    Each run is given as (first slot, end slot, offset in slots). The offset changes
+    at most once a day, so it is only looked up a day at a time, except on the days
+    the clocks change.
+    """
+    runs: list[tuple[int, int, int]] = []
+    run_start = slot = start_slot
+    offset = _offset_slots(start_slot)
+    while slot < end_slot:
+        step_end = min(slot + SLOTS_PER_DAY, end_slot)
+        if _offset_slots(step_end - 1) == offset:
+            slot = step_end
+            continue
+        slot = next(s for s in range(slot, step_end) if _offset_slots(s) != offset)
+        runs.append((run_start, slot, offset))
+        run_start = slot
+        offset = _offset_slots(slot)
+    if run_start < end_slot:
+        runs.append((run_start, end_slot, offset))
+    return runs
+
+
+class SeasonalRateModel:
+    """
+    Forecasts rates from the average rate for each half hour of the week.
+
+    Half hours of the week missing from the history fall back to the average for
+    the same half hour of any day. The whole profile is shifted by how far the most
+    recent week's rates have strayed from it.
+
+    Fitting works on strided slices of the rate array, one per half hour of the
+    week, so its cost in Python grows with the number of clock changes rather than
+    the number of slots. Forecasting only slices and repeats the fitted profile.
+    """
+
+    __slots__ = ("fitted_until", "level", "_profile")
+
+    def __init__(self, fitted_until: int, level: float, profile: array[float]) -> None:
+        """Initialize the model with its fitted profile, level already included."""
+        self.fitted_until = fitted_until
+        self.level = level
+        self._profile = profile
+
+    @classmethod
+    def fit(cls, history: RateSeries) -> SeasonalRateModel | None:
+        """Fit a model to the rates held, if there are any."""
+        if not history:
+            return None
+
+        totals = [0.0] * SLOTS_PER_WEEK
+        counts = [0] * SLOTS_PER_WEEK
+        values = history.values
+        for first, end, offset in _offset_runs(history.start_slot, history.end_slot):
+            base = first - history.start_slot
+            length = end - first
+            first_key = first + offset
+            for step in range(min(SLOTS_PER_WEEK, length)):
+                column = values[base + step : base + length : SLOTS_PER_WEEK]
+                total = math.fsum(column)
+                count = len(column)
+                if total != total:
+                    # Only columns with a gap are summed slot by slot
+                    present = [value for value in column if value == value]
+                    total = math.fsum(present)
+                    count = len(present)
+                key = (first_key + step) % SLOTS_PER_WEEK
+                totals[key] += total
+                counts[key] += count
+
+        daily_totals = [0.0] * SLOTS_PER_DAY
+        daily_counts = [0] * SLOTS_PER_DAY
+        for key in range(SLOTS_PER_WEEK):
+            daily_totals[key % SLOTS_PER_DAY] += totals[key]
+            daily_counts[key % SLOTS_PER_DAY] += counts[key]
+        if not sum(daily_counts):
+            return None
+        overall = math.fsum(daily_totals) / sum(daily_counts)
+
+        profile = [
+            totals[key] / counts[key]
+            if counts[key]
+            else daily_totals[key % SLOTS_PER_DAY] / daily_counts[key % SLOTS_PER_DAY]
+            if daily_counts[key % SLOTS_PER_DAY]
+            else overall
+            for key in range(SLOTS_PER_WEEK)
+        ]
+
+        residuals = [
+            value - profile[(slot + offset) % SLOTS_PER_WEEK]
+            for first, end, offset in _offset_runs(
+                max(history.start_slot, history.end_slot - _LEVEL_SLOTS),
+                history.end_slot,
+            )
+            for slot, value in history.slice_slots(first, end).items()
+        ]
+        level = math.fsum(residuals) / len(residuals) if residuals else 0.0
+
+        return cls(
+            history.end_slot,
+            level,
+            array("d", (round(value + level, 4) for value in profile)),
+        )
+
+    def predict(self, start_slot: int, slots: int) -> RateSeries:
+        """Forecast the rates for a number of slots from the given slot."""
+        values = array("d")
+        for first, end, offset in _offset_runs(start_slot, start_slot + slots):
+            key = (first + offset) % SLOTS_PER_WEEK
+            length = end - first
+            week = self._profile[key:] + self._profile[:key]
+            values.extend((week * (length // SLOTS_PER_WEEK + 1))[:length])
+        return RateSeries(start_slot, values)
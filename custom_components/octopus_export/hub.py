@@ -0,0 +1,120 @@
+"""Refreshing of tariffs for several regions together."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_HUB, DOMAIN, LOGGER
+from .scheduler import RefreshScheduler
+
+if TYPE_CHECKING:
+    from .coordinator import OctopusTariffUpdateCoordinator
+
+# Limit on concurrent requests made to the API by a single hub refresh
+MAX_PARALLEL_FETCHES = 4
+
+
+class TariffHub:
+    """
+    Refreshes the tariffs of all member coordinators on one shared schedule.
+
+    Members don't schedule their own refreshes. Instead, the hub refreshes them all
+    concurrently, so the time taken stays close to that of a single request however
+    many regions are configured. Each member then notifies its own entities.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self._hass = hass
+        self._members: list[OctopusTariffUpdateCoordinator] = []
+        self._scheduler = RefreshScheduler()
+        self._job = HassJob(self._async_scheduled_refresh, f"{DOMAIN} hub refresh")
+        self._cancel_refresh: CALLBACK_TYPE | None = None
+        self._refreshing = False
+        self.next_refresh: datetime | None = None
+
+    @callback
+    def async_add(self, coordinator: OctopusTariffUpdateCoordinator) -> None:
+        """Add a coordinator to be refreshed by the hub."""
+        self._members.append(coordinator)
+        coordinator.hub = self
+        self.async_schedule_refresh()
+
+    @callback
+    def async_remove(self, coordinator: OctopusTariffUpdateCoordinator) -> None:
+        """Stop refreshing a coordinator."""
+        if coordinator in self._members:
+            self._members.remove(coordinator)
+        coordinator.hub = None
+        if self._members:
+            self.async_schedule_refresh()
+        else:
+            self._async_cancel()
+
+    @callback
+    def async_schedule_refresh(self) -> None:
+        """Schedule the next refresh for when any member expects new rates."""
+        if self._refreshing:
+            # Scheduled once every member has been refreshed
+            return
+
+        self._async_cancel()
+        now = dt_util.utcnow()
+        ends = [
+            rates_until
+            for member in self._members
+            if (rates_until := member.rates_until) is not None
+        ]
+        rates_until = min(ends) if len(ends) == len(self._members) else None
+        self.next_refresh = self._scheduler.next_refresh(now, rates_until)
+        for member in self._members:
+            member.next_refresh = self.next_refresh
+
+        self._cancel_refresh = async_track_point_in_utc_time(
+            self._hass, self._job, self.next_refresh
+        )
+        LOGGER.debug("Next hub refresh scheduled for %s", self.next_refresh)
+
+    async def async_refresh(self) -> None:
+        """Refresh every member with bounded parallelism."""
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_FETCHES)
+
+        async def refresh(member: OctopusTariffUpdateCoordinator) -> None:
+            async with semaphore:
+                await member.async_refresh()
+
+        self._refreshing = True
+        try:
+            await asyncio.gather(*(refresh(member) for member in list(self._members)))
+        finally:
+            self._refreshing = False
+
+        if self._members:
+            self.async_schedule_refresh()
+
+    async def _async_scheduled_refresh(self, _now: datetime) -> None:
+        """Refresh members when the scheduled time arrives."""
+        self._cancel_refresh = None
+        await self.async_refresh()
+
+    @callback
+    def _async_cancel(self) -> None:
+        """Cancel any scheduled refresh."""
+        if self._cancel_refresh is not None:
+            self._cancel_refresh()
+            self._cancel_refresh = None
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> TariffHub:
+    """Get the tariff hub shared across the integration."""
+    domain_data: dict[str, object] = hass.data.setdefault(DOMAIN, {})
+    hub = domain_data.get(DATA_HUB)
+    if not isinstance(hub, TariffHub):
+        hub = domain_data[DATA_HUB] = TariffHub(hass)
+    return hub
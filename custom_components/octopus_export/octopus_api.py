@@ -1,15 +1,47 @@
 """Octopus Agile API."""
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Any, Literal, TypedDict
-
-from aiohttp import ClientSession
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import hashlib
+import json
+import random
+import time
+from typing import Any, Literal, NotRequired, TypedDict
+
+from aiohttp import BasicAuth, ClientConnectionError, ClientSession
 import async_timeout
 
+from .rate_series import RateSeries, slot_of
+
+# Looked up on each request, so it can be pointed at a local simulator in tests
+API_BASE_URL = "https://api.octopus.energy/v1"
+
 _HEADERS = {"Content-type": "application/json; charset=UTF-8"}
 _TIMEOUT = 10
 
-AgileRates = dict[str, float]
+# Retries of failed requests, with jittered exponential backoff
+_MAX_ATTEMPTS = 4
+_INITIAL_BACKOFF = 1.0
+_MAX_BACKOFF = 30.0
+
+# Requests are limited to a sustained rate, allowing short bursts
+_REQUESTS_PER_SECOND = 2.0
+_REQUEST_BURST = 10
+
+# Number of URLs whose responses are kept for conditional requests
+_MAX_VALIDATORS = 32
+
+# Upper bounds, in seconds, of the buckets counting request latencies
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Long periods of history are fetched a week at a time, which fits on one page
+_HISTORY_CHUNK = timedelta(days=7)
+_HISTORY_PAGE_SIZE = 1500
 
 DNO_REGIONS = {
     "A": "Eastern England",
@@ -31,11 +63,17 @@ DNO_REGIONS = {
 
 @dataclass
 class OctopusProduct:
-    """An Octopus Energy product."""
+    """
+    An Octopus Energy product.
+
+    An export product is paired with the import product it is usually taken with,
+    if one is available.
+    """
 
     code: str
     name: str
     tariff_codes: dict[str, str]
+    paired_import: OctopusProduct | None = None
 
 
 class JSONProduct(TypedDict):
@@ -44,6 +82,10 @@ class JSONProduct(TypedDict):
     code: str
     direction: Literal["IMPORT", "EXPORT"]
     display_name: str
+    brand: NotRequired[str]
+    is_business: NotRequired[bool]
+    is_restricted: NotRequired[bool]
+    available_from: NotRequired[str | None]
 
 
 class JSONProductsRespone(TypedDict):
@@ -74,34 +116,313 @@ class ProductDiscoveryException(Exception):
     """An error locating product or tariff information."""
 
 
+class RetryableResponseError(Exception):
+    """A response indicating that the request may succeed if repeated."""
+
+    def __init__(self, status: int, retry_after: float | None) -> None:
+        """Initialize the error."""
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class EndpointStats:
+    """
+    Counters describing the requests made to an API endpoint.
+
+    Each attempt's latency is counted in the first bucket whose upper bound, in
+    seconds, it falls within, or in a final bucket for anything slower.
+    """
+
+    requests: int = 0
+    attempts: int = 0
+    failures: int = 0
+    coalesced: int = 0
+    not_modified: int = 0
+    bytes_received: int = 0
+    total_latency: float = 0.0
+    last_latency: float | None = None
+    latency_buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    @property
+    def retries(self) -> int:
+        """Get the number of attempts that repeated a failed one."""
+        return self.attempts - self.requests
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Get the fraction of requests answered without a new response body."""
+        if not self.requests + self.coalesced:
+            return None
+        return (self.not_modified + self.coalesced) / (self.requests + self.coalesced)
+
+    def record_latency(self, latency: float) -> None:
+        """Count the latency of an attempt."""
+        self.last_latency = latency
+        self.total_latency += latency
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+
+@dataclass
+class _Validators:
+    """A previous response, with the details needed to revalidate it."""
+
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    data: Any
+
+
+class TokenBucket:
+    """Limits the rate of requests, allowing short bursts."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """Initialize a full bucket."""
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def async_acquire(self) -> None:
+        """Wait until a request may be made."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
+class OctopusApiClient:
+    """
+    Makes requests to the Octopus API, shared by everything in the integration.
+
+    Failed requests are retried with jittered exponential backoff, honouring any
+    Retry-After header. All requests pass through a single rate limiter, and
+    concurrent requests for the same URL share one response.
+
+    Responses are revalidated using ETag and Last-Modified headers, and the body
+    hash, so an unchanged response isn't decoded again.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        rate_limiter: TokenBucket | None = None,
+        max_attempts: int = _MAX_ATTEMPTS,
+    ) -> None:
+        """Initialize the client."""
+        self._session = session
+        self._rate_limiter = rate_limiter or TokenBucket(
+            _REQUESTS_PER_SECOND, _REQUEST_BURST
+        )
+        self._max_attempts = max_attempts
+        self._in_flight: dict[
+            tuple[str, BasicAuth | None], asyncio.Future[tuple[Any, bool]]
+        ] = {}
+        self._validators: dict[str, _Validators] = {}
+        self.stats: dict[str, EndpointStats] = {}
+
+    async def async_get_json(
+        self, url: str, endpoint: str, auth: BasicAuth | None = None
+    ) -> Any:
+        """
+        Get the JSON response from a URL.
+
+        The endpoint names the kind of request, and is used to group statistics.
+        Requests for account data are authenticated with the account's API key.
+        """
+        data, _ = await self.async_get_json_if_modified(url, endpoint, auth)
+        return data
+
+    async def async_get_json_if_modified(
+        self, url: str, endpoint: str, auth: BasicAuth | None = None
+    ) -> tuple[Any, bool]:
+        """
+        Get the JSON response from a URL, and whether it has changed.
+
+        When the response is unchanged since the last request for the URL, the
+        previously decoded response is returned.
+        """
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        key = (url, auth)
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._async_get_with_retries(url, stats, auth)
+            )
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            stats.coalesced += 1
+
+        # Shield the shared request, so one caller giving up doesn't cancel others
+        return await asyncio.shield(future)
+
+    async def _async_get_with_retries(
+        self, url: str, stats: EndpointStats, auth: BasicAuth | None
+    ) -> tuple[Any, bool]:
+        """Make a request, retrying failures that may be temporary."""
+        stats.requests += 1
+        attempt = 1
+        while True:
+            await self._rate_limiter.async_acquire()
+            stats.attempts += 1
+            start = time.monotonic()
+            try:
+                result = await self._async_get(url, stats, auth)
+            except (
+                asyncio.TimeoutError,
+                ClientConnectionError,
+                RetryableResponseError,
+            ) as err:
+                stats.record_latency(time.monotonic() - start)
+                if attempt >= self._max_attempts:
+                    stats.failures += 1
+                    raise
+
+                delay = random.uniform(
+                    0, min(_MAX_BACKOFF, _INITIAL_BACKOFF * (1 << attempt))
+                )
+                if isinstance(err, RetryableResponseError) and err.retry_after:
+                    delay = min(err.retry_after, _MAX_BACKOFF)
+                attempt += 1
+                await asyncio.sleep(delay)
+            except Exception:
+                stats.failures += 1
+                raise
+            else:
+                stats.record_latency(time.monotonic() - start)
+                if not result[1]:
+                    stats.not_modified += 1
+                return result
+
+    async def _async_get(
+        self, url: str, stats: EndpointStats, auth: BasicAuth | None
+    ) -> tuple[Any, bool]:
+        """Make a single request, revalidating any previous response."""
+        previous = self._validators.get(url)
+        headers = dict(_HEADERS)
+        if previous is not None:
+            if previous.etag is not None:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified is not None:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        async with async_timeout.timeout(_TIMEOUT):
+            response = await self._session.get(url, headers=headers, auth=auth)
+            if response.status == 304 and previous is not None:
+                return previous.data, False
+            if response.status == 429 or response.status >= 500:
+                raise RetryableResponseError(
+                    response.status,
+                    _parse_retry_after(response.headers.get("Retry-After")),
+                )
+            response.raise_for_status()
+            body = await response.read()
+        stats.bytes_received += len(body)
+
+        digest = hashlib.sha256(body).hexdigest()
+        if previous is not None and digest == previous.digest:
+            data, changed = previous.data, False
+        else:
+            data, changed = json.loads(body), True
+
+        # Keep only the most recently used URLs
+        self._validators.pop(url, None)
+        if len(self._validators) >= _MAX_VALIDATORS:
+            del self._validators[next(iter(self._validators))]
+        self._validators[url] = _Validators(
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            digest,
+            data,
+        )
+        return data, changed
+
+
 class ProductService:
     """Provides access to product and tariff metadata."""
 
-    def __init__(self, session: ClientSession) -> None:
+    def __init__(self, client: OctopusApiClient) -> None:
         """Initialize the product data service."""
-        self._session = session
-
-    async def async_get_export_product(self) -> OctopusProduct:
-        """Get the string that identifies the currently available Agile Export tariff."""
-        product_data: JSONProductsRespone = await _async_call_api(
-            self._session, "https://api.octopus.energy/v1/products/?is_variable=true"
+        self._client = client
+
+    async def async_get_export_product(
+        self, current: OctopusProduct | None = None, with_import: bool = False
+    ) -> OctopusProduct:
+        """
+        Get the currently available Agile Export product.
+
+        If the list of products hasn't changed since the current product was found,
+        the current product is returned without fetching its details again. With
+        with_import, the current Agile import product is found too, and paired with
+        the export product.
+        """
+        product_data: JSONProductsRespone
+        product_data, changed = await self._client.async_get_json_if_modified(
+            f"{API_BASE_URL}/products/?is_variable=true", "products"
         )
 
-        export_product_data = next(
-            filter(
-                lambda product: product["direction"] == "EXPORT",
-                product_data["results"],
-            ),
-            None,
+        results = product_data["results"]
+        export_product_data = max(
+            filter(is_agile_export_product, results), key=_available_from, default=None
+        )
+        import_product_data = (
+            max(
+                filter(is_agile_import_product, results),
+                key=_available_from,
+                default=None,
+            )
+            if with_import
+            else None
         )
 
         if export_product_data is None:
             raise ProductDiscoveryException()
+        product_codes = [export_product_data["code"]]
+        if import_product_data is not None:
+            product_codes.append(import_product_data["code"])
+        if (
+            not changed
+            and current is not None
+            and [current.code]
+            + ([current.paired_import.code] if current.paired_import else [])
+            == product_codes
+        ):
+            return current
+
+        # The paired product's details are fetched alongside the export product's
+        tariff_codes = await asyncio.gather(
+            *(self._async_get_tariff_codes(code) for code in product_codes)
+        )
+        paired_import = None
+        if import_product_data is not None:
+            paired_import = OctopusProduct(
+                import_product_data["code"],
+                import_product_data["display_name"],
+                tariff_codes[1],
+            )
+        return OctopusProduct(
+            export_product_data["code"],
+            export_product_data["display_name"],
+            tariff_codes[0],
+            paired_import,
+        )
 
-        product_code = export_product_data["code"]
-        tariff_data: JSONProductResponse = await _async_call_api(
-            self._session,
-            f"https://api.octopus.energy/v1/products/{product_code}/",
+    async def _async_get_tariff_codes(self, product_code: str) -> dict[str, str]:
+        """Get the code of a product's tariff in each region."""
+        tariff_data: JSONProductResponse = await self._client.async_get_json(
+            f"{API_BASE_URL}/products/{product_code}/", "product"
         )
 
         electricity_tariffs = tariff_data["single_register_electricity_tariffs"]
@@ -110,10 +431,40 @@ class ProductService:
             tariffs[region_code] = electricity_tariffs[f"_{region_code}"][
                 "direct_debit_monthly"
             ]["code"]
+        return tariffs
 
-        return OctopusProduct(
-            export_product_data["code"], export_product_data["display_name"], tariffs
-        )
+
+def is_agile_export_product(product: JSONProduct) -> bool:
+    """
+    Check whether a product is Agile Outgoing, for domestic customers.
+
+    Other export products, such as fixed rate Outgoing and business versions of
+    Agile, are listed alongside it, in no particular order.
+    """
+    return product["direction"] == "EXPORT" and _is_domestic_agile(product)
+
+
+def is_agile_import_product(product: JSONProduct) -> bool:
+    """Check whether a product is Agile Octopus import, for domestic customers."""
+    return product["direction"] == "IMPORT" and _is_domestic_agile(product)
+
+
+def _is_domestic_agile(product: JSONProduct) -> bool:
+    """Check whether a product is a version of Agile open to domestic customers."""
+    return (
+        product["code"].startswith("AGILE-")
+        and product.get("brand", "OCTOPUS_ENERGY") == "OCTOPUS_ENERGY"
+        and not product.get("is_business", False)
+        and not product.get("is_restricted", False)
+    )
+
+
+def _available_from(product: JSONProduct) -> datetime:
+    """Get when a product was launched, so the newest version can be chosen."""
+    available_from = product.get("available_from")
+    if available_from is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(available_from.replace("Z", "+00:00"))
 
 
 class AgileTariff:
@@ -123,31 +474,224 @@ class AgileTariff:
     A tariff represents the rates assigned to a product within a given DNO region.
     """
 
-    def __init__(self, session: ClientSession, product: str, tariff: str) -> None:
-        """Initialize the tariff for fething data."""
-        self._session = session
+    def __init__(
+        self,
+        client: OctopusApiClient,
+        product: str,
+        tariff: str,
+        paired: AgileTariff | None = None,
+    ) -> None:
+        """Initialize the tariff for fething data, with any paired import tariff."""
+        self._client = client
         self.product = product
         self.tariff = tariff
+        self.paired = paired
+
+    @classmethod
+    def for_region(
+        cls,
+        client: OctopusApiClient,
+        product: OctopusProduct,
+        region_code: str,
+        with_import: bool = False,
+    ) -> AgileTariff:
+        """Get a product's tariff for a region, paired with its import tariff if asked."""
+        paired = None
+        if with_import and product.paired_import is not None:
+            paired = cls(
+                client,
+                product.paired_import.code,
+                product.paired_import.tariff_codes[region_code],
+            )
+        return cls(client, product.code, product.tariff_codes[region_code], paired)
+
+    async def fetch_data(
+        self, period_from: datetime | None = None, period_to: datetime | None = None
+    ) -> RateSeries:
+        """
+        Fetch data from the Octopus API.
+
+        Without a period, only the first page of the most recent rates is returned.
+        When either end of a period is specified, every page of results is followed,
+        so callers should bound the period to keep the number of requests finite.
+        Each request is subject to its own timeout.
+        """
+        rates, _ = await self._async_fetch(period_from, period_to)
+        return rates
+
+    async def fetch_data_if_modified(
+        self, period_from: datetime | None = None, period_to: datetime | None = None
+    ) -> RateSeries | None:
+        """
+        Fetch data as fetch_data does, unless it is unchanged since the last request.
+
+        Nothing is returned if every page is unchanged, avoiding parsing it again.
+        """
+        rates, changed = await self._async_fetch(period_from, period_to)
+        return rates if changed else None
+
+    async def fetch_pair_if_modified(
+        self, period_from: datetime, period_to: datetime
+    ) -> tuple[RateSeries | None, RateSeries | None]:
+        """
+        Fetch this tariff's rates and the paired tariff's together, for one period.
+
+        The two are requested concurrently, and either is left out if unchanged, as
+        fetch_data_if_modified does. Without a paired tariff, its rates are None.
+        """
+        if self.paired is None:
+            return await self.fetch_data_if_modified(period_from, period_to), None
+        own, paired = await asyncio.gather(
+            self.fetch_data_if_modified(period_from, period_to),
+            self.paired.fetch_data_if_modified(period_from, period_to),
+        )
+        return own, paired
+
+    async def iter_history(
+        self, period_from: datetime, period_to: datetime
+    ) -> AsyncIterator[tuple[datetime, RateSeries]]:
+        """
+        Fetch rates for a long period, a week at a time, oldest first.
+
+        Each week's rates are yielded along with the end of the week. Only one week of
+        rates is held at once, however long the period. History bypasses the
+        conditional request cache, which is kept for recent rates.
+        """
+        chunk_from = period_from
+        while chunk_from < period_to:
+            chunk_to = min(chunk_from + _HISTORY_CHUNK, period_to)
+            rates, _ = await self._async_fetch(
+                chunk_from, chunk_to, page_size=_HISTORY_PAGE_SIZE, conditional=False
+            )
+            yield chunk_to, rates
+            chunk_from = chunk_to
+
+    async def _async_fetch(
+        self,
+        period_from: datetime | None,
+        period_to: datetime | None,
+        page_size: int | None = None,
+        conditional: bool = True,
+    ) -> tuple[RateSeries, bool]:
+        """Fetch pages of rates, returning them and whether any page changed."""
+        url = (
+            f"{API_BASE_URL}/products/{self.product}"
+            + f"/electricity-tariffs/{self.tariff}/standard-unit-rates"
+        )
+        params = []
+        if period_from is not None:
+            params.append(f"period_from={_format_timestamp(period_from)}")
+        if period_to is not None:
+            params.append(f"period_to={_format_timestamp(period_to)}")
+        follow_pages = bool(params)
+        if page_size is not None:
+            params.append(f"page_size={page_size}")
+        if params:
+            url += "?" + "&".join(params)
+
+        # Conditional pages are only parsed once it's known that one has changed,
+        # while others are parsed as they arrive
+        pages = []
+        by_slot: dict[int, float] = {}
+        changed = not conditional
+        next_url: str | None = url
+        while next_url is not None:
+            if conditional:
+                api_data, page_changed = await self._client.async_get_json_if_modified(
+                    next_url, "standard-unit-rates"
+                )
+                pages.append(api_data)
+                changed = changed or page_changed
+            else:
+                api_data = await self._client.async_get_json(
+                    next_url, "standard-unit-rates"
+                )
+                _parse_rates(api_data, by_slot)
+            next_url = api_data.get("next") if follow_pages else None
+
+        if not changed:
+            return RateSeries(), False
+
+        for api_data in pages:
+            _parse_rates(api_data, by_slot)
+        return RateSeries.from_slots(by_slot), True
+
+
+class ExportMeter:
+    """
+    An export meter, whose half-hourly readings are available to its account.
+
+    Readings need the account's API key, and usually appear a day or so late.
+    """
 
-    async def fetch_data(self) -> AgileRates:
-        """Fetch data from the Octopus API."""
-        api_data = await _async_call_api(
-            self._session,
-            f"https://api.octopus.energy/v1/products/{self.product}"
-            + f"/electricity-tariffs/{self.tariff}/standard-unit-rates",
+    def __init__(
+        self,
+        client: OctopusApiClient,
+        mpan: str,
+        serial_number: str,
+        api_key: str,
+    ) -> None:
+        """Initialize the meter."""
+        self._client = client
+        self._auth = BasicAuth(api_key)
+        self._path = f"/electricity-meter-points/{mpan}/meters/{serial_number}"
+
+    async def fetch_readings(
+        self, period_from: datetime, period_to: datetime
+    ) -> RateSeries:
+        """Fetch the energy exported in each slot of a period, in kWh."""
+        params = [
+            f"period_from={_format_timestamp(period_from)}",
+            f"period_to={_format_timestamp(period_to)}",
+            "order_by=period",
+            f"page_size={_HISTORY_PAGE_SIZE}",
+        ]
+        by_slot: dict[int, float] = {}
+        next_url: str | None = f"{API_BASE_URL}{self._path}/consumption/?" + "&".join(
+            params
         )
-        return {
-            entry["valid_from"]: round(entry["value_inc_vat"] / 100, 4)
-            for entry in api_data["results"]
-        }
-
-
-async def _async_call_api(session: ClientSession, url: str) -> Any:
-    """Make an API call to the specified URL, returning the response as a JSON object."""
-    async with async_timeout.timeout(_TIMEOUT):
-        response = await session.get(url, headers=_HEADERS)
-        response.raise_for_status()
-        return await response.json()
+        while next_url is not None:
+            api_data = await self._client.async_get_json(
+                next_url, "consumption", self._auth
+            )
+            for entry in api_data["results"]:
+                slot = slot_of(_parse_timestamp(entry["interval_start"]))
+                by_slot[slot] = float(entry["consumption"])
+            next_url = api_data.get("next")
+
+        return RateSeries.from_slots(by_slot)
+
+
+def _parse_rates(api_data: dict[str, Any], by_slot: dict[int, float]) -> None:
+    """Add the rates from a page of results to a mapping of slot number to rate."""
+    for entry in api_data["results"]:
+        slot = slot_of(_parse_timestamp(entry["valid_from"]))
+        by_slot[slot] = round(entry["value_inc_vat"] / 100, 4)
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header, given either in seconds or as a date."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_timestamp(timestamp: datetime) -> str:
+    """Format a timestamp in the UTC form used by the Octopus API."""
+    return timestamp.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_timestamp(timestamp: str) -> datetime:
+    """Parse a timestamp returned by the Octopus API."""
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
 
 
 def get_start_of_current_interval() -> datetime:
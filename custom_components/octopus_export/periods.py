@@ -0,0 +1,131 @@
+"""Notable periods of rates, indexed by start time for range queries."""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from operator import attrgetter
+
+from homeassistant.util import dt as dt_util
+
+from .rate_series import RateSeries, slot_of, slot_start
+from .windows import find_contiguous_window
+
+PEAK_WINDOW = "Peak export window"
+LOWEST_WINDOW = "Lowest export window"
+
+
+@dataclass(frozen=True)
+class RatePeriod:
+    """A run of slots within [start_slot, end_slot), and what makes it notable."""
+
+    start_slot: int
+    end_slot: int
+    summary: str
+    description: str | None = None
+
+    @property
+    def start(self) -> datetime:
+        """Get the start of the first slot."""
+        return slot_start(self.start_slot)
+
+    @property
+    def end(self) -> datetime:
+        """Get the end of the last slot."""
+        return slot_start(self.end_slot)
+
+
+class PeriodIndex:
+    """
+    Periods sorted by their first slot, for finding those that overlap a range.
+
+    A period overlapping a range starts before the range ends, and no longer before
+    it starts than the longest period lasts. So two bisections bound the periods
+    to check, and a query never scans the rates, or periods far outside the range.
+    """
+
+    def __init__(self, periods: Iterable[RatePeriod]) -> None:
+        """Sort the periods."""
+        self.periods = sorted(periods, key=attrgetter("start_slot", "end_slot"))
+        self._starts = [period.start_slot for period in self.periods]
+        self._longest = max(
+            (period.end_slot - period.start_slot for period in self.periods),
+            default=0,
+        )
+
+    def __len__(self) -> int:
+        """Get the number of periods."""
+        return len(self.periods)
+
+    def overlapping(self, start_slot: int, end_slot: int) -> list[RatePeriod]:
+        """Get the periods overlapping [start_slot, end_slot), in order of start."""
+        first = bisect_right(self._starts, start_slot - self._longest)
+        last = bisect_left(self._starts, end_slot)
+        return [
+            period
+            for period in self.periods[first:last]
+            if period.end_slot > start_slot
+        ]
+
+    def current_or_next(self, slot: int) -> RatePeriod | None:
+        """Get the earliest period in progress in a slot, or else the next to start."""
+        if current := self.overlapping(slot, slot + 1):
+            return current[0]
+        index = bisect_left(self._starts, slot)
+        return self.periods[index] if index < len(self.periods) else None
+
+
+def _local_days(rates: RateSeries) -> Iterable[tuple[int, int]]:
+    """Get the slots at which each local day covered by the rates starts and ends."""
+    if not rates:
+        return
+    day = dt_util.as_local(slot_start(rates.start_slot)).date()
+    last_day = dt_util.as_local(slot_start(rates.end_slot - 1)).date()
+    day_start = slot_of(dt_util.start_of_local_day(day))
+    while day <= last_day:
+        day += timedelta(days=1)
+        day_end = slot_of(dt_util.start_of_local_day(day))
+        yield day_start, day_end
+        day_start = day_end
+
+
+def find_daily_windows(rates: RateSeries, length: int) -> list[RatePeriod]:
+    """Find the best-paying and the cheapest run of slots within each local day."""
+    periods: list[RatePeriod] = []
+    for day_start, day_end in _local_days(rates):
+        for summary, highest in ((PEAK_WINDOW, True), (LOWEST_WINDOW, False)):
+            window = find_contiguous_window(rates, length, day_start, day_end, highest)
+            if window is not None:
+                periods.append(
+                    RatePeriod(
+                        window.slots[0],
+                        window.slots[-1] + 1,
+                        summary,
+                        f"Average rate £{window.average:.4f}/kWh",
+                    )
+                )
+    return periods
+
+
+def find_runs_above(rates: RateSeries, threshold: float) -> list[RatePeriod]:
+    """
+    Find every run of slots with rates above a threshold.
+
+    Comparing the rates with the threshold is a single pass in C, and each run is
+    then found by searching the result for its ends. Gaps end a run.
+    """
+    # Comparisons with NaN are false, so gaps are never above
+    above = bytes(map(threshold.__lt__, rates.values))
+    summary = f"Export rate above £{threshold:g}"
+    periods: list[RatePeriod] = []
+    start = above.find(1)
+    while start >= 0:
+        end = above.find(0, start)
+        if end < 0:
+            end = len(above)
+        periods.append(
+            RatePeriod(rates.start_slot + start, rates.start_slot + end, summary)
+        )
+        start = above.find(1, end)
+    return periods
@@ -0,0 +1,235 @@
+"""Plans when a home battery should charge, hold or export, against export rates."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from enum import Enum
+import math
+from operator import neg
+
+from .rate_series import RateSeries
+
+# The energy in one step of the state of charge, in kWh
+SOC_STEP = 0.01
+
+# A slot is half an hour, so a battery moves half its power in kW each slot
+_HOURS_PER_SLOT = 0.5
+
+
+class BatteryAction(str, Enum):
+    """What a battery does during a slot."""
+
+    CHARGE = "charge"
+    HOLD = "hold"
+    EXPORT = "export"
+
+
+@dataclass(frozen=True)
+class BatterySpec:
+    """
+    The limits of a home battery, in kWh and kW.
+
+    Efficiency is the fraction of the energy taken from the battery that reaches
+    the grid. The reserve is never exported.
+    """
+
+    capacity: float
+    charge_power: float
+    discharge_power: float
+    efficiency: float
+    reserve: float
+
+
+@dataclass(frozen=True)
+class DispatchPlan:
+    """
+    A schedule for a battery, one entry per slot from the first.
+
+    Energy is that stored in the battery during each slot, in kWh, and is negative
+    while exporting. The state of charge is given at the start of each slot, and at
+    the end of the last. The value is what the exports earn, less the export given
+    up to charge.
+    """
+
+    start_slot: int
+    energy: array[float]
+    soc: array[float]
+    value: float
+
+    def __len__(self) -> int:
+        """Get the number of slots planned."""
+        return len(self.energy)
+
+    def action(self, index: int) -> BatteryAction:
+        """Get what the battery does in a slot of the plan."""
+        energy = self.energy[index]
+        if energy > 0:
+            return BatteryAction.CHARGE
+        if energy < 0:
+            return BatteryAction.EXPORT
+        return BatteryAction.HOLD
+
+    def next_export(self) -> int | None:
+        """Get the first slot in which the battery exports, if there is one."""
+        return next(
+            (
+                self.start_slot + index
+                for index, energy in enumerate(self.energy)
+                if energy < 0
+            ),
+            None,
+        )
+
+
+class DispatchPlanner:
+    """
+    Plans a battery's dispatch with a dynamic program over slots and charge levels.
+
+    Charging is assumed to use surplus that would otherwise be exported, so it
+    costs the export rate of its slot. Energy left at the end of the rates is worth
+    nothing.
+
+    The value of the energy held is concave in the level of charge, so each slot's
+    best move from any level is to head for one of two levels: the one that charging
+    can't improve on, and the one that exporting can't improve on. The program is
+    solved backwards from the last slot, keeping only these two levels per slot.
+    Each step searches and splices the increments of the value function, which stay
+    sorted without any arithmetic on them, so a step costs little more than copying
+    a list of the levels.
+
+    The table covers every slot from the first planned to the end of the rates. It
+    is kept until the rates change, so planning from a later slot, or from another
+    state of charge, only replays the table forwards.
+    """
+
+    def __init__(self, spec: BatterySpec, step: float = SOC_STEP) -> None:
+        """Initialize the planner for a battery."""
+        self.spec = spec
+        self._step = step
+        self._levels = max(0, math.floor((spec.capacity - spec.reserve) / step + 1e-9))
+        self._charge_steps = math.floor(
+            spec.charge_power * _HOURS_PER_SLOT / step + 1e-9
+        )
+        self._export_steps = math.floor(
+            spec.discharge_power * _HOURS_PER_SLOT / step + 1e-9
+        )
+        self.solves = 0
+        self._table_start = 0
+        self._prices = array("d")
+        self._charge_to = array("l")
+        self._export_to = array("l")
+        self._last_plan: tuple[int, int, DispatchPlan] | None = None
+
+    def plan(
+        self, rates: RateSeries, start_slot: int, soc: float | None
+    ) -> DispatchPlan:
+        """
+        Plan from a slot to the end of the rates, given the charge at its start.
+
+        Without a state of charge, the battery is assumed to be at its reserve. Slots
+        without a rate are spent holding.
+        """
+        span = rates.slice_slots(start_slot, rates.end_slot)
+        prices = span.values
+        if span and span.start_slot > start_slot:
+            prices = array("d", [math.nan]) * (span.start_slot - start_slot) + prices
+        if not self._covers(start_slot, prices):
+            self._solve(start_slot, prices)
+
+        level = self._level(soc)
+        if self._last_plan is not None and self._last_plan[:2] == (start_slot, level):
+            return self._last_plan[2]
+        plan = self._replay(start_slot, level)
+        self._last_plan = (start_slot, level, plan)
+        return plan
+
+    def _level(self, soc: float | None) -> int:
+        """Get the nearest level to a state of charge, in kWh."""
+        if soc is None:
+            return 0
+        level = round((soc - self.spec.reserve) / self._step)
+        return min(max(level, 0), self._levels)
+
+    def _covers(self, start_slot: int, prices: array[float]) -> bool:
+        """Check whether the table already holds a plan for these rates."""
+        offset = start_slot - self._table_start
+        return (
+            offset >= 0
+            and len(self._prices) - offset == len(prices)
+            and self._prices[offset:].tobytes() == prices.tobytes()
+        )
+
+    def _solve(self, start_slot: int, prices: array[float]) -> None:
+        """Build the table, working backwards from the last slot."""
+        levels = self._levels
+        charge_steps = self._charge_steps
+        export_steps = self._export_steps
+        efficiency = self.spec.efficiency
+        slots = len(prices)
+        charge_to = array("l", [0]) * slots
+        export_to = array("l", [levels]) * slots
+
+        # Increments in the value of each extra level held, which never increase
+        increments = [0.0] * levels
+        for index in range(slots - 1, -1, -1):
+            price = prices[index]
+            if price != price:
+                continue
+            # Exporting at a negative rate is never worthwhile, and charging
+            # instead is treated as free
+            cost = max(price, 0.0) * self._step
+            gain = cost * efficiency
+            # Charge up to the last level worth more than its cost, and export down
+            # to the first level worth less than it earns
+            charge = bisect_left(increments, -cost, key=neg)
+            export = bisect_right(increments, -gain, key=neg)
+            charge_to[index] = charge
+            export_to[index] = export
+            increments = (
+                increments[charge_steps:charge]
+                + [cost] * min(charge, charge_steps)
+                + increments[charge:export]
+                + [gain] * min(export_steps, levels - export)
+                + increments[export : max(export, levels - export_steps)]
+            )
+
+        self.solves += 1
+        self._table_start = start_slot
+        self._prices = prices
+        self._charge_to = charge_to
+        self._export_to = export_to
+        self._last_plan = None
+
+    def _replay(self, start_slot: int, level: int) -> DispatchPlan:
+        """Follow the table forwards from a slot and level."""
+        step = self._step
+        charge_steps = self._charge_steps
+        export_steps = self._export_steps
+        efficiency = self.spec.efficiency
+        offset = start_slot - self._table_start
+        prices = self._prices
+        energy = array("d")
+        soc = array("d", [self.spec.reserve + level * step])
+        earned: list[float] = []
+
+        for index in range(offset, len(prices)):
+            charge = self._charge_to[index]
+            export = self._export_to[index]
+            if level < charge:
+                target = min(charge, level + charge_steps)
+            elif level > export:
+                target = max(export, level - export_steps)
+            else:
+                target = level
+            moved = (target - level) * step
+            if moved:
+                price = prices[index]
+                earned.append(
+                    -price * moved if moved > 0 else -price * moved * efficiency
+                )
+            level = target
+            energy.append(round(moved, 6))
+            soc.append(round(self.spec.reserve + level * step, 6))
+
+        return DispatchPlan(start_slot, energy, soc, math.fsum(earned))
@@ -0,0 +1,151 @@
+"""Ranks, percentiles and rolling statistics of the rates held."""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+import math
+from operator import itemgetter
+
+from .rate_series import RateSeries
+
+
+class RateRanks:
+    """
+    The rates within a range of slots, sorted, with the slot each came from.
+
+    The index is built once, when the rates change. A rate's rank is then found by
+    bisecting the sorted values, and percentiles and the extremes are read straight
+    from them, so no query costs more than O(log n).
+    """
+
+    __slots__ = ("values", "slots", "_total")
+
+    def __init__(self, rates: RateSeries, start_slot: int, end_slot: int) -> None:
+        """Sort the rates within [start_slot, end_slot), lowest first."""
+        items = sorted(
+            rates.slice_slots(start_slot, end_slot).items(), key=itemgetter(1)
+        )
+        self.values = [value for _, value in items]
+        self.slots = [slot for slot, _ in items]
+        self._total = math.fsum(self.values)
+
+    def __len__(self) -> int:
+        """Get the number of rates ranked."""
+        return len(self.values)
+
+    def rank(self, value: float) -> int:
+        """Get the rank of a rate among those held, 1 being the highest."""
+        return len(self.values) - bisect_right(self.values, value) + 1
+
+    def percent_rank(self, value: float) -> float | None:
+        """Get the percentage of the rates held that are at or below a rate."""
+        if not self.values:
+            return None
+        return 100 * bisect_right(self.values, value) / len(self.values)
+
+    def percentile(self, percent: float) -> float | None:
+        """Get a percentile of the rates, interpolating between the closest ranks."""
+        if not self.values:
+            return None
+        position = (len(self.values) - 1) * percent / 100
+        lower = math.floor(position)
+        upper = min(lower + 1, len(self.values) - 1)
+        fraction = position - lower
+        return self.values[lower] * (1 - fraction) + self.values[upper] * fraction
+
+    @property
+    def min_slot(self) -> int | None:
+        """Get the slot with the lowest rate, the earliest if several share it."""
+        return self.slots[0] if self.slots else None
+
+    @property
+    def max_slot(self) -> int | None:
+        """Get the slot with the highest rate, the earliest if several share it."""
+        if not self.slots:
+            return None
+        return self.slots[bisect_left(self.values, self.values[-1])]
+
+    @property
+    def mean(self) -> float | None:
+        """Get the mean of the rates."""
+        return self._total / len(self.values) if self.values else None
+
+
+class RollingStats:
+    """
+    The minimum, maximum and mean of the rates over a horizon following a slot.
+
+    Moving the horizon on drops the slots leaving it and adds those entering, to a
+    running total and to queues of the candidate minima and maxima. Each slot is
+    added and dropped once, so following the current slot costs O(1) a slot rather
+    than a pass over the horizon.
+    """
+
+    def __init__(self, rates: RateSeries, length: int) -> None:
+        """Initialize an empty horizon of the given number of slots."""
+        self._rates = rates
+        self.length = length
+        self.start_slot = 0
+        self._end_slot = 0
+        self._total = 0.0
+        self._count = 0
+        # Each holds (slot, rate) in slot order, with rates rising or falling
+        self._mins: deque[tuple[int, float]] = deque()
+        self._maxes: deque[tuple[int, float]] = deque()
+
+    def advance(self, start_slot: int) -> None:
+        """Move the horizon to start at a slot, which is usually the next one."""
+        if start_slot < self.start_slot or start_slot >= self._end_slot:
+            # Moving back, or past everything held, starts again
+            self._total = 0.0
+            self._count = 0
+            self._mins.clear()
+            self._maxes.clear()
+            self._end_slot = start_slot
+        else:
+            for slot in range(self.start_slot, start_slot):
+                value = self._rates.get_slot(slot)
+                if value is not None:
+                    self._total -= value
+                    self._count -= 1
+            if not self._count:
+                # Don't carry rounding errors into the next rates
+                self._total = 0.0
+            while self._mins and self._mins[0][0] < start_slot:
+                self._mins.popleft()
+            while self._maxes and self._maxes[0][0] < start_slot:
+                self._maxes.popleft()
+        self.start_slot = start_slot
+
+        for slot in range(self._end_slot, start_slot + self.length):
+            value = self._rates.get_slot(slot)
+            if value is None:
+                continue
+            self._total += value
+            self._count += 1
+            while self._mins and self._mins[-1][1] > value:
+                self._mins.pop()
+            self._mins.append((slot, value))
+            while self._maxes and self._maxes[-1][1] < value:
+                self._maxes.pop()
+            self._maxes.append((slot, value))
+        self._end_slot = start_slot + self.length
+
+    def __len__(self) -> int:
+        """Get the number of rates within the horizon."""
+        return self._count
+
+    @property
+    def min(self) -> tuple[int, float] | None:
+        """Get the earliest slot with the lowest rate, and the rate."""
+        return self._mins[0] if self._mins else None
+
+    @property
+    def max(self) -> tuple[int, float] | None:
+        """Get the earliest slot with the highest rate, and the rate."""
+        return self._maxes[0] if self._maxes else None
+
+    @property
+    def mean(self) -> float | None:
+        """Get the mean of the rates."""
+        return self._total / self._count if self._count else None
@@ -0,0 +1,214 @@
+"""Compact storage of half-hourly rates."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+import math
+from typing import Any, TypedDict
+
+SLOT_SECONDS = 1800
+
+_NAN = math.nan
+
+
+class JSONRateSeries(TypedDict):
+    """JSON representation of a rate series."""
+
+    start: int
+    values: list[float | None]
+
+
+def slot_of(timestamp: datetime) -> int:
+    """Get the number of the half-hour slot containing a timezone-aware timestamp."""
+    return int(timestamp.timestamp()) // SLOT_SECONDS
+
+
+def slot_start(slot: int) -> datetime:
+    """Get the UTC start time of a slot."""
+    return datetime.fromtimestamp(slot * SLOT_SECONDS, timezone.utc)
+
+
+class RateSeries:
+    """
+    Half-hourly rates held in a contiguous array, indexed by slot number.
+
+    Slot numbers count half hours since the Unix epoch. Missing slots are held as NaN,
+    and the series never starts or ends with a missing slot. Instances are treated as
+    immutable; operations that change the rates return a new series.
+    """
+
+    __slots__ = ("start_slot", "values")
+
+    def __init__(self, start_slot: int = 0, values: array[float] | None = None) -> None:
+        """Initialize the series."""
+        self.start_slot = start_slot
+        self.values: array[float] = values if values is not None else array("d")
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[datetime, float]]) -> RateSeries:
+        """Create a series from (slot start, rate) pairs in any order."""
+        by_slot = {slot_of(start): value for start, value in items}
+        return cls.from_slots(by_slot)
+
+    @classmethod
+    def from_slots(cls, by_slot: dict[int, float]) -> RateSeries:
+        """Create a series from a mapping of slot number to rate."""
+        if not by_slot:
+            return cls()
+
+        first = min(by_slot)
+        values = array("d", [_NAN]) * (max(by_slot) - first + 1)
+        for slot, value in by_slot.items():
+            values[slot - first] = value
+        return cls(first, values)
+
+    @classmethod
+    def from_json(cls, data: JSONRateSeries) -> RateSeries:
+        """Create a series from its JSON representation."""
+        values = array(
+            "d", (_NAN if value is None else float(value) for value in data["values"])
+        )
+        return cls(int(data["start"]) // SLOT_SECONDS, values)._stripped()
+
+    def as_json(self) -> JSONRateSeries:
+        """Get the JSON representation of the series, with gaps as nulls."""
+        return {
+            "start": self.start_slot * SLOT_SECONDS,
+            "values": [None if value != value else value for value in self.values],
+        }
+
+    @property
+    def end_slot(self) -> int:
+        """Get the number of the slot following the last one held."""
+        return self.start_slot + len(self.values)
+
+    @property
+    def start(self) -> datetime | None:
+        """Get the start of the first slot held."""
+        return slot_start(self.start_slot) if self.values else None
+
+    @property
+    def end(self) -> datetime | None:
+        """Get the end of the last slot held."""
+        return slot_start(self.end_slot) if self.values else None
+
+    def __len__(self) -> int:
+        """Get the number of slots spanned, including gaps."""
+        return len(self.values)
+
+    def __bool__(self) -> bool:
+        """Check whether any rates are held."""
+        return bool(self.values)
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare two series, treating gaps as equal."""
+        if not isinstance(other, RateSeries):
+            return NotImplemented
+        if other is self:
+            return True
+        # Only series of equal extent need their rates copied out to be compared
+        return (
+            self.start_slot == other.start_slot
+            and len(self.values) == len(other.values)
+            and self.values.tobytes() == other.values.tobytes()
+        )
+
+    def __repr__(self) -> str:
+        """Get a representation of the series for debugging."""
+        return f"RateSeries(start={self.start}, slots={len(self.values)})"
+
+    def get(self, when: datetime) -> float | None:
+        """Get the rate for the slot containing the given time, if known."""
+        return self.get_slot(slot_of(when))
+
+    def get_slot(self, slot: int) -> float | None:
+        """Get the rate for a slot number, if known."""
+        index = slot - self.start_slot
+        if index < 0 or index >= len(self.values):
+            return None
+        value = self.values[index]
+        return None if value != value else value
+
+    def items(self) -> Iterator[tuple[int, float]]:
+        """Iterate over (slot number, rate) pairs, skipping gaps."""
+        start_slot = self.start_slot
+        for index, value in enumerate(self.values):
+            if value == value:
+                yield start_slot + index, value
+
+    def slice(self, start: datetime, end: datetime) -> RateSeries:
+        """Get the rates for slots starting within [start, end)."""
+        return self.slice_slots(slot_of(start), slot_of(end))
+
+    def slice_slots(self, start_slot: int, end_slot: int) -> RateSeries:
+        """Get the rates for slots numbered within [start_slot, end_slot)."""
+        first = max(start_slot, self.start_slot)
+        last = min(end_slot, self.end_slot)
+        if first >= last:
+            return RateSeries()
+        return RateSeries(
+            first, self.values[first - self.start_slot : last - self.start_slot]
+        )._stripped()
+
+    def aligned(self, start_slot: int, end_slot: int) -> array[float]:
+        """Get the values for every slot within [start_slot, end_slot), gaps and all."""
+        values = array("d", [_NAN]) * max(end_slot - start_slot, 0)
+        first = max(start_slot, self.start_slot)
+        last = min(end_slot, self.end_slot)
+        if first < last:
+            values[first - start_slot : last - start_slot] = self.values[
+                first - self.start_slot : last - self.start_slot
+            ]
+        return values
+
+    def merge(self, other: RateSeries) -> RateSeries:
+        """
+        Combine two series, with rates from the other series taking precedence.
+
+        Appending rates that follow on from this series avoids copying the other's
+        gaps slot by slot, which is the common case for incremental updates.
+        """
+        if not other.values:
+            return self
+        if not self.values:
+            return other
+
+        first = min(self.start_slot, other.start_slot)
+        last = max(self.end_slot, other.end_slot)
+        values = array("d", [_NAN]) * (last - first)
+        offset = self.start_slot - first
+        values[offset : offset + len(self.values)] = self.values
+
+        offset = other.start_slot - first
+        if other.start_slot >= self.end_slot or not any(
+            value != value for value in other.values
+        ):
+            values[offset : offset + len(other.values)] = other.values
+        else:
+            for index, value in enumerate(other.values):
+                if value == value:
+                    values[offset + index] = value
+
+        return RateSeries(first, values)
+
+    def trim(self, start_slot: int) -> RateSeries:
+        """Drop rates for slots before the given slot number."""
+        if start_slot <= self.start_slot:
+            return self
+        return self.slice_slots(start_slot, self.end_slot)
+
+    def _stripped(self) -> RateSeries:
+        """Remove any gaps from the start and end of the series."""
+        values = self.values
+        first = 0
+        last = len(values)
+        while first < last and values[first] != values[first]:
+            first += 1
+        while last > first and values[last - 1] != values[last - 1]:
+            last -= 1
+        if first == last:
+            return RateSeries()
+        if first == 0 and last == len(values):
+            return self
+        return RateSeries(self.start_slot + first, values[first:last])
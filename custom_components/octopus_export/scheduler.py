@@ -0,0 +1,76 @@
+"""Scheduling of tariff refreshes around the daily publication of Agile rates."""
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+
+from homeassistant.util import dt as dt_util
+
+UK_TIME_ZONE = dt_util.get_time_zone("Europe/London")
+
+# Octopus publish the next day's rates at around 16:00 UK time, covering slots up
+# to 23:00 the following day
+PUBLICATION_TIME = time(16, 0)
+PUBLICATION_END_TIME = time(23, 0)
+
+# Rates are never published further ahead than this, which bounds paged requests
+PUBLICATION_HORIZON = timedelta(days=2)
+
+# While waiting for rates that are due, poll with exponential backoff
+INITIAL_RETRY_DELAY = timedelta(minutes=5)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# When nothing new is due, make an occasional liveness check
+LIVENESS_INTERVAL = timedelta(hours=6)
+
+
+class RefreshScheduler:
+    """
+    Chooses when to next refresh rates, based on how far ahead the held rates reach.
+
+    Outside the publication window there is nothing new to fetch, so refreshes are
+    infrequent. Once rates are due, polling backs off until they appear.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the scheduler."""
+        self._rates_until: datetime | None = None
+        self._attempts = 0
+
+    def next_refresh(self, now: datetime, rates_until: datetime | None) -> datetime:
+        """
+        Get the time of the next refresh.
+
+        The rates_until argument is the end of the last slot held, if any.
+        """
+        if rates_until != self._rates_until:
+            self._rates_until = rates_until
+            self._attempts = 0
+
+        uk_date = now.astimezone(UK_TIME_ZONE).date()
+        publication = datetime.combine(uk_date, PUBLICATION_TIME, UK_TIME_ZONE)
+        expected_until = datetime.combine(
+            uk_date + timedelta(days=1), PUBLICATION_END_TIME, UK_TIME_ZONE
+        )
+
+        if rates_until is not None and rates_until >= expected_until:
+            # Tomorrow's rates are held, so nothing is due until the next publication
+            return self._quiet_until(now, publication + timedelta(days=1))
+
+        if (
+            rates_until is not None
+            and now < publication
+            and rates_until > now + INITIAL_RETRY_DELAY
+        ):
+            # Today's rates are held, and tomorrow's aren't yet due
+            return self._quiet_until(now, publication)
+
+        # Rates are due, or the held rates are about to run out
+        delay = min(INITIAL_RETRY_DELAY * (1 << self._attempts), MAX_RETRY_DELAY)
+        if delay < MAX_RETRY_DELAY:
+            self._attempts += 1
+        return now + delay
+
+    def _quiet_until(self, now: datetime, target: datetime) -> datetime:
+        """Wait for the target time, with liveness checks in the meantime."""
+        self._attempts = 0
+        return min(target, now + LIVENESS_INTERVAL)
@@ -1,32 +1,325 @@
 """Home Assistant sensor descriptions."""
 from __future__ import annotations
 
-from collections.abc import Mapping
-from datetime import datetime, timedelta
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
-import logging
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import DEVICE_CLASS_MONETARY
-from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.const import DEVICE_CLASS_MONETARY, PERCENTAGE, UnitOfTime
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 
-from . import OctopusTariffUpdateCoordinator
-from .const import CONF_REGION, DOMAIN
-from .entity import OctopusAgileTariffEntity
+from .const import CONF_REGION, CONF_SLIM_ATTRIBUTES, DOMAIN
+from .coordinator import OctopusTariffUpdateCoordinator
+from .earnings import EarningsCoordinator
+from .entity import OctopusAgileTariffEntity, OctopusExportEarningsEntity
 from .octopus_api import get_start_of_current_interval
-
-_LOGGER: logging.Logger = logging.getLogger(__package__)
+from .planner import BatteryAction, DispatchPlan
+from .rate_series import slot_of, slot_start
+from .windows import RateWindow
 
 
 class Icon(str, Enum):
     """Icon styles."""
 
+    BATTERY = "mdi:home-battery"
     CASH = "mdi:cash"
+    CLOCK_START = "mdi:clock-start"
+    CLOCK_END = "mdi:clock-end"
+    DATABASE = "mdi:database"
+    RANK = "mdi:podium"
+    TIMER = "mdi:timer-outline"
+    UPDATE = "mdi:update"
+
+
+@dataclass(frozen=True)
+class BestWindowSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for a property of the best upcoming export window."""
+
+    value_fn: Callable[[RateWindow], StateType | datetime] = lambda window: None
+
+
+BEST_WINDOW_SENSORS = (
+    BestWindowSensorEntityDescription(
+        key="best_window_start",
+        name="Best Export Window Start",
+        icon=Icon.CLOCK_START,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda window: window.start,
+    ),
+    BestWindowSensorEntityDescription(
+        key="best_window_end",
+        name="Best Export Window End",
+        icon=Icon.CLOCK_END,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda window: window.end,
+    ),
+    BestWindowSensorEntityDescription(
+        key="best_window_average",
+        name="Best Export Window Rate",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="£/kWh",
+        value_fn=lambda window: round(window.average, 4),
+    ),
+)
+
+
+@dataclass(frozen=True)
+class RateStatisticSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for a statistic of the rates today, or ahead."""
+
+    value_fn: Callable[
+        [OctopusTariffUpdateCoordinator], StateType
+    ] = lambda coordinator: None
+    attributes_fn: Callable[
+        [OctopusTariffUpdateCoordinator], Mapping[str, Any]
+    ] | None = None
+
+
+def _rounded(value: float | None) -> float | None:
+    """Round a rate for display, if there is one."""
+    return None if value is None else round(value, 4)
+
+
+def _rank_now(coordinator: OctopusTariffUpdateCoordinator) -> int | None:
+    """Get the rank of the current slot's rate among today's."""
+    rate = coordinator.rates.get(get_start_of_current_interval())
+    return None if rate is None else coordinator.ranks_today.rank(rate)
+
+
+def _rank_attributes(coordinator: OctopusTariffUpdateCoordinator) -> dict[str, Any]:
+    """Get how many rates are ranked today, and the current one's percent rank."""
+    ranks = coordinator.ranks_today
+    rate = coordinator.rates.get(get_start_of_current_interval())
+    percent = None if rate is None else ranks.percent_rank(rate)
+    return {
+        "rates": len(ranks),
+        "percent_rank": None if percent is None else round(percent, 1),
+    }
+
+
+def _extreme_attributes(extreme: tuple[int, float] | None) -> dict[str, Any]:
+    """Get when the lowest or highest rate ahead starts."""
+    return {"at": None if extreme is None else slot_start(extreme[0]).isoformat()}
+
+
+RATE_STATISTIC_SENSORS = (
+    RateStatisticSensorEntityDescription(
+        key="rate_rank_today",
+        name="Agile Export Rate Rank Today",
+        icon=Icon.RANK,
+        value_fn=_rank_now,
+        attributes_fn=_rank_attributes,
+    ),
+    RateStatisticSensorEntityDescription(
+        key="rate_percentile_today",
+        name="Agile Export Rate 90th Percentile Today",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="£/kWh",
+        value_fn=lambda coordinator: _rounded(coordinator.ranks_today.percentile(90)),
+    ),
+    RateStatisticSensorEntityDescription(
+        key="rate_min_ahead",
+        name="Agile Export Rate Min Next 24h",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="£/kWh",
+        value_fn=lambda coordinator: None
+        if (low := coordinator.rates_ahead.min) is None
+        else low[1],
+        attributes_fn=lambda coordinator: _extreme_attributes(
+            coordinator.rates_ahead.min
+        ),
+    ),
+    RateStatisticSensorEntityDescription(
+        key="rate_max_ahead",
+        name="Agile Export Rate Max Next 24h",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="£/kWh",
+        value_fn=lambda coordinator: None
+        if (high := coordinator.rates_ahead.max) is None
+        else high[1],
+        attributes_fn=lambda coordinator: _extreme_attributes(
+            coordinator.rates_ahead.max
+        ),
+    ),
+    RateStatisticSensorEntityDescription(
+        key="rate_mean_ahead",
+        name="Agile Export Rate Mean Next 24h",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="£/kWh",
+        value_fn=lambda coordinator: _rounded(coordinator.rates_ahead.mean),
+    ),
+)
+
+
+@dataclass(frozen=True)
+class BatteryPlanSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for a property of the battery's planned dispatch."""
+
+    value_fn: Callable[[DispatchPlan], StateType | datetime] = lambda plan: None
+
+
+def _next_export(plan: DispatchPlan) -> datetime | None:
+    """Get the start of the first slot in which the battery exports, if any."""
+    slot = plan.next_export()
+    return None if slot is None else slot_start(slot)
+
+
+BATTERY_PLAN_SENSORS = (
+    BatteryPlanSensorEntityDescription(
+        key="battery_plan_action",
+        name="Battery Plan Action",
+        icon=Icon.BATTERY,
+        device_class=SensorDeviceClass.ENUM,
+        options=[action.value for action in BatteryAction],
+        value_fn=lambda plan: plan.action(0).value if plan else None,
+    ),
+    BatteryPlanSensorEntityDescription(
+        key="battery_plan_next_export",
+        name="Battery Plan Next Export",
+        icon=Icon.CLOCK_START,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=_next_export,
+    ),
+    BatteryPlanSensorEntityDescription(
+        key="battery_plan_value",
+        name="Battery Plan Value",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        native_unit_of_measurement="GBP",
+        value_fn=lambda plan: round(plan.value, 2),
+    ),
+)
+
+
+@dataclass(frozen=True)
+class EarningsSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for export earnings over a period."""
+
+    value_fn: Callable[[EarningsCoordinator], float | None] = lambda earnings: None
+
+
+EARNINGS_SENSORS = (
+    EarningsSensorEntityDescription(
+        key="export_earnings_today",
+        name="Agile Export Earnings Today",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="GBP",
+        value_fn=lambda earnings: earnings.earned_today,
+    ),
+    EarningsSensorEntityDescription(
+        key="export_earnings_month",
+        name="Agile Export Earnings This Month",
+        icon=Icon.CASH,
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="GBP",
+        value_fn=lambda earnings: earnings.earned_this_month,
+    ),
+)
+
+
+@dataclass(frozen=True)
+class DiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor for a measure of the integration's own performance."""
+
+    value_fn: Callable[
+        [OctopusTariffUpdateCoordinator], StateType | datetime
+    ] = lambda coordinator: None
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a duration to milliseconds, if there is one."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+# Disabled by default, and updated only with the rates or at the start of a slot
+DIAGNOSTIC_SENSORS = (
+    DiagnosticSensorEntityDescription(
+        key="update_duration",
+        name="Agile Export Update Duration",
+        icon=Icon.TIMER,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.stats.last_update_duration
+        ),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="rate_tables_duration",
+        name="Agile Export Rate Tables Build Duration",
+        icon=Icon.TIMER,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.stats.last_view_build_duration
+        ),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="slots_held",
+        name="Agile Export Slots Held",
+        icon=Icon.DATABASE,
+        value_fn=lambda coordinator: len(coordinator.rates),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="rates_published_until",
+        name="Agile Export Rates Published Until",
+        icon=Icon.CLOCK_END,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator: coordinator.rates_until,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="next_refresh",
+        name="Agile Export Next Refresh",
+        icon=Icon.UPDATE,
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda coordinator: coordinator.next_refresh,
+    ),
+    DiagnosticSensorEntityDescription(
+        key="api_latency",
+        name="Octopus API Rates Latency",
+        icon=Icon.TIMER,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        value_fn=lambda coordinator: _milliseconds(coordinator.api_stats.last_latency),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="api_cache_hit_ratio",
+        name="Octopus API Rates Cache Hit Ratio",
+        icon=Icon.DATABASE,
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda coordinator: None
+        if (ratio := coordinator.api_stats.cache_hit_ratio) is None
+        else round(ratio * 100, 1),
+    ),
+    DiagnosticSensorEntityDescription(
+        key="api_retries",
+        name="Octopus API Rates Retries",
+        icon=Icon.UPDATE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.api_stats.retries,
+    ),
+)
 
 
 async def async_setup_entry(
@@ -42,14 +335,47 @@ async def async_setup_entry(
     async_add_entities(
         [
             CurrentRateSensor(coordinator, config_entry),
+            *(
+                BestWindowSensor(coordinator, config_entry, description)
+                for description in BEST_WINDOW_SENSORS
+            ),
+            *(
+                RateStatisticSensor(coordinator, config_entry, description)
+                for description in RATE_STATISTIC_SENSORS
+            ),
+            *(
+                DiagnosticSensor(coordinator, config_entry, description)
+                for description in DIAGNOSTIC_SENSORS
+            ),
         ]
     )
+    if coordinator.with_import:
+        async_add_entities(
+            [
+                ImportRateSensor(coordinator, config_entry),
+                SpreadSensor(coordinator, config_entry),
+            ]
+        )
+    if coordinator.planner is not None:
+        async_add_entities(
+            BatteryPlanSensor(coordinator, config_entry, description)
+            for description in BATTERY_PLAN_SENSORS
+        )
+    if coordinator.earnings is not None:
+        async_add_entities(
+            EarningsSensor(coordinator.earnings, config_entry, description)
+            for description in EARNINGS_SENSORS
+        )
 
 
 class CurrentRateSensor(OctopusAgileTariffEntity, SensorEntity):
     """Provides the current agile tariff rate."""
 
-    _cancel_scheduled_update: CALLBACK_TYPE | None = None
+    _tracks_slots = True
+
+    # Rate tables are large, and available on demand from the get_rates service, so
+    # they're kept out of the recorder's history
+    _unrecorded_attributes = frozenset({"rates_today", "rates_tomorrow"})
 
     def __init__(
         self,
@@ -69,52 +395,276 @@ class CurrentRateSensor(OctopusAgileTariffEntity, SensorEntity):
         self._attr_unique_id = f"export-{region_code}_{self.entity_description.key}"
         self._attr_should_poll = False
 
-    async def async_added_to_hass(self) -> None:
-        """Run when the entity is added to hass."""
-        await super().async_added_to_hass()
-        await self._async_half_hourly_update(datetime.utcnow())
+    @property
+    def native_value(self) -> StateType:
+        """Return the current tariff rate."""
+        return self.coordinator.rates.get(get_start_of_current_interval())
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Extra state attributes for the sensor."""
+        attributes: dict[str, Any] = {
+            "current_slot": dt_util.as_local(get_start_of_current_interval()).strftime(
+                "%H:%M"
+            ),
+        }
+        if not self.config_entry.options.get(CONF_SLIM_ATTRIBUTES, False):
+            attributes["rates_today"] = self.coordinator.rates_today
+            attributes["rates_tomorrow"] = self.coordinator.rates_tomorrow
+        return attributes
+
+
+class ImportRateSensor(OctopusAgileTariffEntity, SensorEntity):
+    """Provides the current rate of the paired Agile import tariff."""
 
-    async def async_will_remove_from_hass(self) -> None:
-        """Run when the entity will be removed from hass."""
-        await super().async_will_remove_from_hass()
-        if self._cancel_scheduled_update is not None:
-            self._cancel_scheduled_update()
+    _tracks_slots = True
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = SensorEntityDescription(
+            key="import_rate",
+            name="Agile Import Rate",
+            icon=Icon.CASH,
+            device_class=SensorDeviceClass.MONETARY,
+            native_unit_of_measurement="£/kWh",
+        )
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{self.entity_description.key}"
+        self._attr_should_poll = False
 
     @property
     def native_value(self) -> StateType:
-        """Return the current tariff rate."""
-        if self.coordinator.rates is None:
-            return None
+        """Return the current import rate."""
+        return self.coordinator.import_rates.get(get_start_of_current_interval())
+
+
+class SpreadSensor(OctopusAgileTariffEntity, SensorEntity):
+    """
+    Provides how far the current export rate is above the import rate.
+
+    The spread is negative while importing costs more than exporting earns. The
+    attributes say whether export beats import now, and when it next does.
+    """
+
+    _tracks_slots = True
 
-        interval_start = get_start_of_current_interval()
-        return self.coordinator.rates[interval_start.strftime("%Y-%m-%dT%H:%M:%SZ")]
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = SensorEntityDescription(
+            key="export_import_spread",
+            name="Agile Export Import Spread",
+            icon=Icon.CASH,
+            device_class=SensorDeviceClass.MONETARY,
+            native_unit_of_measurement="£/kWh",
+        )
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{self.entity_description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the spread in the current slot, if both rates are known."""
+        spread = self.coordinator.spread.get_slot(
+            slot_of(get_start_of_current_interval())
+        )
+        return None if spread is None else round(spread, 4)
 
     @property
     def extra_state_attributes(self) -> Mapping[str, Any] | None:
         """Extra state attributes for the sensor."""
-        if self.coordinator.rates is None:
-            return None
-
+        spread = self.coordinator.spread
+        slot = slot_of(get_start_of_current_interval())
+        next_slot = spread.next_beating_slot(slot)
         return {
-            "rates_today": self.coordinator.rates_today,
-            "rates_tomorrow": self.coordinator.rates_tomorrow,
-            "current_slot": get_start_of_current_interval()
-            .astimezone()
-            .strftime("%H:%M"),
+            "export_beats_import": spread.export_beats_import(slot),
+            "next_export_beats_import": None
+            if next_slot is None
+            else slot_start(next_slot).isoformat(),
         }
 
-    async def _async_half_hourly_update(self, now: datetime) -> None:
-        """Trigger a refresh of the sensor, and schedule the next refresh when prices change again."""
-        self.async_schedule_update_ha_state()
 
-        # Get the timestamp of the half hour period that just began
-        interval_start = get_start_of_current_interval()
+class BestWindowSensor(OctopusAgileTariffEntity, SensorEntity):
+    """
+    Provides a property of the best-paying upcoming run of export slots.
 
-        # Schedule the next update
-        next_time = interval_start + timedelta(minutes=30)
-        self._cancel_scheduled_update = async_track_point_in_utc_time(
-            self.hass,
-            self._async_half_hourly_update,
-            next_time,
+    The window length is configurable, and the search covers every slot from the
+    current one to the last rate held.
+    """
+
+    _tracks_slots = True
+    entity_description: BestWindowSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        description: BestWindowSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the property of the best window, if there is one."""
+        window = self.coordinator.windows.find(
+            self.coordinator.window_slots, slot_of(get_start_of_current_interval())
         )
-        _LOGGER.debug("Scheduled next update for %s UTC", next_time)
+        return None if window is None else self.entity_description.value_fn(window)
+
+
+class RateStatisticSensor(OctopusAgileTariffEntity, SensorEntity):
+    """
+    Provides a statistic of today's rates, or of those over the next 24 hours.
+
+    The statistics come from indexes kept by the coordinator, which are rebuilt
+    only when the rates change, so the start of each slot costs very little.
+    """
+
+    _tracks_slots = True
+    entity_description: RateStatisticSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        description: RateStatisticSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the statistic."""
+        return self.entity_description.value_fn(self.coordinator)
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Extra state attributes for the sensor."""
+        attributes_fn = self.entity_description.attributes_fn
+        return None if attributes_fn is None else attributes_fn(self.coordinator)
+
+
+class BatteryPlanSensor(OctopusAgileTariffEntity, SensorEntity):
+    """
+    Provides a property of the battery's planned dispatch from the current slot.
+
+    The plan is replayed from the stored table when the slot or the state of charge
+    changes, and solved again only when the rates do.
+    """
+
+    _tracks_slots = True
+    entity_description: BatteryPlanSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        description: BatteryPlanSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    async def async_added_to_hass(self) -> None:
+        """Run when the entity is added to hass."""
+        await super().async_added_to_hass()
+        if self.coordinator.battery_soc_entity:
+            self.async_on_remove(
+                async_track_state_change_event(
+                    self.hass,
+                    self.coordinator.battery_soc_entity,
+                    self._async_soc_changed,
+                )
+            )
+
+    @callback
+    def _async_soc_changed(self, _event: Event) -> None:
+        """Write state if a change in the state of charge has changed the plan."""
+        self._async_write_if_changed()
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the property of the plan, if there is one."""
+        plan = self.coordinator.battery_plan()
+        return None if plan is None else self.entity_description.value_fn(plan)
+
+
+class EarningsSensor(OctopusExportEarningsEntity, SensorEntity):
+    """
+    Provides export earnings over a period, from meter readings.
+
+    Readings arrive a day or so late, so today's earnings are usually incomplete.
+    """
+
+    entity_description: EarningsSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: EarningsCoordinator,
+        config_entry: ConfigEntry,
+        description: EarningsSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the earnings for the period."""
+        return self.entity_description.value_fn(self.coordinator)
+
+
+class DiagnosticSensor(OctopusAgileTariffEntity, SensorEntity):
+    """
+    Provides a measure of the integration's own performance.
+
+    The underlying counters are always collected, so enabling a sensor costs only
+    its state writes.
+    """
+
+    _tracks_slots = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: DiagnosticSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: OctopusTariffUpdateCoordinator,
+        config_entry: ConfigEntry,
+        description: DiagnosticSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry)
+        self.entity_description = description
+        region_code = self.config_entry.data[CONF_REGION]
+        self._attr_unique_id = f"export-{region_code}_{description.key}"
+        self._attr_should_poll = False
+
+    @property
+    def native_value(self) -> StateType | datetime:
+        """Return the measurement."""
+        return self.entity_description.value_fn(self.coordinator)
@@ -0,0 +1,256 @@
+"""Services exposing tariff rates on demand."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING, cast
+
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+import voluptuous as vol
+
+from .const import DOMAIN
+from .rate_series import SLOT_SECONDS, slot_of, slot_start
+
+if TYPE_CHECKING:
+    from .coordinator import OctopusTariffUpdateCoordinator
+    from .planner import DispatchPlan
+
+SERVICE_GET_RATES = "get_rates"
+SERVICE_FIND_WINDOW = "find_window"
+SERVICE_BACKFILL_STATISTICS = "backfill_statistics"
+SERVICE_PLAN_BATTERY = "plan_battery"
+
+ATTR_CONFIG_ENTRY = "config_entry"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_SLOTS = "slots"
+ATTR_CONTIGUOUS = "contiguous"
+ATTR_HIGHEST = "highest"
+ATTR_FORECAST = "forecast"
+ATTR_STATE_OF_CHARGE = "state_of_charge"
+
+_RANGE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+GET_RATES_SCHEMA = _RANGE_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_FORECAST, default=False): cv.boolean,
+    }
+)
+
+FIND_WINDOW_SCHEMA = _RANGE_SCHEMA.extend(
+    {
+        vol.Required(ATTR_SLOTS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(ATTR_CONTIGUOUS, default=True): cv.boolean,
+        vol.Optional(ATTR_HIGHEST, default=True): cv.boolean,
+    }
+)
+
+BACKFILL_STATISTICS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+PLAN_BATTERY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY): cv.string,
+        vol.Optional(ATTR_STATE_OF_CHARGE): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=100)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+
+    async def async_get_rates(call: ServiceCall) -> ServiceResponse:
+        """
+        Get held rates for a range of slots, as one column of values.
+
+        Slot n of the result starts at start + n * slot_seconds (both in seconds since
+        the epoch), and gaps are nulls. This is far smaller than a table keyed by
+        time, and callers can ask for just the range they need.
+
+        Forecast rates, if asked for, follow those published, and forecast_start
+        gives the start of the first of them.
+        """
+        coordinator = _get_coordinator(hass, call.data[ATTR_CONFIG_ENTRY])
+        rates = coordinator.rates
+        forecast_start: int | None = None
+        if call.data[ATTR_FORECAST] and coordinator.forecast:
+            forecast_start = coordinator.forecast.start_slot * SLOT_SECONDS
+            rates = coordinator.rates_with_forecast
+        start = _as_utc(call.data.get(ATTR_START)) or rates.start
+        end = _as_utc(call.data.get(ATTR_END)) or rates.end
+        if start is not None and end is not None:
+            rates = rates.slice(start, end)
+
+        marker = {"forecast_start": forecast_start} if call.data[ATTR_FORECAST] else {}
+        return {
+            **rates.as_json(),
+            "slot_seconds": SLOT_SECONDS,
+            **marker,
+        }
+
+    async def async_find_window(call: ServiceCall) -> ServiceResponse:
+        """
+        Find the best (or worst) slots within a range.
+
+        The range defaults to the current slot onwards. Contiguous searches find a
+        single run of slots, otherwise the chosen slots may be spread out.
+        """
+        coordinator = _get_coordinator(hass, call.data[ATTR_CONFIG_ENTRY])
+        start = _as_utc(call.data.get(ATTR_START)) or dt_util.utcnow()
+        end = _as_utc(call.data.get(ATTR_END))
+        window = coordinator.windows.find(
+            call.data[ATTR_SLOTS],
+            slot_of(start),
+            None if end is None else slot_of(end),
+            highest=call.data[ATTR_HIGHEST],
+            contiguous=call.data[ATTR_CONTIGUOUS],
+        )
+        if window is None:
+            return {"slots": [], "average": None}
+
+        return {
+            "slots": [slot_start(slot).isoformat() for slot in window.slots],
+            "start": window.start.isoformat(),
+            "end": window.end.isoformat(),
+            "average": window.average,
+        }
+
+    async def async_backfill_statistics(call: ServiceCall) -> None:
+        """
+        Start importing rate history into long-term statistics.
+
+        The import runs in the background. Repeating a call with the same range
+        resumes an import that was interrupted.
+        """
+        entry = _get_loaded_entry(hass, call.data[ATTR_CONFIG_ENTRY])
+        coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+        if "recorder" not in hass.config.components:
+            raise ServiceValidationError("Backfilling statistics needs the recorder")
+        if coordinator.backfilling:
+            raise ServiceValidationError(f"Already backfilling for {entry.entry_id}")
+        if coordinator.tariff is None:
+            raise ServiceValidationError(
+                f"The tariff for {entry.entry_id} hasn't been discovered yet"
+            )
+
+        start = cast(datetime, _as_utc(call.data[ATTR_START]))
+        end = _as_utc(call.data.get(ATTR_END)) or dt_util.utcnow()
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_backfill_statistics(start, end),
+            f"{DOMAIN} backfill {entry.entry_id}",
+        )
+
+    async def async_plan_battery(call: ServiceCall) -> ServiceResponse:
+        """
+        Plan the battery's dispatch from the current slot, one entry per slot.
+
+        Slot n of the plan starts at start + n * slot_seconds. Energy is that stored
+        in each slot, in kWh, and is negative while exporting. The state of charge,
+        in kWh, is given at the start of each slot and at the end of the plan. The
+        state of charge to start from, as a percentage, defaults to the battery's
+        sensor.
+        """
+        coordinator = _get_coordinator(hass, call.data[ATTR_CONFIG_ENTRY])
+        if coordinator.planner is None:
+            raise ServiceValidationError(
+                f"No battery is configured for {call.data[ATTR_CONFIG_ENTRY]}"
+            )
+        percent = call.data.get(ATTR_STATE_OF_CHARGE)
+        plan = cast(
+            "DispatchPlan",
+            coordinator.battery_plan(
+                None
+                if percent is None
+                else coordinator.planner.spec.capacity * percent / 100
+            ),
+        )
+        return {
+            "start": plan.start_slot * SLOT_SECONDS,
+            "slot_seconds": SLOT_SECONDS,
+            "actions": [plan.action(index).value for index in range(len(plan))],
+            "energy": list(plan.energy),
+            "soc": list(plan.soc),
+            "value": round(plan.value, 4),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_RATES,
+        async_get_rates,
+        schema=GET_RATES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_WINDOW,
+        async_find_window,
+        schema=FIND_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL_STATISTICS,
+        async_backfill_statistics,
+        schema=BACKFILL_STATISTICS_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PLAN_BATTERY,
+        async_plan_battery,
+        schema=PLAN_BATTERY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+def _get_coordinator(
+    hass: HomeAssistant, entry_id: str
+) -> OctopusTariffUpdateCoordinator:
+    """Get the coordinator for a loaded config entry."""
+    entry = _get_loaded_entry(hass, entry_id)
+    coordinator: OctopusTariffUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return coordinator
+
+
+def _get_loaded_entry(hass: HomeAssistant, entry_id: str) -> ConfigEntry:
+    """Get a loaded config entry for the integration."""
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        raise ServiceValidationError(f"No loaded tariff for config entry {entry_id}")
+    return entry
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    """Convert a service datetime to UTC, treating naive values as local time."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt_util.as_utc(value)
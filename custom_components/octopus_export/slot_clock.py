@@ -0,0 +1,80 @@
+"""A single clock announcing the start of each half-hour pricing slot."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_SLOT_CLOCK, DOMAIN, LOGGER
+from .rate_series import slot_of, slot_start
+
+SIGNAL_SLOT_STARTED = f"{DOMAIN}_slot_started"
+
+
+class SlotClock:
+    """
+    Fires once at each slot boundary, announcing it to all subscribers.
+
+    Each boundary is scheduled from the current time, rather than by adding a fixed
+    interval to the last, so timer drift doesn't accumulate. The clock only runs
+    while something is subscribed.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the clock."""
+        self._hass = hass
+        self._subscribers = 0
+        self._job = HassJob(self._async_slot_started, f"{DOMAIN} slot clock")
+        self._cancel_timer: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_subscribe(self, action: Callable[[datetime], None]) -> Callable[[], None]:
+        """Call an action with the start time of every new slot."""
+        disconnect = async_dispatcher_connect(self._hass, SIGNAL_SLOT_STARTED, action)
+        self._subscribers += 1
+        if self._cancel_timer is None:
+            self._async_schedule()
+
+        @callback
+        def unsubscribe() -> None:
+            disconnect()
+            self._subscribers -= 1
+            if self._subscribers == 0 and self._cancel_timer is not None:
+                self._cancel_timer()
+                self._cancel_timer = None
+
+        return unsubscribe
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Schedule the timer for the next slot boundary."""
+        next_slot = slot_of(dt_util.utcnow()) + 1
+        self._cancel_timer = async_track_point_in_utc_time(
+            self._hass, self._job, slot_start(next_slot)
+        )
+
+    @callback
+    def _async_slot_started(self, now: datetime) -> None:
+        """Announce the slot that has just started, and schedule the next."""
+        # The timer may fire slightly after the boundary, but never before it
+        started = slot_start(slot_of(now))
+        self._async_schedule()
+        LOGGER.debug("Slot started at %s", started)
+        async_dispatcher_send(self._hass, SIGNAL_SLOT_STARTED, started)
+
+
+@callback
+def async_get_slot_clock(hass: HomeAssistant) -> SlotClock:
+    """Get the slot clock shared across the integration."""
+    domain_data: dict[str, object] = hass.data.setdefault(DOMAIN, {})
+    clock = domain_data.get(DATA_SLOT_CLOCK)
+    if not isinstance(clock, SlotClock):
+        clock = domain_data[DATA_SLOT_CLOCK] = SlotClock(hass)
+    return clock
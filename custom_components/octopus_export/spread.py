@@ -0,0 +1,69 @@
+"""Comparison of export rates with the paired import rates, slot by slot."""
+from __future__ import annotations
+
+from array import array
+from operator import sub
+
+from .rate_series import RateSeries
+
+_BEATS = b"\x01"
+
+
+class RateSpread:
+    """
+    Export and import rates laid out over the same slots, and how far apart they are.
+
+    Both series are aligned over every slot either covers, so the spread (export
+    less import) comes from a single pass over two arrays of the same length, and
+    the slots in which export beats import from a single pass over the spread. Both
+    passes run in C rather than slot by slot in Python. Slots missing either rate
+    have no spread, and never beat.
+    """
+
+    __slots__ = ("start_slot", "export", "import_", "spread", "_beats")
+
+    def __init__(self, export: RateSeries, import_: RateSeries) -> None:
+        """Align the two series, and compare them."""
+        if export and import_:
+            start_slot = min(export.start_slot, import_.start_slot)
+            end_slot = max(export.end_slot, import_.end_slot)
+        else:
+            start_slot = end_slot = 0
+        self.start_slot = start_slot
+        self.export = export.aligned(start_slot, end_slot)
+        self.import_ = import_.aligned(start_slot, end_slot)
+        self.spread = array("d", map(sub, self.export, self.import_))
+        # Comparisons with NaN are false, so gaps never beat
+        self._beats = bytes(map((0.0).__lt__, self.spread))
+
+    @property
+    def end_slot(self) -> int:
+        """Get the number of the slot after the last aligned."""
+        return self.start_slot + len(self.spread)
+
+    def get_slot(self, slot: int) -> float | None:
+        """Get the spread for a slot, if both rates are known."""
+        index = slot - self.start_slot
+        if index < 0 or index >= len(self.spread):
+            return None
+        value = self.spread[index]
+        return None if value != value else value
+
+    def export_beats_import(self, slot: int) -> bool:
+        """Check whether the export rate is above the import rate in a slot."""
+        index = slot - self.start_slot
+        return 0 <= index < len(self._beats) and self._beats[index] == 1
+
+    def next_beating_slot(self, from_slot: int) -> int | None:
+        """Find the first slot, from the given one, in which export beats import."""
+        index = self._beats.find(_BEATS, max(from_slot - self.start_slot, 0))
+        return None if index < 0 else self.start_slot + index
+
+    def beating_slots(self, start_slot: int, end_slot: int) -> list[int]:
+        """Get every slot within [start_slot, end_slot) in which export beats import."""
+        slots: list[int] = []
+        slot = self.next_beating_slot(start_slot)
+        while slot is not None and slot < end_slot:
+            slots.append(slot)
+            slot = self.next_beating_slot(slot + 1)
+        return slots
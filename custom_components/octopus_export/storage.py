@@ -0,0 +1,238 @@
+"""Persistent cache of tariff data, allowing fast startup without API calls."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, cast
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .rate_series import JSONRateSeries, RateSeries
+
+STORAGE_VERSION = 2
+CHECKPOINT_STORAGE_VERSION = 1
+EARNINGS_STORAGE_VERSION = 1
+
+
+@dataclass
+class CachedTariff:
+    """Tariff identifiers and rates as last fetched from the API."""
+
+    product_code: str
+    tariff_code: str
+    rates: RateSeries
+    product_checked: datetime | None = None
+    import_product_code: str | None = None
+    import_tariff_code: str | None = None
+    import_rates: RateSeries = field(default_factory=RateSeries)
+
+    def covers(self, interval_start: datetime) -> bool:
+        """Check whether the cached rates include the given pricing slot."""
+        return self.rates.get(interval_start) is not None
+
+
+@dataclass
+class BackfillCheckpoint:
+    """Progress through a backfill of rate history, up to its end."""
+
+    start: datetime
+    end: datetime
+    until: datetime
+
+
+@dataclass
+class EarningsTotals:
+    """Export earnings for each local day, from readings up to a point in time."""
+
+    until: datetime | None = None
+    days: dict[date, float] = field(default_factory=dict)
+
+
+class TariffCache:
+    """Versioned on-disk store of the tariff data for a single config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = _TariffStore(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        # Kept apart from the tariff data, which is saved far more often
+        self._checkpoint_store: Store[dict[str, Any]] = Store(
+            hass, CHECKPOINT_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.backfill"
+        )
+        self._earnings_store: Store[dict[str, Any]] = Store(
+            hass, EARNINGS_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.earnings"
+        )
+
+    async def async_load(self, region_code: str) -> CachedTariff | None:
+        """
+        Load the cached tariff, if one has been saved.
+
+        Nothing is returned if the saved data is malformed, or belongs to a tariff in
+        a different region.
+        """
+        data = await self._store.async_load()
+        if data is None:
+            return None
+
+        try:
+            product_code = data["product_code"]
+            tariff_code = data["tariff_code"]
+            rates = data["rates"]
+            product_checked = data.get("product_checked")
+        except (KeyError, TypeError):
+            return None
+
+        if (
+            not isinstance(product_code, str)
+            or not isinstance(tariff_code, str)
+            or not tariff_code.endswith(f"-{region_code}")
+            or not _is_rate_series(rates)
+        ):
+            return None
+
+        cached = CachedTariff(
+            product_code,
+            tariff_code,
+            RateSeries.from_json(cast(JSONRateSeries, rates)),
+            dt_util.parse_datetime(product_checked)
+            if isinstance(product_checked, str)
+            else None,
+        )
+
+        # The paired import tariff is optional, and dropped if it's malformed
+        import_product_code = data.get("import_product_code")
+        import_tariff_code = data.get("import_tariff_code")
+        import_rates = data.get("import_rates")
+        if (
+            isinstance(import_product_code, str)
+            and isinstance(import_tariff_code, str)
+            and import_tariff_code.endswith(f"-{region_code}")
+            and _is_rate_series(import_rates)
+        ):
+            cached.import_product_code = import_product_code
+            cached.import_tariff_code = import_tariff_code
+            cached.import_rates = RateSeries.from_json(
+                cast(JSONRateSeries, import_rates)
+            )
+        return cached
+
+    async def async_save(self, cached: CachedTariff) -> None:
+        """Save the tariff to disk."""
+        await self._store.async_save(
+            {
+                "product_code": cached.product_code,
+                "tariff_code": cached.tariff_code,
+                "rates": cached.rates.as_json(),
+                "product_checked": cached.product_checked.isoformat()
+                if cached.product_checked is not None
+                else None,
+                "import_product_code": cached.import_product_code,
+                "import_tariff_code": cached.import_tariff_code,
+                "import_rates": cached.import_rates.as_json(),
+            }
+        )
+
+    async def async_load_checkpoint(self) -> BackfillCheckpoint | None:
+        """Load the progress of the last backfill, if there is any."""
+        data = await self._checkpoint_store.async_load()
+        if data is None:
+            return None
+
+        try:
+            times = [
+                dt_util.parse_datetime(data[key]) for key in ("start", "end", "until")
+            ]
+        except (KeyError, TypeError, ValueError):
+            return None
+        if any(value is None or value.tzinfo is None for value in times):
+            return None
+        start, end, until = cast(list[datetime], times)
+        return BackfillCheckpoint(start, end, until)
+
+    async def async_save_checkpoint(self, checkpoint: BackfillCheckpoint) -> None:
+        """Save the progress of a backfill."""
+        await self._checkpoint_store.async_save(
+            {
+                "start": checkpoint.start.isoformat(),
+                "end": checkpoint.end.isoformat(),
+                "until": checkpoint.until.isoformat(),
+            }
+        )
+
+    async def async_load_earnings(self) -> EarningsTotals:
+        """Load the export earnings totalled so far, if there are any."""
+        data = await self._earnings_store.async_load()
+        if data is None:
+            return EarningsTotals()
+
+        try:
+            until = data["until"]
+            days = {
+                date.fromisoformat(day): float(total)
+                for day, total in data["days"].items()
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return EarningsTotals()
+
+        return EarningsTotals(
+            dt_util.parse_datetime(until) if isinstance(until, str) else None, days
+        )
+
+    async def async_save_earnings(self, totals: EarningsTotals) -> None:
+        """Save the export earnings totalled so far."""
+        await self._earnings_store.async_save(
+            {
+                "until": totals.until.isoformat() if totals.until else None,
+                "days": {day.isoformat(): total for day, total in totals.days.items()},
+            }
+        )
+
+    async def async_remove(self) -> None:
+        """Delete the cache from disk."""
+        await self._store.async_remove()
+        await self._checkpoint_store.async_remove()
+        await self._earnings_store.async_remove()
+
+
+def _is_rate_series(data: Any) -> bool:
+    """Check whether saved data is a valid series of rates."""
+    return (
+        isinstance(data, dict)
+        and isinstance(data.get("start"), int)
+        and isinstance(data.get("values"), list)
+        and all(
+            value is None
+            or (isinstance(value, (int, float)) and not isinstance(value, bool))
+            for value in data["values"]
+        )
+    )
+
+
+class _TariffStore(Store[dict[str, Any]]):
+    """Store that migrates data saved by earlier versions of the integration."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Migrate to the current version."""
+        if old_major_version == 1:
+            # Rates were held as a dictionary keyed by UTC timestamp strings
+            rates = old_data.get("rates")
+            if isinstance(rates, dict):
+                try:
+                    series = RateSeries.from_items(
+                        (
+                            datetime.fromisoformat(key.replace("Z", "+00:00")),
+                            float(value),
+                        )
+                        for key, value in rates.items()
+                    )
+                except (AttributeError, TypeError, ValueError):
+                    series = RateSeries()
+                old_data = {**old_data, "rates": series.as_json()}
+
+        return old_data
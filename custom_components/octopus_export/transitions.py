@@ -0,0 +1,113 @@
+"""Precomputed on/off transitions, driven by a single timer."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, LOGGER
+from .rate_series import slot_of, slot_start
+
+# A list of (slot number, state) pairs, each giving the state from that slot onwards
+Transitions = list[tuple[int, bool]]
+
+
+def find_transitions(
+    start_slot: int, end_slot: int, is_on: Callable[[int], bool]
+) -> Transitions:
+    """
+    Find the state at the start slot, and each change of state up to the end slot.
+
+    Slots from the end slot onwards are off, as nothing is known about them.
+    """
+    transitions: Transitions = []
+    state: bool | None = None
+    for slot in range(start_slot, end_slot):
+        slot_state = is_on(slot)
+        if slot_state != state:
+            transitions.append((slot, slot_state))
+            state = slot_state
+    if state or not transitions:
+        transitions.append((max(start_slot, end_slot), False))
+    return transitions
+
+
+class TransitionTimer:
+    """
+    Applies precomputed transitions for a set of subscribers with one timer.
+
+    The timer is armed for the earliest pending transition of any subscriber. When
+    it fires, only the subscribers with a transition due are called, so nothing
+    happens between transitions however many subscribers there are.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the timer."""
+        self._hass = hass
+        self._pending: dict[Callable[[bool], None], Transitions] = {}
+        self._job = HassJob(self._async_fire, f"{DOMAIN} transition timer")
+        self._cancel_timer: CALLBACK_TYPE | None = None
+        self._armed_slot: int | None = None
+
+    @callback
+    def async_set(
+        self, action: Callable[[bool], None], transitions: Transitions
+    ) -> None:
+        """
+        Replace the transitions for a subscriber.
+
+        Transitions already due are applied immediately, with the latest state.
+        """
+        now_slot = slot_of(dt_util.utcnow())
+        due = [state for slot, state in transitions if slot <= now_slot]
+        if due:
+            action(due[-1])
+        self._pending[action] = [item for item in transitions if item[0] > now_slot]
+        self._async_arm()
+
+    @callback
+    def async_remove(self, action: Callable[[bool], None]) -> None:
+        """Stop applying transitions for a subscriber."""
+        self._pending.pop(action, None)
+        self._async_arm()
+
+    @callback
+    def _async_arm(self) -> None:
+        """Arm the timer for the earliest pending transition."""
+        next_slot = min(
+            (
+                transitions[0][0]
+                for transitions in self._pending.values()
+                if transitions
+            ),
+            default=None,
+        )
+        if next_slot == self._armed_slot:
+            return
+        if self._cancel_timer is not None:
+            self._cancel_timer()
+            self._cancel_timer = None
+        self._armed_slot = next_slot
+        if next_slot is not None:
+            self._cancel_timer = async_track_point_in_utc_time(
+                self._hass, self._job, slot_start(next_slot)
+            )
+            LOGGER.debug("Next transition at %s", slot_start(next_slot))
+
+    @callback
+    def _async_fire(self, now: datetime) -> None:
+        """Apply the transitions that are due."""
+        self._cancel_timer = None
+        self._armed_slot = None
+        now_slot = slot_of(now)
+        for action, transitions in self._pending.items():
+            due = 0
+            while due < len(transitions) and transitions[due][0] <= now_slot:
+                due += 1
+            if due:
+                action(transitions[due - 1][1])
+                del transitions[:due]
+        self._async_arm()
@@ -0,0 +1,143 @@
+"""Searches for the best-paying (or cheapest) slots within a rate series."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import heapq
+from itertools import accumulate
+
+from .rate_series import RateSeries, slot_start
+
+
+@dataclass(frozen=True)
+class RateWindow:
+    """A set of slots, in order, and their average rate."""
+
+    slots: tuple[int, ...]
+    average: float
+
+    @property
+    def start(self) -> datetime:
+        """Get the start of the first slot."""
+        return slot_start(self.slots[0])
+
+    @property
+    def end(self) -> datetime:
+        """Get the end of the last slot."""
+        return slot_start(self.slots[-1] + 1)
+
+
+def find_contiguous_window(
+    rates: RateSeries,
+    length: int,
+    start_slot: int,
+    end_slot: int,
+    highest: bool = True,
+) -> RateWindow | None:
+    """
+    Find the run of slots with the highest (or lowest) total within a range.
+
+    Prefix sums give the total of every run in constant time, so the search is a
+    single pass whatever the length. Runs that include a gap are skipped, and the
+    earliest of equally good runs is chosen.
+    """
+    span = rates.slice_slots(start_slot, end_slot)
+    values = span.values
+    if length <= 0 or len(values) < length:
+        return None
+
+    sums = list(
+        accumulate((0.0 if value != value else value for value in values), initial=0.0)
+    )
+    gaps = list(accumulate((value != value for value in values), initial=0))
+    sign = 1.0 if highest else -1.0
+
+    best_index = -1
+    best_total = 0.0
+    for index in range(len(values) - length + 1):
+        if gaps[index + length] != gaps[index]:
+            continue
+        total = sums[index + length] - sums[index]
+        if best_index < 0 or sign * total > sign * best_total:
+            best_index = index
+            best_total = total
+
+    if best_index < 0:
+        return None
+    first = span.start_slot + best_index
+    return RateWindow(tuple(range(first, first + length)), best_total / length)
+
+
+def find_best_slots(
+    rates: RateSeries,
+    count: int,
+    start_slot: int,
+    end_slot: int,
+    highest: bool = True,
+) -> RateWindow | None:
+    """
+    Find the slots with the highest (or lowest) rates within a range, in any order.
+
+    A bounded heap selects them without sorting the whole range.
+    """
+    if count <= 0:
+        return None
+    items = rates.slice_slots(start_slot, end_slot).items()
+    select = heapq.nlargest if highest else heapq.nsmallest
+    chosen = select(count, items, key=lambda item: item[1])
+    if len(chosen) < count:
+        return None
+    chosen.sort()
+    return RateWindow(
+        tuple(slot for slot, _ in chosen), sum(value for _, value in chosen) / count
+    )
+
+
+class WindowEngine:
+    """
+    Caches searches over one set of rates.
+
+    The best slots within a range remain the best within any narrower range that
+    still contains them. So as time passes, a search from the current slot reuses
+    the previous result until its first slot is in the past.
+    """
+
+    def __init__(self, rates: RateSeries) -> None:
+        """Initialize the engine."""
+        self._rates = rates
+        self._results: dict[
+            tuple[int, int | None, bool, bool], tuple[int, RateWindow | None]
+        ] = {}
+
+    def find(
+        self,
+        length: int,
+        start_slot: int,
+        end_slot: int | None = None,
+        highest: bool = True,
+        contiguous: bool = True,
+    ) -> RateWindow | None:
+        """
+        Find the best slots from a start slot, up to an end slot or the last held.
+
+        Contiguous searches find a run of slots, otherwise any slots may be chosen.
+        """
+        key = (length, end_slot, highest, contiguous)
+        cached = self._results.get(key)
+        if cached is not None:
+            searched_from, window = cached
+            if searched_from <= start_slot and (
+                window is None or window.slots[0] >= start_slot
+            ):
+                return window
+
+        search = find_contiguous_window if contiguous else find_best_slots
+        window = search(
+            self._rates,
+            length,
+            start_slot,
+            self._rates.end_slot if end_slot is None else end_slot,
+            highest,
+        )
+        self._results[key] = (start_slot, window)
+        return window
@@ -0,0 +1,11 @@
+"""Helpers shared by the octopus_export tests."""
+import asyncio
+
+
+async def async_wait_for_start(hass, entry):
+    """Wait for an entry's rates to be brought up to date after setup."""
+    await hass.async_block_till_done()
+    # Setup leaves discovery and the first refresh to a background task, which
+    # async_block_till_done doesn't wait for
+    await asyncio.gather(*entry._background_tasks)
+    await hass.async_block_till_done()
@@ -1,9 +1,16 @@
 """Global fixtures for octopus_export integration."""
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
 import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
+from custom_components.octopus_export.const import CONF_REGION, DOMAIN
 from custom_components.octopus_export.octopus_api import OctopusProduct
+from custom_components.octopus_export.rate_series import RateSeries
+
+from .common import async_wait_for_start
+from .simulator import OctopusApiSimulator
 
 
 @pytest.fixture(autouse=True)
@@ -40,6 +47,68 @@ def error_get_data_fixture():
 def bypass_coordinator_refresh_fixture():
     """Skip calls to refresh tariff pricing."""
     with patch(
-        "custom_components.octopus_export.OctopusTariffUpdateCoordinator._async_update_data",
+        "custom_components.octopus_export.coordinator.OctopusTariffUpdateCoordinator._async_update_data",
+    ) as mock_update:
+        yield mock_update
+
+
+@pytest.fixture(name="day_of_rates")
+def day_of_rates_fixture():
+    """Rates for every slot of 2023-01-03 UTC, rising by a tenth of a penny a slot."""
+    start = datetime(2023, 1, 3, tzinfo=timezone.utc)
+    return RateSeries.from_items(
+        (start + timedelta(minutes=30 * slot), 0.1 + slot / 1000) for slot in range(48)
+    )
+
+
+@pytest.fixture(name="wait_for_start")
+def wait_for_start_fixture(hass):
+    """Wait for an entry to finish starting in the background."""
+
+    async def wait_for_start(entry):
+        await async_wait_for_start(hass, entry)
+
+    return wait_for_start
+
+
+@pytest.fixture(name="load_entry")
+def load_entry_fixture(hass, bypass_get_product):
+    """Load a config entry through Home Assistant, always serving the given rates."""
+    served = RateSeries()
+
+    async def load_entry(rates, options=None):
+        nonlocal served
+        served = rates
+        entry = MockConfigEntry(
+            domain=DOMAIN, data={CONF_REGION: "A"}, options=options or {}
+        )
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await async_wait_for_start(hass, entry)
+        return entry
+
+    async def fetch_data_if_modified(*args, **kwargs):
+        return served
+
+    with patch(
+        "custom_components.octopus_export.octopus_api.AgileTariff.fetch_data_if_modified",
+        side_effect=fetch_data_if_modified,
+    ):
+        yield load_entry
+
+
+@pytest.fixture(name="no_backoff")
+def no_backoff_fixture():
+    """Retry failed requests without waiting."""
+    with patch(
+        "custom_components.octopus_export.octopus_api.random.uniform", return_value=0
     ):
         yield
+
+
+@pytest.fixture(name="simulator")
+async def simulator_fixture(socket_enabled):
+    """Serve the simulated API, and point the integration at it."""
+    async with OctopusApiSimulator() as simulator:
+        with simulator.patch_api():
+            yield simulator
@@ -0,0 +1,137 @@
+"""A load-test harness, running many config entries against the API simulator."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import cycle, islice
+import os
+import pstats
+import statistics
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+import custom_components.octopus_export as integration
+from custom_components.octopus_export.const import CONF_REGION, DATA_CLIENT, DOMAIN
+from custom_components.octopus_export.coordinator import OctopusTariffUpdateCoordinator
+from custom_components.octopus_export.octopus_api import (
+    DNO_REGIONS,
+    OctopusApiClient,
+    TokenBucket,
+)
+
+from .common import async_wait_for_start
+from .simulator import OctopusApiSimulator
+
+_INTEGRATION_DIR = os.path.dirname(os.path.abspath(integration.__file__))
+
+
+@dataclass
+class LoadReport:
+    """The outcome of a load test."""
+
+    entries: int
+    rounds: int
+    setup_seconds: float
+    requests: Counter[str]
+    refresh_latencies: list[float] = field(default_factory=list)
+    integration_cpu: float = 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Get a percentile of the refresh latencies, in seconds."""
+        if len(self.refresh_latencies) < 2:
+            return self.refresh_latencies[0] if self.refresh_latencies else 0.0
+        return statistics.quantiles(self.refresh_latencies, n=100, method="inclusive")[
+            int(percent) - 1
+        ]
+
+    def summary(self) -> str:
+        """Describe the report in a few lines."""
+        requests = ", ".join(
+            f"{endpoint}={count}" for endpoint, count in sorted(self.requests.items())
+        )
+        return "\n".join(
+            (
+                f"{self.entries} entries, {self.rounds} refresh rounds",
+                f"setup: {self.setup_seconds * 1000:.1f} ms",
+                f"requests: {requests}",
+                "refresh latency: "
+                + ", ".join(
+                    f"p{p}={self.percentile(p) * 1000:.1f} ms" for p in (50, 95, 99)
+                ),
+                f"integration CPU: {self.integration_cpu * 1000:.1f} ms",
+            )
+        )
+
+
+async def async_run_load(
+    hass: HomeAssistant,
+    simulator: OctopusApiSimulator,
+    entries: int,
+    rounds: int,
+) -> LoadReport:
+    """
+    Set up config entries across the regions, then refresh them all repeatedly.
+
+    Each round refreshes every coordinator concurrently, timing each refresh. The
+    CPU time spent in the integration's own code is profiled throughout, while time
+    spent waiting on the simulator isn't counted.
+    """
+    # Lift the client's rate limit, which would otherwise dominate the latencies
+    hass.data.setdefault(DOMAIN, {})[DATA_CLIENT] = OctopusApiClient(
+        async_get_clientsession(hass), TokenBucket(10000, 10000)
+    )
+    config_entries = [
+        MockConfigEntry(domain=DOMAIN, data={CONF_REGION: region})
+        for region in islice(cycle(DNO_REGIONS), entries)
+    ]
+    for entry in config_entries:
+        entry.add_to_hass(hass)
+
+    profiler = cProfile.Profile(time.process_time)
+    with simulator.patch_api():
+        profiler.enable()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                hass.config_entries.async_setup(entry.entry_id)
+                for entry in config_entries
+            )
+        )
+        for entry in config_entries:
+            await async_wait_for_start(hass, entry)
+        setup_seconds = time.perf_counter() - start
+
+        coordinators: list[OctopusTariffUpdateCoordinator] = [
+            hass.data[DOMAIN][entry.entry_id] for entry in config_entries
+        ]
+        latencies: list[float] = []
+
+        async def timed_refresh(coordinator: OctopusTariffUpdateCoordinator) -> None:
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            latencies.append(time.perf_counter() - start)
+
+        for _ in range(rounds):
+            await asyncio.gather(*map(timed_refresh, coordinators))
+        profiler.disable()
+
+    stats = pstats.Stats(profiler)
+    integration_cpu = sum(
+        tottime
+        for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items()  # type: ignore[attr-defined]
+        if filename.startswith(_INTEGRATION_DIR)
+    )
+
+    return LoadReport(
+        entries,
+        rounds,
+        setup_seconds,
+        Counter(simulator.requests),
+        latencies,
+        integration_cpu,
+    )
@@ -0,0 +1,296 @@
+"""A local simulator of the Octopus API endpoints used by the integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+from typing import Any
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from homeassistant.util import dt as dt_util
+
+from custom_components.octopus_export.octopus_api import DNO_REGIONS
+from custom_components.octopus_export.rate_series import slot_of, slot_start
+
+EXPORT_PRODUCT = "AGILE-OUTGOING-19-05-13"
+IMPORT_PRODUCT = "AGILE-FLEX-22-11-25"
+
+# Consumption is reported in UK local time, so readings cross DST changes
+_METER_TIME_ZONE = ZoneInfo("Europe/London")
+
+# The real API serves at most this many results a page, and 100 by default
+_MAX_PAGE_SIZE = 1500
+_DEFAULT_PAGE_SIZE = 100
+
+
+def default_rate(slot: int) -> float:
+    """Get a rate in pence for a slot, peaking each afternoon."""
+    return 5.0 + (slot % 48) / 4
+
+
+@dataclass
+class SimulatedRequest:
+    """A request received by the simulator."""
+
+    endpoint: str
+    path: str
+    query: dict[str, str]
+    headers: dict[str, str]
+
+
+@dataclass
+class _Fault:
+    """A failure to return instead of a response."""
+
+    status: int
+    endpoint: str | None
+    retry_after: str | None
+
+
+class OctopusApiSimulator:
+    """
+    Serves products, product details, standard unit rates and consumption.
+
+    Rates are published for every slot up to published_until, which defaults to
+    23:00 UTC tomorrow, and are generated by rate_fn, or by the product's function
+    in product_rate_fns. Rates are served newest first,
+    filtered by period and paged, and consumption oldest first, as the real API does.
+    Responses carry an ETag, and conditional requests that match get a 304.
+
+    Latency can be added to every response, and faults queued to fail the next
+    matching requests with a status and optional Retry-After header.
+    """
+
+    def __init__(
+        self,
+        rate_fn: Callable[[int], float] = default_rate,
+        history: timedelta = timedelta(days=30),
+    ) -> None:
+        """Initialize the simulator."""
+        self.rate_fn = rate_fn
+        self.history = history
+        self.published_until: datetime | None = None
+        self.product_rate_fns: dict[str, Callable[[int], float]] = {}
+        # Other export products are listed first, as they can be by the real API
+        self.products: list[dict[str, Any]] = [
+            {
+                "code": IMPORT_PRODUCT,
+                "direction": "IMPORT",
+                "display_name": "Agile Octopus",
+                "brand": "OCTOPUS_ENERGY",
+                "is_business": False,
+                "available_from": "2022-11-25T00:00:00Z",
+            },
+            {
+                "code": "OUTGOING-FIX-12M-19-05-13",
+                "direction": "EXPORT",
+                "display_name": "Outgoing Octopus 12M Fixed",
+                "brand": "OCTOPUS_ENERGY",
+                "is_business": False,
+                "available_from": "2019-05-13T00:00:00Z",
+            },
+            {
+                "code": "AGILE-OUTGOING-BB-23-02-28",
+                "direction": "EXPORT",
+                "display_name": "Agile Outgoing Octopus (Business)",
+                "brand": "OCTOPUS_ENERGY",
+                "is_business": True,
+                "available_from": "2023-02-28T00:00:00Z",
+            },
+            {
+                "code": EXPORT_PRODUCT,
+                "direction": "EXPORT",
+                "display_name": "Agile Outgoing Octopus",
+                "brand": "OCTOPUS_ENERGY",
+                "is_business": False,
+                "available_from": "2019-05-13T00:00:00Z",
+            },
+        ]
+        self.readings: dict[datetime, float] = {}
+        self.latency = 0.0
+        self.max_page_size = _MAX_PAGE_SIZE
+        self.requests: Counter[str] = Counter()
+        self.log: list[SimulatedRequest] = []
+        self._faults: list[_Fault] = []
+
+        app = web.Application()
+        app.router.add_get("/v1/products/", self._products)
+        app.router.add_get("/v1/products/{product}/", self._product)
+        app.router.add_get(
+            "/v1/products/{product}/electricity-tariffs/{tariff}/standard-unit-rates",
+            self._standard_unit_rates,
+        )
+        app.router.add_get(
+            "/v1/electricity-meter-points/{mpan}/meters/{serial}/consumption/",
+            self._consumption,
+        )
+        self.server = TestServer(app)
+
+    async def __aenter__(self) -> OctopusApiSimulator:
+        """Start serving."""
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Stop serving."""
+        await self.server.close()
+
+    @property
+    def base_url(self) -> str:
+        """Get the URL that stands in for https://api.octopus.energy/v1."""
+        return str(self.server.make_url("/v1"))
+
+    @contextmanager
+    def patch_api(self):
+        """Point the integration's API client at the simulator."""
+        with patch(
+            "custom_components.octopus_export.octopus_api.API_BASE_URL", self.base_url
+        ):
+            yield self
+
+    def fail_next(
+        self,
+        status: int,
+        count: int = 1,
+        endpoint: str | None = None,
+        retry_after: str | None = None,
+    ) -> None:
+        """Fail the next requests, optionally only those for one endpoint."""
+        self._faults.extend(_Fault(status, endpoint, retry_after) for _ in range(count))
+
+    def rates_until(self) -> datetime:
+        """Get the end of the last slot with a published rate."""
+        if self.published_until is not None:
+            return self.published_until
+        tomorrow = dt_util.utcnow().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time(), timezone.utc).replace(
+            hour=23
+        )
+
+    async def _respond(
+        self, request: web.Request, endpoint: str, body: dict[str, Any]
+    ) -> web.Response:
+        """Apply latency and faults, then respond with JSON and an ETag."""
+        self.requests[endpoint] += 1
+        self.log.append(
+            SimulatedRequest(
+                endpoint, request.path, dict(request.query), dict(request.headers)
+            )
+        )
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        for fault in self._faults:
+            if fault.endpoint in (None, endpoint):
+                self._faults.remove(fault)
+                headers = {}
+                if fault.retry_after is not None:
+                    headers["Retry-After"] = fault.retry_after
+                return web.Response(status=fault.status, headers=headers)
+
+        data = json.dumps(body).encode()
+        etag = f'"{hashlib.sha256(data).hexdigest()[:16]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            body=data, content_type="application/json", headers={"ETag": etag}
+        )
+
+    async def _products(self, request: web.Request) -> web.Response:
+        """Serve the list of products."""
+        body = {"count": len(self.products), "next": None, "results": self.products}
+        return await self._respond(request, "products", body)
+
+    async def _product(self, request: web.Request) -> web.Response:
+        """Serve the details of a product, with a tariff for each region."""
+        code = request.match_info["product"]
+        if not any(product["code"] == code for product in self.products):
+            self.requests["product"] += 1
+            raise web.HTTPNotFound()
+        body = {
+            "code": code,
+            "single_register_electricity_tariffs": {
+                f"_{region}": {
+                    "direct_debit_monthly": {"code": f"E-1R-{code}-{region}"}
+                }
+                for region in DNO_REGIONS
+            },
+        }
+        return await self._respond(request, "product", body)
+
+    async def _standard_unit_rates(self, request: web.Request) -> web.Response:
+        """Serve the rates for a period, newest first."""
+        rate_fn = self.product_rate_fns.get(request.match_info["product"], self.rate_fn)
+        end_slot = slot_of(self.rates_until())
+        first_slot = end_slot - int(self.history / timedelta(minutes=30))
+        if "period_from" in request.query:
+            first_slot = max(first_slot, slot_of(_parse(request.query["period_from"])))
+        if "period_to" in request.query:
+            period_to = _parse(request.query["period_to"])
+            end_slot = min(end_slot, slot_of(period_to - timedelta(microseconds=1)) + 1)
+
+        slots = range(end_slot - 1, first_slot - 1, -1)
+        results = [
+            {
+                "value_exc_vat": round(rate_fn(slot) / 1.05, 4),
+                "value_inc_vat": rate_fn(slot),
+                "valid_from": _format(slot_start(slot)),
+                "valid_to": _format(slot_start(slot + 1)),
+                "payment_method": None,
+            }
+            for slot in slots
+        ]
+        return await self._respond(
+            request, "standard-unit-rates", self._page(request, results)
+        )
+
+    async def _consumption(self, request: web.Request) -> web.Response:
+        """Serve meter readings for a period, oldest first, in UK local time."""
+        period_from = _parse(request.query["period_from"])
+        period_to = _parse(request.query["period_to"])
+        results = [
+            {
+                "consumption": value,
+                "interval_start": start.astimezone(_METER_TIME_ZONE).isoformat(),
+                "interval_end": (start + timedelta(minutes=30))
+                .astimezone(_METER_TIME_ZONE)
+                .isoformat(),
+            }
+            for start, value in sorted(self.readings.items())
+            if period_from <= start < period_to
+        ]
+        return await self._respond(request, "consumption", self._page(request, results))
+
+    def _page(self, request: web.Request, results: list[Any]) -> dict[str, Any]:
+        """Select the requested page of results, linking to the next."""
+        page_size = min(
+            int(request.query.get("page_size", _DEFAULT_PAGE_SIZE)), self.max_page_size
+        )
+        page = int(request.query.get("page", 1))
+        next_url = None
+        if page * page_size < len(results):
+            next_url = str(request.url.update_query(page=page + 1))
+        return {
+            "count": len(results),
+            "next": next_url,
+            "previous": None,
+            "results": results[(page - 1) * page_size : page * page_size],
+        }
+
+
+def _parse(value: str) -> datetime:
+    """Parse a timestamp from a query string."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _format(value: datetime) -> str:
+    """Format a timestamp as the API does."""
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,78 @@
+"""Test backfilling rate history into long-term statistics."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.octopus_export.backfill import (
+    async_backfill_statistics,
+    hourly_statistics,
+)
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+from custom_components.octopus_export.storage import TariffCache
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+WEEK = timedelta(days=7)
+
+
+def test_hourly_statistics():
+    """Ensure each hour's slots are summarised together, skipping empty hours."""
+    rates = RateSeries.from_slots(
+        {slot_of(START): 0.1, slot_of(START) + 1: 0.2, slot_of(START) + 5: 0.4}
+    )
+
+    assert hourly_statistics(rates) == [
+        {"start": START, "mean": 0.15, "min": 0.1, "max": 0.2},
+        {"start": START + timedelta(hours=2), "mean": 0.4, "min": 0.4, "max": 0.4},
+    ]
+
+
+class _FakeTariff:
+    """A tariff serving one rate a week, failing after a number of weeks."""
+
+    def __init__(self, fail_after=None):
+        self.requested_from = []
+        self._fail_after = fail_after
+
+    async def iter_history(self, period_from, period_to):
+        self.requested_from.append(period_from)
+        week = 0
+        while period_from < period_to:
+            if week == self._fail_after:
+                raise ConnectionError
+            week_to = min(period_from + WEEK, period_to)
+            yield week_to, RateSeries.from_slots({slot_of(period_from): 0.1})
+            period_from = week_to
+            week += 1
+
+
+async def test_backfill_imports_weekly_batches_and_resumes(hass, hass_storage):
+    """Ensure each week is imported separately, and an interrupted run resumes."""
+    cache = TariffCache(hass, "test")
+    end = START + 4 * WEEK
+
+    with patch(
+        "custom_components.octopus_export.backfill._import_statistics"
+    ) as import_statistics:
+        with pytest.raises(ConnectionError):
+            await async_backfill_statistics(
+                hass, _FakeTariff(fail_after=2), cache, "A", START, end
+            )
+        assert import_statistics.call_count == 2
+
+        tariff = _FakeTariff()
+        await async_backfill_statistics(hass, tariff, cache, "A", START, end)
+        assert tariff.requested_from == [START + 2 * WEEK]
+        assert import_statistics.call_count == 4
+
+        # A completed backfill does nothing when repeated
+        tariff = _FakeTariff()
+        await async_backfill_statistics(hass, tariff, cache, "A", START, end)
+        assert tariff.requested_from == [end]
+        assert import_statistics.call_count == 4
+
+    metadata, statistics = import_statistics.call_args.args[1:]
+    assert metadata["statistic_id"] == "octopus_export:agile_export_rate_a"
+    assert statistics == [
+        {"start": START + 3 * WEEK, "mean": 0.1, "min": 0.1, "max": 0.1}
+    ]
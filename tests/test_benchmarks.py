@@ -0,0 +1,375 @@
+"""
+Benchmarks of the paths run on every refresh and every state write.
+
+The suite runs each benchmark once as a plain test by default. To measure, and
+compare against the committed baselines in tests/benchmarks:
+
+    pytest tests/test_benchmarks.py --benchmark-enable \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+After an intended change in performance, save a new baseline with
+--benchmark-save=baseline, and commit it alongside the change.
+"""
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+import json
+from time import perf_counter
+import tracemalloc
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export.const import (
+    CONF_REGION,
+    CONF_RETENTION_DAYS,
+    DOMAIN,
+)
+from custom_components.octopus_export.coordinator import OctopusTariffUpdateCoordinator
+from custom_components.octopus_export.forecast import SLOTS_PER_DAY, SeasonalRateModel
+from custom_components.octopus_export.octopus_api import (
+    AgileTariff,
+    OctopusApiClient,
+    TokenBucket,
+    get_start_of_current_interval,
+)
+from custom_components.octopus_export.periods import PeriodIndex, find_daily_windows
+from custom_components.octopus_export.planner import (
+    SOC_STEP,
+    BatterySpec,
+    DispatchPlanner,
+)
+from custom_components.octopus_export.ranks import RateRanks, RollingStats
+from custom_components.octopus_export.rate_series import RateSeries, slot_of, slot_start
+from custom_components.octopus_export.sensor import CurrentRateSensor
+from custom_components.octopus_export.spread import RateSpread
+
+# Synthetic datasets, from the two days held by default to years of history
+DATASETS = {
+    "1d": 48,
+    "2d": 2 * 48,
+    "1m": 31 * 48,
+    "1y": 365 * 48,
+    "3y": 3 * 365 * 48,
+}
+_PAGE_SIZE = 1500
+
+
+def _rates_until() -> datetime:
+    """Get the end of the rates published so far: 23:00 UTC tomorrow."""
+    tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, time(23), timezone.utc)
+
+
+def _dataset(slots: int, end: datetime | None = None) -> RateSeries:
+    """Create a series of rates for a number of slots, ending at the given time."""
+    end_slot = slot_of(end or _rates_until())
+    return RateSeries.from_slots(
+        {
+            slot: round(0.05 + (slot % 48) / 400, 4)
+            for slot in range(end_slot - slots, end_slot)
+        }
+    )
+
+
+def _pages(rates: RateSeries) -> list[bytes]:
+    """Encode rates as pages of API results, newest first."""
+    results = [
+        {
+            "value_exc_vat": round(value * 100 / 1.05, 4),
+            "value_inc_vat": round(value * 100, 2),
+            "valid_from": slot_start(slot).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "valid_to": slot_start(slot + 1).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "payment_method": None,
+        }
+        for slot, value in reversed(list(rates.items()))
+    ]
+    pages = [
+        results[offset : offset + _PAGE_SIZE]
+        for offset in range(0, len(results), _PAGE_SIZE)
+    ]
+    return [
+        json.dumps(
+            {
+                "count": len(results),
+                "next": f"page={number + 2}" if number + 1 < len(pages) else None,
+                "results": page,
+            }
+        ).encode()
+        for number, page in enumerate(pages)
+    ]
+
+
+class _Response:
+    """A successful response with a fixed body."""
+
+    status = 200
+    headers: dict[str, str] = {}
+
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    def raise_for_status(self) -> None:
+        """Succeed."""
+
+    async def read(self) -> bytes:
+        """Get the body."""
+        return self._body
+
+
+class _Session:
+    """A session serving pages of results in turn."""
+
+    def __init__(self, pages: list[bytes]) -> None:
+        self._pages = iter(pages)
+
+    async def get(self, url, headers=None, auth=None):
+        """Get the next page."""
+        return _Response(next(self._pages))
+
+
+def _complete(coro):
+    """Run a coroutine that never needs to wait, without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as result:
+        return result.value
+    raise AssertionError("Coroutine suspended")
+
+
+async def _coordinator(hass, rates: RateSeries) -> OctopusTariffUpdateCoordinator:
+    """Create a coordinator holding rates, retaining everything it holds."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_REGION: "A"},
+        options={CONF_RETENTION_DAYS: 4 * 365},
+    )
+    cache = AsyncMock()
+    tariff = AgileTariff(None, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-A")
+    coordinator = OctopusTariffUpdateCoordinator(hass, entry, cache, tariff)
+    # The product was checked just now, so refreshes only fetch rates
+    coordinator.async_restore(rates, datetime.now(timezone.utc))
+    return coordinator
+
+
+@pytest.mark.parametrize("size", DATASETS)
+def test_fetch_data(benchmark, size):
+    """Benchmark fetching and parsing every page of rates for a period."""
+    rates = _dataset(DATASETS[size])
+    pages = _pages(rates)
+    loop = asyncio.new_event_loop()
+
+    def fetch():
+        # A new client each time, so no response is recognised as unchanged
+        client = OctopusApiClient(_Session(pages), TokenBucket(1e9, 10**9))
+        tariff = AgileTariff(client, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-A")
+        return loop.run_until_complete(tariff.fetch_data(rates.start, rates.end))
+
+    try:
+        assert benchmark(fetch) == rates
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize("size", DATASETS)
+async def test_update_data(hass, benchmark, size):
+    """Benchmark a refresh merging a new day of rates into those held."""
+    held = _dataset(DATASETS[size], _rates_until() - timedelta(days=1))
+    new_day = _dataset(48)
+    coordinator = await _coordinator(hass, held)
+
+    def setup():
+        coordinator.rates = held
+
+    with patch.object(
+        coordinator.tariff, "fetch_data_if_modified", AsyncMock(return_value=new_day)
+    ):
+        benchmark.pedantic(
+            lambda: _complete(coordinator._async_update_data()),
+            setup=setup,
+            rounds=20,
+        )
+
+    assert coordinator.rates.end == new_day.end
+    assert len(coordinator.rates) == len(held) + 48
+
+
+@pytest.mark.parametrize("size", DATASETS)
+async def test_refresh_allocations(hass, benchmark, size):
+    """
+    Profile the memory allocated by a refresh, with and without new rates.
+
+    Peak and total allocations are recorded in the benchmark's extra info, so they
+    are saved in the baselines. A refresh that finds nothing new must allocate
+    little, however many rates are held.
+    """
+    held = _dataset(DATASETS[size], _rates_until() - timedelta(days=1))
+    new_day = _dataset(48)
+    coordinator = await _coordinator(hass, held)
+    fetch = AsyncMock()
+
+    def profile(new_rates):
+        coordinator.rates = held
+        fetch.return_value = new_rates
+        tracemalloc.start()
+        try:
+            _complete(coordinator._async_update_data())
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        total = sum(stat.size for stat in snapshot.statistics("filename"))
+        return peak, total
+
+    with patch.object(coordinator.tariff, "fetch_data_if_modified", fetch):
+        unchanged_peak, unchanged_total = profile(None)
+        changed_peak, changed_total = profile(new_day)
+        benchmark(lambda: _complete(coordinator._async_update_data()))
+
+    benchmark.extra_info.update(
+        {
+            "unchanged_peak_bytes": unchanged_peak,
+            "unchanged_retained_bytes": unchanged_total,
+            "changed_peak_bytes": changed_peak,
+            "changed_retained_bytes": changed_total,
+        }
+    )
+    assert unchanged_peak < 8 * 1024
+    # Merging rebuilds one array of rates, at eight bytes a slot
+    assert changed_peak < 2 * 8 * (len(held) + 48) + 256 * 1024
+
+
+@pytest.mark.parametrize("size", DATASETS)
+async def test_rates_today(hass, benchmark, size):
+    """Benchmark building today's and tomorrow's rates after the rates change."""
+    await hass.config.async_update(time_zone="UTC")
+    rates = _dataset(DATASETS[size])
+    coordinator = await _coordinator(hass, rates)
+
+    def build():
+        coordinator.rates = rates
+        return coordinator.rates_today, coordinator.rates_tomorrow
+
+    today, tomorrow = benchmark(build)
+    assert len(tomorrow) == 46
+
+
+@pytest.mark.parametrize("size", DATASETS)
+async def test_sensor_state_write(hass, benchmark, size):
+    """
+    Benchmark the sensor's state and attributes, as computed for each state write.
+
+    The rate tables are built once per refresh, so the cost of each write doesn't
+    grow with the number of slots held.
+    """
+    rates = _dataset(DATASETS[size])
+    coordinator = await _coordinator(hass, rates)
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_REGION: "A"})
+    sensor = CurrentRateSensor(coordinator, entry)
+
+    def write():
+        return sensor.native_value, sensor.extra_state_attributes
+
+    value, attributes = benchmark(write)
+    assert value == rates.get(get_start_of_current_interval())
+    assert attributes["rates_tomorrow"] is coordinator.rates_tomorrow
+
+
+@pytest.mark.parametrize("size", DATASETS)
+def test_forecast(benchmark, size):
+    """Benchmark fitting the forecast model to the rates held, and forecasting."""
+    rates = _dataset(DATASETS[size])
+
+    def forecast():
+        model = SeasonalRateModel.fit(rates)
+        return model.predict(rates.end_slot, 4 * SLOTS_PER_DAY)
+
+    assert len(benchmark(forecast)) == 4 * SLOTS_PER_DAY
+
+
+def test_battery_plan(benchmark):
+    """
+    Benchmark planning a battery's dispatch over two days, from scratch.
+
+    The plan works to the planner's finest state of charge, a hundredth of a kWh,
+    for a battery of 13.5 kWh. It must solve well within 100 ms.
+    """
+    rates = _dataset(2 * SLOTS_PER_DAY)
+    spec = BatterySpec(
+        capacity=13.5, charge_power=5, discharge_power=5, efficiency=0.9, reserve=1.35
+    )
+
+    def plan():
+        return DispatchPlanner(spec, SOC_STEP).plan(rates, rates.start_slot, 5.0)
+
+    start = perf_counter()
+    plan()
+    assert perf_counter() - start < 0.1
+
+    result = benchmark(plan)
+    assert len(result) == 2 * SLOTS_PER_DAY
+    assert result.value > 0
+
+
+@pytest.mark.parametrize("size", DATASETS)
+def test_spread(benchmark, size):
+    """Benchmark comparing export rates with import rates, and finding those beaten."""
+    export = _dataset(DATASETS[size])
+    import_ = RateSeries.from_slots(
+        {slot: 0.12 for slot in range(export.start_slot, export.end_slot)}
+    )
+
+    def compare():
+        spread = RateSpread(export, import_)
+        return spread.beating_slots(spread.start_slot, spread.end_slot)
+
+    # Export beats 0.12 in the last 19 slots of each day
+    assert len(benchmark(compare)) == len(export) * 19 // 48
+
+
+@pytest.mark.parametrize("size", DATASETS)
+def test_rate_statistics_tick(benchmark, size):
+    """
+    Benchmark the rate statistics at the start of a slot, once the indexes are built.
+
+    The rank index covers every rate held, so the cost of ranking the current rate
+    grows only with the log of the rates held.
+    """
+    rates = _dataset(DATASETS[size])
+    ranks = RateRanks(rates, rates.start_slot, rates.end_slot)
+    horizon = RollingStats(rates, SLOTS_PER_DAY)
+    horizon.advance(rates.start_slot)
+    slots = iter(range(rates.start_slot + 1, rates.end_slot))
+
+    def tick():
+        slot = next(slots, rates.start_slot)
+        horizon.advance(slot)
+        rate = rates.get_slot(slot)
+        return ranks.rank(rate), ranks.percentile(90), horizon.mean
+
+    rank, percentile, mean = benchmark(tick)
+    assert rank >= 1
+    assert percentile is not None and mean is not None
+
+
+@pytest.mark.parametrize("size", DATASETS)
+def test_calendar_month_view(benchmark, size):
+    """
+    Benchmark finding a month of calendar events, once the periods are indexed.
+
+    The periods are found once after the rates change. A month view must then cost
+    the same however much history is held.
+    """
+    rates = _dataset(DATASETS[size])
+    index = PeriodIndex(find_daily_windows(rates, 4))
+    end_slot = rates.end_slot
+    start_slot = end_slot - 31 * SLOTS_PER_DAY
+
+    periods = benchmark(lambda: index.overlapping(start_slot, end_slot))
+    # Each local day has two windows, and a month spans at most 32 days
+    assert 0 < len(periods) <= 2 * 32
+
+
+def test_start_of_current_interval(benchmark):
+    """Benchmark finding the start of the current slot."""
+    assert benchmark(get_start_of_current_interval).minute in (0, 30)
@@ -0,0 +1,40 @@
+"""Test the octopus_export binary sensors."""
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.octopus_export.const import CONF_THRESHOLDS, CONF_TOP_SLOTS
+
+ABOVE_ID = "binary_sensor.agile_export_rate_above_0_13"
+TOP_ID = "binary_sensor.in_top_2_agile_export_slots_today"
+
+
+async def test_binary_sensors_follow_transitions(
+    hass, freezer, load_entry, day_of_rates
+):
+    """Ensure binary sensors change state at their transitions, and only then."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    entry = await load_entry(day_of_rates, {CONF_THRESHOLDS: [0.13], CONF_TOP_SLOTS: 2})
+    assert hass.states.get(ABOVE_ID).state == "off"
+    assert hass.states.get(TOP_ID).state == "off"
+
+    with patch(
+        "custom_components.octopus_export.binary_sensor.RateAboveThresholdSensor._find_transitions"
+    ) as find_transitions:
+        for time, above, top in (
+            ("2023-01-03T15:00:00Z", "off", "off"),
+            ("2023-01-03T15:30:00Z", "on", "off"),
+            ("2023-01-03T23:00:00Z", "on", "on"),
+            ("2023-01-04T00:00:00Z", "off", "off"),
+        ):
+            freezer.move_to(time)
+            async_fire_time_changed(hass)
+            await hass.async_block_till_done()
+            assert hass.states.get(ABOVE_ID).state == above
+            assert hass.states.get(TOP_ID).state == top
+
+    # Nothing is recomputed between refreshes
+    find_transitions.assert_not_called()
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
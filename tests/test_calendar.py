@@ -0,0 +1,149 @@
+"""Test the calendars of notable export periods."""
+from array import array
+from datetime import datetime, timezone
+import math
+import random
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.octopus_export.const import CONF_THRESHOLDS, DOMAIN
+from custom_components.octopus_export.periods import (
+    LOWEST_WINDOW,
+    PEAK_WINDOW,
+    PeriodIndex,
+    RatePeriod,
+    find_daily_windows,
+    find_runs_above,
+)
+from custom_components.octopus_export.rate_series import RateSeries
+
+NAN = math.nan
+
+
+def test_index_finds_overlapping_periods():
+    """Ensure range queries match a scan of every period, however long each is."""
+    rng = random.Random(25)
+    periods = [
+        RatePeriod(start, start + rng.choice([1, 2, 4, 30]), "Period")
+        for start in (rng.randrange(1000) for _ in range(200))
+    ]
+    index = PeriodIndex(periods)
+
+    for _ in range(500):
+        start = rng.randrange(-50, 1050)
+        end = start + rng.randrange(0, 60)
+        assert index.overlapping(start, end) == sorted(
+            (
+                period
+                for period in periods
+                if period.start_slot < end and period.end_slot > start
+            ),
+            key=lambda period: (period.start_slot, period.end_slot),
+        )
+
+
+def test_current_or_next():
+    """Ensure the period in progress is preferred over the next."""
+    index = PeriodIndex(
+        [
+            RatePeriod(10, 20, "Long"),
+            RatePeriod(12, 14, "Short"),
+            RatePeriod(30, 31, ""),
+        ]
+    )
+
+    assert index.current_or_next(0).summary == "Long"
+    assert index.current_or_next(13).summary == "Long"
+    assert index.current_or_next(20).start_slot == 30
+    assert index.current_or_next(31) is None
+    assert PeriodIndex(()).current_or_next(0) is None
+
+
+def test_runs_above():
+    """Ensure runs above a threshold are ended by lower rates and gaps."""
+    rates = RateSeries(10, array("d", [0.2, 0.1, 0.2, 0.2, NAN, 0.3, 0.15, 0.2]))
+
+    assert [
+        (period.start_slot, period.end_slot) for period in find_runs_above(rates, 0.15)
+    ] == [(10, 11), (12, 14), (15, 16), (17, 18)]
+    assert find_runs_above(rates, 0.3) == []
+
+
+async def test_daily_windows(hass, day_of_rates):
+    """Ensure each local day has a peak and a lowest window."""
+    await hass.config.async_update(time_zone="UTC")
+
+    periods = find_daily_windows(day_of_rates, 4)
+    assert [(period.summary, period.start, period.end) for period in periods] == [
+        (
+            PEAK_WINDOW,
+            datetime(2023, 1, 3, 22, tzinfo=timezone.utc),
+            datetime(2023, 1, 4, tzinfo=timezone.utc),
+        ),
+        (
+            LOWEST_WINDOW,
+            datetime(2023, 1, 3, tzinfo=timezone.utc),
+            datetime(2023, 1, 3, 2, tzinfo=timezone.utc),
+        ),
+    ]
+    assert periods[0].description == "Average rate £0.1455/kWh"
+
+    # A day in another time zone spans two UTC days, each with part of the rates
+    await hass.config.async_update(time_zone="US/Pacific")
+    assert len(find_daily_windows(day_of_rates, 4)) == 4
+
+
+async def test_calendars(hass, freezer, load_entry, day_of_rates):
+    """Ensure the calendars show the current or next event, and any range."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    entry = await load_entry(day_of_rates, {CONF_THRESHOLDS: [0.14]})
+    index = hass.data[DOMAIN][entry.entry_id].window_periods
+
+    state = hass.states.get("calendar.agile_export_windows")
+    assert state.state == "off"
+    assert state.attributes["message"] == PEAK_WINDOW
+    assert state.attributes["start_time"] == "2023-01-03 22:00:00"
+
+    # Rates rise by 0.001 a slot from 0.1, so pass 0.14 from 20:30
+    state = hass.states.get("calendar.agile_export_rate_above_thresholds")
+    assert state.attributes["message"] == "Export rate above £0.14"
+    assert state.attributes["start_time"] == "2023-01-03 20:30:00"
+    assert state.attributes["end_time"] == "2023-01-04 00:00:00"
+
+    response = await hass.services.async_call(
+        "calendar",
+        "get_events",
+        {
+            "entity_id": "calendar.agile_export_windows",
+            "start_date_time": "2023-01-03T01:15:00+00:00",
+            "end_date_time": "2023-01-03T22:10:00+00:00",
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert [
+        (event["summary"], event["start"])
+        for event in response["calendar.agile_export_windows"]["events"]
+    ] == [
+        (LOWEST_WINDOW, "2023-01-03T00:00:00+00:00"),
+        (PEAK_WINDOW, "2023-01-03T22:00:00+00:00"),
+    ]
+
+    # The calendar turns on at the start of the event, without a refresh
+    freezer.move_to("2023-01-03T22:00:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert hass.states.get("calendar.agile_export_windows").state == "on"
+    assert hass.data[DOMAIN][entry.entry_id].window_periods is index
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_no_thresholds_calendar(hass, freezer, load_entry, day_of_rates):
+    """Ensure the thresholds calendar is only added with thresholds to follow."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    await load_entry(day_of_rates)
+
+    assert hass.states.get("calendar.agile_export_windows") is not None
+    assert hass.states.get("calendar.agile_export_rate_above_thresholds") is None
@@ -0,0 +1,87 @@
+"""Test the shared product catalogue."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.octopus_export.catalogue import async_get_catalogue
+from custom_components.octopus_export.octopus_api import OctopusProduct
+
+PRODUCT = OctopusProduct(
+    "AGILE-OUTGOING-19-05-13",
+    "Agile Outgoing Octopus May 2019",
+    {"A": "E-1R-AGILE-OUTGOING-19-05-13-A"},
+)
+
+
+async def test_concurrent_discovery_is_coalesced(hass, freezer):
+    """Ensure concurrent callers share one discovery, which is then cached."""
+    release = asyncio.Event()
+
+    async def discover(self, current=None, with_import=False):
+        await release.wait()
+        return PRODUCT
+
+    with patch(
+        "custom_components.octopus_export.octopus_api.ProductService.async_get_export_product",
+        side_effect=discover,
+        autospec=True,
+    ) as mock_discover:
+        catalogue = async_get_catalogue(hass)
+        tasks = [
+            hass.async_create_task(catalogue.async_get_export_product())
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == [PRODUCT] * 5
+        assert await catalogue.async_get_export_product() == PRODUCT
+        assert mock_discover.call_count == 1
+
+        # Discovery is repeated once the cached product expires
+        freezer.tick(13 * 3600)
+        assert await async_get_catalogue(hass).async_get_export_product() == PRODUCT
+        assert mock_discover.call_count == 2
+
+
+async def test_discovery_failure_is_shared_and_retried(hass):
+    """Ensure a failed discovery isn't cached."""
+    with patch(
+        "custom_components.octopus_export.octopus_api.ProductService.async_get_export_product",
+        side_effect=[Exception, PRODUCT],
+    ):
+        catalogue = async_get_catalogue(hass)
+        with pytest.raises(Exception):
+            await catalogue.async_get_export_product()
+
+        assert await catalogue.async_get_export_product() == PRODUCT
+
+
+async def test_import_product_is_looked_for_once_wanted(hass):
+    """Ensure a product found without its import product is found again with it."""
+    release = asyncio.Event()
+
+    async def discover(self, current=None, with_import=False):
+        await release.wait()
+        return PRODUCT
+
+    with patch(
+        "custom_components.octopus_export.octopus_api.ProductService.async_get_export_product",
+        side_effect=discover,
+        autospec=True,
+    ) as mock_discover:
+        catalogue = async_get_catalogue(hass)
+        export_only = hass.async_create_task(catalogue.async_get_export_product())
+        await asyncio.sleep(0)
+        paired = hass.async_create_task(catalogue.async_get_export_product(True))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(export_only, paired)
+
+        assert [call.args[2] for call in mock_discover.call_args_list] == [False, True]
+
+        # Both kinds of caller are then served from the cache
+        await catalogue.async_get_export_product()
+        await catalogue.async_get_export_product(True)
+        assert mock_discover.call_count == 2
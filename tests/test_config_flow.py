@@ -0,0 +1,131 @@
+"""Test the octopus_export config and options flows."""
+from unittest.mock import AsyncMock, patch
+
+from homeassistant import config_entries, data_entry_flow
+from homeassistant.const import CONF_API_KEY
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export.const import (
+    CONF_BATTERY_CAPACITY,
+    CONF_BATTERY_CHARGE_POWER,
+    CONF_BATTERY_DISCHARGE_POWER,
+    CONF_BATTERY_EFFICIENCY,
+    CONF_BATTERY_RESERVE,
+    CONF_BATTERY_SOC_ENTITY,
+    CONF_FORECAST_DAYS,
+    CONF_IMPORT_RATES,
+    CONF_METER_SERIAL,
+    CONF_MPAN,
+    CONF_REGION,
+    CONF_RETENTION_DAYS,
+    CONF_SHARED_REFRESH,
+    CONF_SLIM_ATTRIBUTES,
+    CONF_THRESHOLDS,
+    CONF_TOP_SLOTS,
+    CONF_WINDOW_SLOTS,
+    DOMAIN,
+)
+from custom_components.octopus_export.octopus_api import get_start_of_current_interval
+from custom_components.octopus_export.rate_series import RateSeries
+
+
+async def test_user_flow_seeds_new_entry(hass, bypass_get_product):
+    """Ensure rates fetched by the flow are used by the entry, without refetching."""
+    rates = RateSeries.from_items([(get_start_of_current_interval(), 0.15)])
+
+    with patch(
+        "custom_components.octopus_export.octopus_api.AgileTariff.fetch_data",
+        AsyncMock(return_value=rates),
+    ) as mock_fetch:
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        assert result["type"] == data_entry_flow.FlowResultType.FORM
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], user_input={CONF_REGION: "A"}
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert result["data"] == {CONF_REGION: "A"}
+    mock_fetch.assert_awaited_once()
+
+    entry = result["result"]
+    assert hass.data[DOMAIN][entry.entry_id].rates == rates
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_options_flow(hass, bypass_get_product, bypass_coordinator_refresh):
+    """Ensure the retention window can be changed through the options flow."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_REGION: "A"}, entry_id="test"
+    )
+    config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "init"
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CONF_RETENTION_DAYS: 7.0,
+            CONF_SHARED_REFRESH: True,
+            CONF_SLIM_ATTRIBUTES: True,
+            CONF_WINDOW_SLOTS: 6.0,
+            CONF_THRESHOLDS: "0.2, 0.15,0.2",
+            CONF_TOP_SLOTS: 4.0,
+            CONF_FORECAST_DAYS: 2.0,
+            CONF_BATTERY_CAPACITY: 9.5,
+            CONF_BATTERY_SOC_ENTITY: "sensor.battery_level",
+            CONF_MPAN: " 1234567890123 ",
+            CONF_METER_SERIAL: "21E1234567",
+        },
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert config_entry.options == {
+        CONF_RETENTION_DAYS: 7,
+        CONF_SHARED_REFRESH: True,
+        CONF_SLIM_ATTRIBUTES: True,
+        CONF_WINDOW_SLOTS: 6,
+        CONF_THRESHOLDS: [0.15, 0.2],
+        CONF_TOP_SLOTS: 4,
+        CONF_FORECAST_DAYS: 2,
+        CONF_IMPORT_RATES: False,
+        CONF_BATTERY_CAPACITY: 9.5,
+        CONF_BATTERY_CHARGE_POWER: 3.0,
+        CONF_BATTERY_DISCHARGE_POWER: 3.0,
+        CONF_BATTERY_EFFICIENCY: 90,
+        CONF_BATTERY_RESERVE: 10,
+        CONF_BATTERY_SOC_ENTITY: "sensor.battery_level",
+        CONF_MPAN: "1234567890123",
+        CONF_METER_SERIAL: "21E1234567",
+        CONF_API_KEY: "",
+    }
+    assert isinstance(config_entry.options[CONF_RETENTION_DAYS], int)
+
+
+async def test_options_flow_rejects_invalid_thresholds(
+    hass, bypass_get_product, bypass_coordinator_refresh
+):
+    """Ensure thresholds that aren't numbers are rejected."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_REGION: "A"}, entry_id="test"
+    )
+    config_entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        user_input={
+            CONF_RETENTION_DAYS: 2,
+            CONF_SHARED_REFRESH: False,
+            CONF_SLIM_ATTRIBUTES: False,
+            CONF_WINDOW_SLOTS: 4,
+            CONF_THRESHOLDS: "0.15, high",
+            CONF_TOP_SLOTS: 0,
+        },
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {CONF_THRESHOLDS: "invalid_thresholds"}
@@ -0,0 +1,96 @@
+"""Test the octopus_export diagnostics."""
+from homeassistant.const import CONF_API_KEY
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import EntityCategory
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export.const import (
+    CONF_METER_SERIAL,
+    CONF_MPAN,
+    CONF_REGION,
+    DOMAIN,
+)
+from custom_components.octopus_export.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+
+from .common import async_wait_for_start
+
+
+async def _setup(hass, options=None):
+    """Set up an entry against the simulator."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_REGION: "A"}, options=options or {}
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await async_wait_for_start(hass, entry)
+    return entry
+
+
+async def test_diagnostics(hass, freezer, simulator):
+    """Ensure diagnostics report request and update statistics, without secrets."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    entry = await _setup(
+        hass,
+        {
+            CONF_MPAN: "1234567890123",
+            CONF_METER_SERIAL: "21E1234567",
+            CONF_API_KEY: "sk_test",
+        },
+    )
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["entry"]["options"] == {
+        CONF_MPAN: "**REDACTED**",
+        CONF_METER_SERIAL: "**REDACTED**",
+        CONF_API_KEY: "**REDACTED**",
+    }
+    assert diagnostics["rates"]["slots_held"] == 166
+    assert diagnostics["coordinator"]["updates"] == 1
+    assert diagnostics["coordinator"]["last_update_duration"] is not None
+    assert diagnostics["earnings"]["last_update_success"]
+
+    rates = diagnostics["api"]["endpoints"]["standard-unit-rates"]
+    assert rates["requests"] == 2
+    assert rates["retries"] == 0
+    assert rates["bytes_received"] > 0
+    assert sum(rates["latency_buckets"]) == rates["attempts"]
+    assert len(rates["latency_buckets"]) == len(diagnostics["api"]["latency_buckets"])
+
+
+async def test_cache_hits_and_retries(hass, freezer, simulator, no_backoff):
+    """Ensure revalidated responses count as cache hits, and retries are counted."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    entry = await _setup(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    simulator.fail_next(503, endpoint="standard-unit-rates")
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert coordinator.api_stats.requests == 4
+    assert coordinator.api_stats.retries == 1
+    assert coordinator.api_stats.cache_hit_ratio == 0.25
+
+
+async def test_diagnostic_sensors(hass, freezer, simulator):
+    """Ensure diagnostic sensors are disabled by default, and report when enabled."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    registry = er.async_get(hass)
+    for key in ("slots_held", "rates_published_until", "api_cache_hit_ratio"):
+        registry.async_get_or_create(
+            "sensor", DOMAIN, f"export-A_{key}", suggested_object_id=key
+        )
+    await _setup(hass)
+
+    entry = registry.async_get("sensor.agile_export_update_duration")
+    assert entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+    assert entry.entity_category is EntityCategory.DIAGNOSTIC
+    assert hass.states.get("sensor.agile_export_update_duration") is None
+
+    assert hass.states.get("sensor.slots_held").state == "166"
+    assert (
+        hass.states.get("sensor.rates_published_until").state
+        == "2023-01-04T23:00:00+00:00"
+    )
+    assert hass.states.get("sensor.api_cache_hit_ratio").state == "0.0"
@@ -0,0 +1,102 @@
+"""Test export earnings from meter readings."""
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from aiohttp import ClientSession
+import pytest
+
+from custom_components.octopus_export.earnings import (
+    EarningsCoordinator,
+    earnings_by_day,
+)
+from custom_components.octopus_export.octopus_api import ExportMeter, OctopusApiClient
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+from custom_components.octopus_export.storage import TariffCache
+
+from .simulator import OctopusApiSimulator
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SLOT = timedelta(minutes=30)
+
+
+async def test_earnings_by_day_skips_gaps(hass):
+    """Ensure only slots with both a reading and a rate are counted, by local day."""
+    await hass.config.async_update(time_zone="UTC")
+    first = slot_of(START + timedelta(hours=23))
+    readings = RateSeries.from_slots({first: 1.0, first + 1: 2.0, first + 2: 4.0})
+    rates = RateSeries.from_slots({first: 0.1, first + 2: 0.2, first + 3: 0.3})
+
+    assert earnings_by_day(readings, rates) == {
+        date(2023, 1, 1): pytest.approx(0.1),
+        date(2023, 1, 2): pytest.approx(0.8),
+    }
+    assert earnings_by_day(readings, RateSeries()) == {}
+
+
+async def test_earnings_by_day_over_years(hass):
+    """Ensure years of readings are totalled for every day."""
+    await hass.config.async_update(time_zone="UTC")
+    slots = 2 * 365 * 48
+    readings = RateSeries.from_slots(
+        {slot_of(START) + slot: 0.5 for slot in range(slots)}
+    )
+    rates = RateSeries.from_slots({slot_of(START) + slot: 0.2 for slot in range(slots)})
+
+    totals = earnings_by_day(readings, rates)
+    assert len(totals) == 730
+    assert all(total == pytest.approx(4.8) for total in totals.values())
+
+
+async def test_earnings_are_incremental_and_persisted(
+    hass, hass_storage, freezer, socket_enabled
+):
+    """Ensure only new readings are fetched, and totals survive a restart."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    day_2 = datetime(2023, 1, 2, tzinfo=timezone.utc)
+    simulator = OctopusApiSimulator()
+    simulator.readings = {day_2 + n * SLOT: 1.0 + n for n in range(3)}
+    simulator.max_page_size = 2
+
+    tariff_coordinator = SimpleNamespace(
+        rates=RateSeries.from_slots({slot_of(day_2) + n: 0.2 for n in range(96)}),
+        tariff=None,
+    )
+    async with simulator, ClientSession() as session:
+        with simulator.patch_api():
+            meter = ExportMeter(
+                OctopusApiClient(session),
+                "1234567890123",
+                "21E1234567",
+                "sk_test",
+            )
+
+            earnings = EarningsCoordinator(
+                hass, meter, tariff_coordinator, TariffCache(hass, "test")
+            )
+            await earnings.async_load()
+            await earnings.async_refresh()
+            assert earnings.data.days == {date(2023, 1, 2): pytest.approx(1.2)}
+            assert earnings.earned_this_month == 1.2
+            assert earnings.earned_today == 0.0
+            assert _requested_from(simulator) == [START]
+            assert simulator.log[-1].headers["Authorization"].startswith("Basic ")
+
+            # After a restart, only readings since the last are fetched
+            simulator.readings[day_2 + 3 * SLOT] = 5.0
+            earnings = EarningsCoordinator(
+                hass, meter, tariff_coordinator, TariffCache(hass, "test")
+            )
+            await earnings.async_load()
+            await earnings.async_refresh()
+            assert _requested_from(simulator) == [START, day_2 + 3 * SLOT]
+            assert earnings.data.days == {date(2023, 1, 2): pytest.approx(2.2)}
+
+
+def _requested_from(simulator):
+    """Get the start of the period of each request for readings."""
+    return [
+        datetime.fromisoformat(request.query["period_from"].replace("Z", "+00:00"))
+        for request in simulator.log
+        if "page" not in request.query
+    ]
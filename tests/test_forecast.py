@@ -0,0 +1,164 @@
+"""Test forecasting rates beyond those published."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from custom_components.octopus_export.const import (
+    CONF_FORECAST_DAYS,
+    CONF_RETENTION_DAYS,
+    DOMAIN,
+)
+from custom_components.octopus_export.forecast import (
+    SLOTS_PER_DAY,
+    SLOTS_PER_WEEK,
+    SeasonalRateModel,
+)
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+from custom_components.octopus_export.services import SERVICE_GET_RATES
+
+UK = ZoneInfo("Europe/London")
+
+
+def _weekly(start: datetime, days: int, rate_fn) -> RateSeries:
+    """Create rates for whole days, each given by its UK local time."""
+    first = slot_of(start)
+    return RateSeries.from_slots(
+        {
+            slot: rate_fn(
+                datetime.fromtimestamp(slot * 1800, timezone.utc).astimezone(UK)
+            )
+            for slot in range(first, first + days * SLOTS_PER_DAY)
+        }
+    )
+
+
+def _pattern(local: datetime) -> float:
+    """Get a rate that peaks each afternoon, and is higher at weekends."""
+    return round(
+        0.05 + (0.1 if 16 <= local.hour < 19 else 0) + 0.01 * (local.weekday() >= 5),
+        4,
+    )
+
+
+def test_repeats_weekly_pattern():
+    """Ensure a pattern repeated every week is forecast exactly."""
+    history = _weekly(datetime(2023, 1, 2, tzinfo=timezone.utc), 21, _pattern)
+    model = SeasonalRateModel.fit(history)
+    assert model.fitted_until == history.end_slot
+    assert round(model.level, 6) == 0
+
+    forecast = model.predict(history.end_slot, 4 * SLOTS_PER_DAY)
+    assert forecast.start == history.end
+    assert forecast == _weekly(history.end, 4, _pattern)
+
+
+def test_follows_recent_level():
+    """Ensure the forecast is shifted by how far the last week strayed from usual."""
+    start = datetime(2023, 1, 2, tzinfo=timezone.utc)
+    history = _weekly(start, 21, _pattern).merge(
+        _weekly(start + timedelta(days=14), 7, lambda local: _pattern(local) + 0.03)
+    )
+    model = SeasonalRateModel.fit(history)
+    # The usual rates include the last week, so it is only 0.02 above them
+    assert round(model.level, 4) == 0.02
+
+    forecast = model.predict(history.end_slot, SLOTS_PER_DAY)
+    expected = _weekly(history.end, 1, _pattern)
+    assert [round(value - 0.03, 4) for value in forecast.values] == list(
+        expected.values
+    )
+
+
+def test_matches_slots_by_uk_time_across_clock_change():
+    """Ensure the afternoon peak stays at 16:00 UK time after the clocks go forward."""
+    history = _weekly(datetime(2023, 3, 12, tzinfo=timezone.utc), 21, _pattern)
+    model = SeasonalRateModel.fit(history)
+
+    # The clocks went forward during the history, and rates are forecast in BST
+    forecast = model.predict(history.end_slot, SLOTS_PER_DAY)
+    assert forecast.start == datetime(2023, 4, 2, tzinfo=timezone.utc)
+    peak = [slot for slot, value in forecast.items() if value >= 0.15]
+    assert datetime.fromtimestamp(peak[0] * 1800, UK).hour == 16
+    assert len(peak) == 6
+
+
+def test_falls_back_to_daily_profile():
+    """Ensure days of the week not yet seen use the same time on other days."""
+    history = _weekly(datetime(2023, 1, 2, tzinfo=timezone.utc), 2, _pattern)
+    model = SeasonalRateModel.fit(history)
+
+    forecast = model.predict(history.end_slot, SLOTS_PER_WEEK)
+    assert len(forecast) == SLOTS_PER_WEEK
+    assert forecast.get(datetime(2023, 1, 7, 16, tzinfo=timezone.utc)) == 0.15
+    assert forecast.get(datetime(2023, 1, 7, 3, tzinfo=timezone.utc)) == 0.05
+
+
+def test_skips_gaps():
+    """Ensure missing slots don't affect the average."""
+    history = _weekly(datetime(2023, 1, 2, tzinfo=timezone.utc), 14, _pattern)
+    gap = slot_of(datetime(2023, 1, 9, 16, tzinfo=timezone.utc))
+    history = RateSeries.from_slots(
+        {slot: value for slot, value in history.items() if slot != gap}
+    )
+
+    forecast = SeasonalRateModel.fit(history).predict(history.end_slot, SLOTS_PER_DAY)
+    assert forecast.get(datetime(2023, 1, 16, 16, tzinfo=timezone.utc)) == 0.15
+
+
+def test_nothing_to_fit():
+    """Ensure no model is fitted without any rates."""
+    assert SeasonalRateModel.fit(RateSeries()) is None
+
+
+async def test_forecast_refits_only_for_new_rates(hass, freezer, load_entry):
+    """Ensure the model is refitted when rates are published, and marked as forecast."""
+    freezer.move_to("2023-01-16T12:10:00Z")
+    history = _weekly(datetime(2023, 1, 2, tzinfo=timezone.utc), 14, _pattern)
+    entry = await load_entry(history, {CONF_FORECAST_DAYS: 2, CONF_RETENTION_DAYS: 30})
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    with patch.object(
+        SeasonalRateModel, "fit", wraps=SeasonalRateModel.fit
+    ) as mock_fit:
+        assert len(coordinator.forecast) == 2 * SLOTS_PER_DAY
+        assert coordinator.forecast.start == history.end
+        assert coordinator.forecast is coordinator.forecast
+
+        # Trimming old rates doesn't refit the model
+        coordinator.rates = coordinator.rates.trim(history.start_slot + 1)
+        assert len(coordinator.forecast) == 2 * SLOTS_PER_DAY
+        assert mock_fit.call_count == 1
+
+        coordinator.rates = coordinator.rates.merge(_weekly(history.end, 1, _pattern))
+        assert coordinator.forecast.start == history.end + timedelta(days=1)
+        assert mock_fit.call_count == 2
+    assert coordinator.stats.forecast_fits == 2
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_RATES,
+        {"config_entry": entry.entry_id, "forecast": True},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["forecast_start"] == coordinator.forecast.start_slot * 1800
+    assert len(response["values"]) == len(coordinator.rates) + 2 * SLOTS_PER_DAY
+
+
+async def test_forecast_disabled_by_default(hass, freezer, load_entry, day_of_rates):
+    """Ensure nothing is forecast unless enabled."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert not coordinator.forecast
+    assert coordinator.forecast_model is None
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_RATES,
+        {"config_entry": entry.entry_id, "forecast": True},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["forecast_start"] is None
+    assert len(response["values"]) == 48
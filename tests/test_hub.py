@@ -0,0 +1,88 @@
+"""Test refreshing several regions through the shared tariff hub."""
+import asyncio
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export import (
+    OctopusTariffUpdateCoordinator,
+    async_setup_entry,
+    async_unload_entry,
+)
+from custom_components.octopus_export.const import (
+    CONF_REGION,
+    CONF_SHARED_REFRESH,
+    DOMAIN,
+)
+from custom_components.octopus_export.hub import async_get_hub
+from custom_components.octopus_export.octopus_api import OctopusProduct
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+
+from .common import async_wait_for_start
+
+REGIONS = ["A", "B", "C"]
+
+
+async def test_hub_refreshes_regions_concurrently(hass, freezer):
+    """Ensure member regions are fetched concurrently, on one shared schedule."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    in_flight = 0
+    max_in_flight = 0
+    release = asyncio.Event()
+
+    async def fetch_data(self, period_from=None, period_to=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await release.wait()
+        in_flight -= 1
+        return RateSeries.from_slots({slot_of(period_from): 0.1})
+
+    with patch(
+        "custom_components.octopus_export.octopus_api.ProductService.async_get_export_product",
+        return_value=OctopusProduct(
+            "AGILE-OUTGOING-19-05-13",
+            "Agile Outgoing Octopus May 2019",
+            {region: f"E-1R-AGILE-OUTGOING-19-05-13-{region}" for region in REGIONS},
+        ),
+    ), patch(
+        "custom_components.octopus_export.octopus_api.AgileTariff.fetch_data_if_modified",
+        side_effect=fetch_data,
+        autospec=True,
+    ):
+        # Each entry fetches its initial rates during setup
+        release.set()
+        entries = []
+        for region in REGIONS:
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={CONF_REGION: region},
+                options={CONF_SHARED_REFRESH: True},
+                entry_id=region,
+            )
+            assert await async_setup_entry(hass, entry)
+            await async_wait_for_start(hass, entry)
+            entries.append(entry)
+
+        hub = async_get_hub(hass)
+        coordinators: list[OctopusTariffUpdateCoordinator] = [
+            hass.data[DOMAIN][entry.entry_id] for entry in entries
+        ]
+        assert hub.next_refresh is not None
+        for coordinator in coordinators:
+            assert coordinator.hub is hub
+            assert coordinator.next_refresh == hub.next_refresh
+
+        release.clear()
+        max_in_flight = 0
+        refresh = hass.async_create_task(hub.async_refresh())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert max_in_flight == len(REGIONS)
+        release.set()
+        await refresh
+
+    for entry in entries:
+        assert await async_unload_entry(hass, entry)
+    assert hub.next_refresh is not None
+    assert all(coordinator.hub is None for coordinator in coordinators)
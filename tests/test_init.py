@@ -1,5 +1,10 @@
 """Test octopus_export setup process."""
-from homeassistant.exceptions import ConfigEntryNotReady
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import STATE_UNKNOWN
+from homeassistant.setup import DATA_SETUP_TIME, async_setup_component
 import pytest
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
@@ -9,7 +14,19 @@ from custom_components.octopus_export import (
     async_setup_entry,
     async_unload_entry,
 )
-from custom_components.octopus_export.const import CONF_REGION, DOMAIN
+from custom_components.octopus_export.const import (
+    CONF_REGION,
+    CONF_RETENTION_DAYS,
+    DOMAIN,
+)
+from custom_components.octopus_export.octopus_api import (
+    AgileTariff,
+    get_start_of_current_interval,
+)
+from custom_components.octopus_export.rate_series import RateSeries, slot_of, slot_start
+from custom_components.octopus_export.storage import TariffCache
+
+from .simulator import EXPORT_PRODUCT
 
 # Mock config data to be used across multiple tests
 MOCK_CONFIG = {
@@ -45,9 +62,402 @@ async def test_setup_unload_and_reload_entry(
     assert config_entry.entry_id not in hass.data[DOMAIN]
 
 
-async def test_setup_entry_exception(hass, error_on_get_product):
-    """Ensure we get ConfigEntryNotReady when we can't get product information from the API."""
+async def test_setup_doesnt_wait_for_api(hass, simulator, wait_for_start):
+    """Ensure Home Assistant's setup timing excludes the API's response times."""
+    # Time isn't frozen, as that would stop the clock timing the setup
+    simulator.latency = 1.0
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG)
+    config_entry.add_to_hass(hass)
+
+    assert await async_setup_component(hass, DOMAIN, {})
+    assert hass.data[DATA_SETUP_TIME][DOMAIN] < simulator.latency
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("sensor.agile_export_rate").state == STATE_UNKNOWN
+
+    await wait_for_start(config_entry)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.tariff.product == EXPORT_PRODUCT
+    assert coordinator.rates.get(get_start_of_current_interval()) is not None
+    assert hass.states.get("sensor.agile_export_rate").state != STATE_UNKNOWN
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_setup_entry_exception(hass, error_on_get_product, wait_for_start):
+    """Ensure setup succeeds without the API, leaving the update to be retried."""
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await async_setup_entry(hass, config_entry)
+    await wait_for_start(config_entry)
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.tariff is None
+    assert not coordinator.last_update_success
+    assert coordinator.next_refresh is not None
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+def _series(rates):
+    """Create a rate series from a dictionary keyed by UTC timestamp strings."""
+    return RateSeries.from_items(
+        (datetime.fromisoformat(key.replace("Z", "+00:00")), value)
+        for key, value in rates.items()
+    )
+
+
+def _as_dict(series):
+    """Convert a rate series to a dictionary keyed by UTC timestamp strings."""
+    return {
+        slot_start(slot).strftime("%Y-%m-%dT%H:%M:%SZ"): value
+        for slot, value in series.items()
+    }
+
+
+def _store_cache(
+    hass_storage, rates, tariff_code="E-1R-AGILE-OUTGOING-19-05-13-A", version=2
+):
+    """Populate the tariff cache for the "test" config entry."""
+    hass_storage[f"{DOMAIN}.test"] = {
+        "version": version,
+        "key": f"{DOMAIN}.test",
+        "data": {
+            "product_code": "AGILE-OUTGOING-19-05-13",
+            "tariff_code": tariff_code,
+            "rates": rates,
+            "product_checked": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+
+
+async def test_setup_entry_from_cache(
+    hass, hass_storage, error_on_get_product, bypass_coordinator_refresh
+):
+    """Ensure cached rates covering the current slot allow setup without the API."""
+
+    current_slot = slot_of(get_start_of_current_interval())
+    _store_cache(hass_storage, {"start": current_slot * 1800, "values": [0.1234]})
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    assert await async_setup_entry(hass, config_entry)
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.rates == RateSeries.from_slots({current_slot: 0.1234})
+    assert coordinator.tariff.tariff == "E-1R-AGILE-OUTGOING-19-05-13-A"
+
+    # The restored rates are revalidated in the background
+    await hass.async_block_till_done()
+    bypass_coordinator_refresh.assert_called_once()
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+@pytest.mark.parametrize(
+    ("rates", "tariff_code"),
+    [
+        ({"values": [0.1234]}, "E-1R-AGILE-OUTGOING-19-05-13-B"),
+        ({"values": ["0.1234"]}, "E-1R-AGILE-OUTGOING-19-05-13-A"),
+    ],
+    ids=["wrong_region", "bad_value"],
+)
+async def test_setup_entry_ignores_unusable_cache(
+    hass,
+    hass_storage,
+    bypass_get_product,
+    bypass_coordinator_refresh,
+    wait_for_start,
+    rates,
+    tariff_code,
+):
+    """Ensure setup leaves discovery to the first refresh when the cache can't be used."""
+
+    current_slot = slot_of(get_start_of_current_interval())
+    rates = {"start": current_slot * 1800, **rates}
+    _store_cache(hass_storage, rates, tariff_code)
 
     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
-    with pytest.raises(ConfigEntryNotReady):
-        assert await async_setup_entry(hass, config_entry)
+    assert await async_setup_entry(hass, config_entry)
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.tariff is None
+    assert not coordinator.rates
+
+    await wait_for_start(config_entry)
+    bypass_coordinator_refresh.assert_called_once()
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_setup_entry_from_stale_cache(
+    hass, hass_storage, error_on_get_product, bypass_coordinator_refresh
+):
+    """Ensure cached rates are shown while they are refreshed, however old they are."""
+
+    _store_cache(hass_storage, {"start": 0, "values": [0.1234]})
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG,
+        options={CONF_RETENTION_DAYS: 365 * 100},
+        entry_id="test",
+    )
+    assert await async_setup_entry(hass, config_entry)
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.rates == RateSeries.from_slots({0: 0.1234})
+    assert coordinator.tariff.tariff == "E-1R-AGILE-OUTGOING-19-05-13-A"
+
+    await hass.async_block_till_done()
+    bypass_coordinator_refresh.assert_called_once()
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_setup_entry_from_migrated_cache(
+    hass, hass_storage, error_on_get_product, bypass_coordinator_refresh
+):
+    """Ensure rates cached by an earlier version are migrated and used."""
+
+    current_slot = get_start_of_current_interval()
+    _store_cache(
+        hass_storage,
+        {current_slot.strftime("%Y-%m-%dT%H:%M:%SZ"): 0.1234},
+        version=1,
+    )
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    assert await async_setup_entry(hass, config_entry)
+
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    assert coordinator.rates.get(current_slot) == 0.1234
+
+    assert await async_unload_entry(hass, config_entry)
+
+
+async def test_update_saves_cache(hass, hass_storage, freezer):
+    """Ensure a fetch that changes the rates writes them to the cache."""
+    freezer.move_to("2023-01-01T12:10:00Z")
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    tariff = AgileTariff(
+        None, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+    coordinator = OctopusTariffUpdateCoordinator(
+        hass, config_entry, TariffCache(hass, config_entry.entry_id), tariff
+    )
+    coordinator.product_checked = datetime.now(timezone.utc)
+
+    with patch.object(
+        tariff,
+        "fetch_data_if_modified",
+        AsyncMock(return_value=_series({"2023-01-01T12:00:00Z": 0.1})),
+    ):
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert coordinator.last_update_success
+    assert hass_storage[f"{DOMAIN}.test"]["data"]["rates"] == {
+        "start": 1672574400,
+        "values": [0.1],
+    }
+
+
+def _create_coordinator(hass, rates, retention_days=2):
+    """Create a coordinator holding the given rates, with a mocked cache."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG,
+        options={CONF_RETENTION_DAYS: retention_days},
+        entry_id="test",
+    )
+    tariff = AgileTariff(
+        None, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+    cache = TariffCache(hass, config_entry.entry_id)
+    cache.async_save = AsyncMock()
+    coordinator = OctopusTariffUpdateCoordinator(hass, config_entry, cache, tariff)
+    coordinator.rates = _series(rates)
+    coordinator.product_checked = datetime.now(timezone.utc)
+    return coordinator
+
+
+async def test_update_fetches_after_newest_slot(hass, freezer):
+    """Ensure only newer slots are requested, merged in order, and old slots dropped."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass,
+        {
+            "2023-01-01T11:30:00Z": 0.05,
+            "2023-01-01T12:00:00Z": 0.1,
+            "2023-01-03T22:30:00Z": 0.2,
+        },
+    )
+
+    with patch.object(
+        coordinator.tariff,
+        "fetch_data_if_modified",
+        AsyncMock(
+            return_value=_series(
+                {"2023-01-03T23:30:00Z": 0.4, "2023-01-03T23:00:00Z": 0.3}
+            )
+        ),
+    ) as mock_fetch:
+        await coordinator.async_refresh()
+
+    mock_fetch.assert_awaited_once_with(
+        datetime(2023, 1, 3, 23, 0, tzinfo=timezone.utc),
+        datetime(2023, 1, 6, tzinfo=timezone.utc),
+    )
+    assert list(_as_dict(coordinator.rates).items()) == [
+        ("2023-01-01T12:00:00Z", 0.1),
+        ("2023-01-03T22:30:00Z", 0.2),
+        ("2023-01-03T23:00:00Z", 0.3),
+        ("2023-01-03T23:30:00Z", 0.4),
+    ]
+    coordinator._cache.async_save.assert_awaited_once()
+
+
+async def test_update_after_outage_keeps_to_retention_window(hass, freezer):
+    """Ensure a fetch after a long outage starts, and is trimmed, at the window."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(hass, {"2022-12-20T12:00:00Z": 0.1})
+
+    with patch.object(
+        coordinator.tariff,
+        "fetch_data_if_modified",
+        AsyncMock(
+            return_value=_series(
+                {"2023-01-01T11:30:00Z": 0.2, "2023-01-01T12:00:00Z": 0.3}
+            )
+        ),
+    ) as mock_fetch:
+        await coordinator.async_refresh()
+
+    assert mock_fetch.await_args.args[0] == datetime(
+        2023, 1, 1, 12, 10, tzinfo=timezone.utc
+    )
+    assert _as_dict(coordinator.rates) == {"2023-01-01T12:00:00Z": 0.3}
+
+
+async def test_update_refetches_extended_window(hass, freezer):
+    """Ensure extending the retention window refetches the whole window in order."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass, {"2023-01-02T12:00:00Z": 0.2, "2023-01-03T12:00:00Z": 0.3}
+    )
+
+    with patch.object(
+        coordinator.tariff,
+        "fetch_data_if_modified",
+        AsyncMock(
+            return_value=_series(
+                {"2023-01-02T12:00:00Z": 0.2, "2023-01-01T12:00:00Z": 0.1}
+            )
+        ),
+    ) as mock_fetch:
+        await coordinator.async_refresh()
+
+    assert mock_fetch.await_args.args[0] == datetime(
+        2023, 1, 1, 12, 10, tzinfo=timezone.utc
+    )
+    assert list(_as_dict(coordinator.rates)) == [
+        "2023-01-01T12:00:00Z",
+        "2023-01-02T12:00:00Z",
+        "2023-01-03T12:00:00Z",
+    ]
+
+
+async def test_update_without_changes_skips_cache_save(hass, freezer):
+    """Ensure the cache isn't rewritten when a fetch returns nothing new."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass, {"2023-01-01T12:00:00Z": 0.1, "2023-01-03T22:30:00Z": 0.2}
+    )
+
+    with patch.object(
+        coordinator.tariff,
+        "fetch_data_if_modified",
+        AsyncMock(return_value=RateSeries()),
+    ):
+        await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    coordinator._cache.async_save.assert_not_awaited()
+
+
+async def test_restore_applies_retention(hass, freezer):
+    """Ensure restored rates are trimmed to the retention window."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(hass, {})
+
+    coordinator.async_restore(
+        _series({"2023-01-01T11:30:00Z": 0.1, "2023-01-03T12:00:00Z": 0.2}), None
+    )
+
+    assert _as_dict(coordinator.rates) == {"2023-01-03T12:00:00Z": 0.2}
+
+
+async def test_daily_views_use_configured_time_zone(hass, freezer):
+    """Ensure day boundaries and slot labels follow Home Assistant's time zone."""
+    hass.config.set_time_zone("America/New_York")
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass,
+        {
+            "2023-01-03T04:30:00Z": 0.1,  # 23:30 on the 2nd in New York
+            "2023-01-03T05:00:00Z": 0.2,  # 00:00 on the 3rd
+            "2023-01-04T05:00:00Z": 0.3,  # 00:00 on the 4th
+        },
+    )
+
+    assert coordinator.rates_today == {"00:00": 0.2}
+    assert coordinator.rates_tomorrow == {"00:00": 0.3}
+
+
+async def test_daily_views_are_memoized(hass, freezer):
+    """Ensure views are only rebuilt when the rates change or the date rolls over."""
+    hass.config.set_time_zone("UTC")
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass, {"2023-01-03T12:00:00Z": 0.1, "2023-01-04T12:00:00Z": 0.2}
+    )
+
+    with patch.object(
+        coordinator, "_rates_for_date", wraps=coordinator._rates_for_date
+    ) as mock_build:
+        for _ in range(10):
+            assert coordinator.rates_today == {"12:00": 0.1}
+            assert coordinator.rates_tomorrow == {"12:00": 0.2}
+        assert mock_build.call_count == 2
+
+        coordinator.rates = coordinator.rates.merge(
+            _series({"2023-01-03T12:30:00Z": 0.15})
+        )
+        assert coordinator.rates_today == {"12:00": 0.1, "12:30": 0.15}
+        assert mock_build.call_count == 4
+
+        freezer.move_to("2023-01-04T00:10:00Z")
+        assert coordinator.rates_today == {"12:00": 0.2}
+        assert coordinator.rates_tomorrow == {}
+        assert mock_build.call_count == 6
+
+
+async def test_unmodified_rates_skip_listeners(hass, freezer):
+    """Ensure listeners aren't notified when the API reports no changes."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    coordinator = _create_coordinator(
+        hass, {"2023-01-01T12:00:00Z": 0.1, "2023-01-03T22:30:00Z": 0.2}
+    )
+    coordinator.data = coordinator.rates
+    listener = MagicMock()
+    unsub = coordinator.async_add_listener(listener)
+
+    with patch.object(
+        coordinator.tariff, "fetch_data_if_modified", AsyncMock(return_value=None)
+    ):
+        await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    listener.assert_not_called()
+    coordinator._cache.async_save.assert_not_awaited()
+    unsub()
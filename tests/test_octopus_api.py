@@ -0,0 +1,284 @@
+"""Test the Octopus API client."""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiohttp import ClientResponseError
+from homeassistant.helpers.json import json_dumps
+import pytest
+
+from custom_components.octopus_export.octopus_api import (
+    AgileTariff,
+    OctopusApiClient,
+    RetryableResponseError,
+    _parse_retry_after,
+)
+
+RATES_URL = (
+    "https://api.octopus.energy/v1/products/AGILE-OUTGOING-19-05-13"
+    "/electricity-tariffs/E-1R-AGILE-OUTGOING-19-05-13-A/standard-unit-rates"
+)
+PAGE_1_URL = (
+    f"{RATES_URL}?period_from=2023-01-01T00:00:00Z&period_to=2023-01-02T00:00:00Z"
+)
+PAGE_2_URL = f"{PAGE_1_URL}&page=2"
+
+RESPONSES = {
+    PAGE_1_URL: {
+        "next": PAGE_2_URL,
+        "results": [
+            {"valid_from": "2023-01-01T00:30:00Z", "value_inc_vat": 12.5},
+        ],
+    },
+    PAGE_2_URL: {
+        "next": None,
+        "results": [
+            {"valid_from": "2023-01-01T00:00:00Z", "value_inc_vat": 10.0},
+        ],
+    },
+}
+
+
+async def test_fetch_data_follows_pages():
+    """Ensure a windowed fetch follows every page of results."""
+
+    async def get_json(url, endpoint):
+        return RESPONSES[url], True
+
+    client = MagicMock()
+    client.async_get_json_if_modified = AsyncMock(side_effect=get_json)
+    tariff = AgileTariff(
+        client, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+    rates = await tariff.fetch_data(
+        datetime(2023, 1, 1, tzinfo=timezone.utc),
+        datetime(2023, 1, 2, tzinfo=timezone.utc),
+    )
+
+    assert rates.start == datetime(2023, 1, 1, tzinfo=timezone.utc)
+    assert list(rates.values) == [0.1, 0.125]
+    calls = client.async_get_json_if_modified.call_args_list
+    assert [call.args[0] for call in calls] == [
+        PAGE_1_URL,
+        PAGE_2_URL,
+    ]
+
+
+async def test_iter_history_fetches_weeks_in_order():
+    """Ensure history is fetched a week at a time, oldest first."""
+    week_1_url = (
+        f"{RATES_URL}?period_from=2023-01-01T00:00:00Z"
+        "&period_to=2023-01-08T00:00:00Z&page_size=1500"
+    )
+    week_2_url = (
+        f"{RATES_URL}?period_from=2023-01-08T00:00:00Z"
+        "&period_to=2023-01-10T00:00:00Z&page_size=1500"
+    )
+    responses = {
+        week_1_url: {
+            "next": None,
+            "results": [{"valid_from": "2023-01-01T00:00:00Z", "value_inc_vat": 10.0}],
+        },
+        week_2_url: {
+            "next": None,
+            "results": [{"valid_from": "2023-01-09T00:00:00Z", "value_inc_vat": 20.0}],
+        },
+    }
+
+    async def get_json(url, endpoint):
+        return responses[url]
+
+    client = MagicMock()
+    client.async_get_json = AsyncMock(side_effect=get_json)
+    tariff = AgileTariff(
+        client, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+
+    weeks = [
+        (until, list(rates.values))
+        async for until, rates in tariff.iter_history(
+            datetime(2023, 1, 1, tzinfo=timezone.utc),
+            datetime(2023, 1, 10, tzinfo=timezone.utc),
+        )
+    ]
+    assert weeks == [
+        (datetime(2023, 1, 8, tzinfo=timezone.utc), [0.1]),
+        (datetime(2023, 1, 10, tzinfo=timezone.utc), [0.2]),
+    ]
+    client.async_get_json_if_modified.assert_not_called()
+
+
+async def test_fetch_data_without_period_reads_first_page():
+    """Ensure an unbounded fetch doesn't follow pagination links."""
+
+    client = MagicMock()
+    client.async_get_json_if_modified = AsyncMock(
+        return_value=({**RESPONSES[PAGE_1_URL], "results": []}, True)
+    )
+    tariff = AgileTariff(
+        client, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+
+    assert not await tariff.fetch_data()
+    client.async_get_json_if_modified.assert_awaited_once_with(
+        RATES_URL, "standard-unit-rates"
+    )
+
+
+async def test_fetch_data_if_modified_skips_unchanged_pages():
+    """Ensure nothing is parsed when every page is unchanged."""
+
+    async def get_json(url, endpoint):
+        return RESPONSES[url], url == PAGE_2_URL
+
+    client = MagicMock()
+    client.async_get_json_if_modified = AsyncMock(side_effect=get_json)
+    tariff = AgileTariff(
+        client, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+    period = (
+        datetime(2023, 1, 1, tzinfo=timezone.utc),
+        datetime(2023, 1, 2, tzinfo=timezone.utc),
+    )
+
+    rates = await tariff.fetch_data_if_modified(*period)
+    assert list(rates.values) == [0.1, 0.125]
+
+    client.async_get_json_if_modified.side_effect = None
+    client.async_get_json_if_modified.return_value = (RESPONSES[PAGE_2_URL], False)
+    assert await tariff.fetch_data_if_modified(*period) is None
+
+
+class FakeResponse:
+    """A minimal aiohttp response."""
+
+    def __init__(self, status, json=None, headers=None):
+        """Initialize the response."""
+        self.status = status
+        self.headers = headers or {}
+        self._json = json
+
+    async def read(self):
+        """Get the raw response body."""
+        return json_dumps(self._json).encode()
+
+    def raise_for_status(self):
+        """Raise an error for failed requests."""
+        if self.status >= 400:
+            raise ClientResponseError(None, (), status=self.status)
+
+    async def json(self):
+        """Get the response body."""
+        return self._json
+
+
+class FakeSession:
+    """A session returning a fixed sequence of responses."""
+
+    def __init__(self, responses):
+        """Initialize the session."""
+        self.responses = list(responses)
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def get(self, url, headers=None, auth=None):
+        """Return the next response."""
+        self.calls += 1
+        self.headers = headers
+        await self.release.wait()
+        return self.responses.pop(0)
+
+
+async def test_client_retries_server_errors(no_backoff):
+    """Ensure temporary failures are retried and counted."""
+    session = FakeSession(
+        [FakeResponse(503), FakeResponse(429), FakeResponse(200, {"ok": True})]
+    )
+    client = OctopusApiClient(session)
+
+    assert await client.async_get_json(RATES_URL, "rates") == {"ok": True}
+    assert session.calls == 3
+    assert client.stats["rates"].requests == 1
+    assert client.stats["rates"].attempts == 3
+    assert client.stats["rates"].failures == 0
+
+
+async def test_client_gives_up_after_max_attempts(no_backoff):
+    """Ensure persistent failures are eventually raised."""
+    session = FakeSession([FakeResponse(500)] * 4)
+    client = OctopusApiClient(session)
+
+    with pytest.raises(RetryableResponseError):
+        await client.async_get_json(RATES_URL, "rates")
+    assert session.calls == 4
+    assert client.stats["rates"].failures == 1
+
+
+async def test_client_does_not_retry_client_errors():
+    """Ensure errors that won't succeed on repetition are raised immediately."""
+    session = FakeSession([FakeResponse(404)])
+    client = OctopusApiClient(session)
+
+    with pytest.raises(ClientResponseError):
+        await client.async_get_json(RATES_URL, "rates")
+    assert session.calls == 1
+
+
+async def test_client_coalesces_identical_requests():
+    """Ensure concurrent requests for the same URL share one response."""
+    session = FakeSession([FakeResponse(200, {"ok": True})])
+    session.release.clear()
+    client = OctopusApiClient(session)
+
+    requests = [
+        asyncio.ensure_future(client.async_get_json(RATES_URL, "rates"))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    session.release.set()
+
+    assert await asyncio.gather(*requests) == [{"ok": True}] * 3
+    assert session.calls == 1
+    assert client.stats["rates"].coalesced == 2
+
+
+async def test_client_revalidates_responses():
+    """Ensure validators are sent, and unchanged responses aren't decoded again."""
+    session = FakeSession(
+        [
+            FakeResponse(
+                200,
+                {"ok": True},
+                {"ETag": '"abc"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+            ),
+            FakeResponse(304),
+            FakeResponse(200, {"ok": True}),
+            FakeResponse(200, {"ok": False}),
+        ]
+    )
+    client = OctopusApiClient(session)
+
+    data, changed = await client.async_get_json_if_modified(RATES_URL, "rates")
+    assert (data, changed) == ({"ok": True}, True)
+
+    data, changed = await client.async_get_json_if_modified(RATES_URL, "rates")
+    assert session.headers["If-None-Match"] == '"abc"'
+    assert session.headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert (data, changed) == ({"ok": True}, False)
+
+    # A full response with an identical body is treated as unchanged
+    data, changed = await client.async_get_json_if_modified(RATES_URL, "rates")
+    assert (data, changed) == ({"ok": True}, False)
+
+    data, changed = await client.async_get_json_if_modified(RATES_URL, "rates")
+    assert (data, changed) == ({"ok": False}, True)
+    assert client.stats["rates"].not_modified == 2
+
+
+def test_parse_retry_after():
+    """Ensure Retry-After headers are read in either format."""
+    assert _parse_retry_after(None) is None
+    assert _parse_retry_after("120") == 120
+    assert _parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert _parse_retry_after("soon") is None
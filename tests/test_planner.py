@@ -0,0 +1,207 @@
+"""Test planning a battery's dispatch against export rates."""
+from array import array
+import math
+import random
+
+from homeassistant.exceptions import ServiceValidationError
+import pytest
+
+from custom_components.octopus_export.const import (
+    CONF_BATTERY_CAPACITY,
+    CONF_BATTERY_SOC_ENTITY,
+    DOMAIN,
+)
+from custom_components.octopus_export.planner import (
+    BatteryAction,
+    BatterySpec,
+    DispatchPlanner,
+)
+from custom_components.octopus_export.rate_series import RateSeries
+from custom_components.octopus_export.services import SERVICE_PLAN_BATTERY
+
+NAN = math.nan
+
+SPEC = BatterySpec(
+    capacity=5, charge_power=3, discharge_power=3, efficiency=0.9, reserve=0.5
+)
+
+
+def _exhaustive_value(
+    spec: BatterySpec, step: float, prices: list[float], level: int
+) -> float:
+    """Solve the program by trying every move from every level in every slot."""
+    levels = math.floor((spec.capacity - spec.reserve) / step + 1e-9)
+    charge = math.floor(spec.charge_power / 2 / step + 1e-9)
+    export = math.floor(spec.discharge_power / 2 / step + 1e-9)
+    values = [0.0] * (levels + 1)
+    for price in reversed(prices):
+        if price != price:
+            continue
+        price = max(price, 0.0)
+        values = [
+            max(
+                values[target]
+                + (
+                    price * (start - target) * step * spec.efficiency
+                    if target < start
+                    else -price * (target - start) * step
+                )
+                for target in range(
+                    max(0, start - export), min(levels, start + charge) + 1
+                )
+            )
+            for start in range(levels + 1)
+        ]
+    return values[level]
+
+
+def test_matches_exhaustive_search():
+    """Ensure the plan earns as much as the best found by trying every move."""
+    rng = random.Random(22)
+    for _ in range(200):
+        spec = BatterySpec(
+            capacity=rng.choice([1.0, 2.0, 3.3]),
+            charge_power=rng.choice([0.4, 1.0, 3.0]),
+            discharge_power=rng.choice([0.2, 1.0, 5.0]),
+            efficiency=rng.choice([0.8, 1.0]),
+            reserve=rng.choice([0.0, 0.5]),
+        )
+        prices = [
+            round(rng.uniform(0, 0.4), 3) if rng.random() > 0.1 else NAN
+            for _ in range(rng.randint(1, 16))
+        ]
+        soc = rng.uniform(0, spec.capacity)
+        planner = DispatchPlanner(spec, step=0.1)
+        plan = planner.plan(RateSeries(100, array("d", prices)), 100, soc)
+
+        assert plan.start_slot == 100
+        assert plan.value == pytest.approx(
+            _exhaustive_value(spec, 0.1, prices, planner._level(soc)), abs=1e-9
+        )
+
+
+def test_respects_battery_limits():
+    """Ensure the plan stays within the battery's capacity, reserve and power."""
+    prices = [0.05, 0.3, 0.02, 0.02, 0.25, 0.28, 0.01, 0.4]
+    plan = DispatchPlanner(SPEC).plan(RateSeries(10, array("d", prices)), 10, 2.0)
+
+    assert plan.soc[0] == 2.0
+    assert all(SPEC.reserve <= soc <= SPEC.capacity for soc in plan.soc)
+    assert all(-1.5 <= energy <= 1.5 for energy in plan.energy)
+    assert [plan.action(index) for index in range(len(plan))] == [
+        BatteryAction.HOLD,
+        BatteryAction.EXPORT,
+        BatteryAction.CHARGE,
+        BatteryAction.CHARGE,
+        BatteryAction.EXPORT,
+        BatteryAction.EXPORT,
+        BatteryAction.CHARGE,
+        BatteryAction.EXPORT,
+    ]
+    assert plan.next_export() == 11
+    # Nothing is worth keeping after the last rate
+    assert plan.soc[-1] == SPEC.reserve
+
+
+def test_holds_through_gaps():
+    """Ensure slots without a rate are spent holding, including the first."""
+    rates = RateSeries(12, array("d", [0.01, NAN, 0.3]))
+    plan = DispatchPlanner(SPEC).plan(rates, 10, None)
+
+    assert plan.start_slot == 10
+    assert list(plan.energy) == [0.0, 0.0, 1.5, 0.0, -1.5]
+    assert plan.value == pytest.approx(1.5 * (0.3 * 0.9 - 0.01))
+
+
+def test_replans_without_solving_again():
+    """Ensure the table is reused for later slots and other states of charge."""
+    rates = RateSeries(10, array("d", [0.05, 0.3, 0.02, 0.02, 0.25, 0.28]))
+    planner = DispatchPlanner(SPEC)
+    first = planner.plan(rates, 10, 2.0)
+    assert planner.plan(rates, 10, 2.0) is first
+
+    later = planner.plan(rates, 12, first.soc[2])
+    assert list(later.energy) == list(first.energy[2:])
+    planner.plan(rates, 12, 5.0)
+    assert planner.solves == 1
+
+    planner.plan(rates.merge(RateSeries(16, array("d", [0.5]))), 12, 5.0)
+    assert planner.solves == 2
+
+
+async def test_battery_plan_sensors(hass, freezer, load_entry, day_of_rates):
+    """Ensure the plan is followed by its sensors as the state of charge changes."""
+    freezer.move_to("2023-01-03T21:10:00Z")
+    hass.states.async_set("sensor.battery_level", "100")
+    entry = await load_entry(
+        day_of_rates,
+        {CONF_BATTERY_CAPACITY: 5.0, CONF_BATTERY_SOC_ENTITY: "sensor.battery_level"},
+    )
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    # Full, with rates rising to midnight, the battery exports in the last slots
+    assert hass.states.get("sensor.battery_plan_action").state == "hold"
+    assert hass.states.get("sensor.battery_plan_next_export").state == (
+        "2023-01-03T22:30:00+00:00"
+    )
+    assert float(hass.states.get("sensor.battery_plan_value").state) == 0.59
+
+    solves = coordinator.planner.solves
+
+    # At the reserve, the rates don't rise enough to cover the losses of charging
+    hass.states.async_set("sensor.battery_level", "10")
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.battery_plan_action").state == "hold"
+    assert hass.states.get("sensor.battery_plan_next_export").state == "unknown"
+    assert float(hass.states.get("sensor.battery_plan_value").state) == 0
+    assert coordinator.planner.solves == solves
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_plan_battery_service(hass, freezer, load_entry, day_of_rates):
+    """Ensure the plan can be fetched from any state of charge."""
+    freezer.move_to("2023-01-03T22:10:00Z")
+    entry = await load_entry(day_of_rates, {CONF_BATTERY_CAPACITY: 5.0})
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PLAN_BATTERY,
+        {"config_entry": entry.entry_id, "state_of_charge": 100},
+        blocking=True,
+        return_response=True,
+    )
+    assert response == {
+        "start": 1672783200,
+        "slot_seconds": 1800,
+        "actions": ["hold", "export", "export", "export"],
+        "energy": [0.0, -1.5, -1.5, -1.5],
+        "soc": [5.0, 5.0, 3.5, 2.0, 0.5],
+        "value": pytest.approx(1.35 * (0.145 + 0.146 + 0.147)),
+    }
+
+    # Without a state of charge, the plan starts from the reserve
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_PLAN_BATTERY,
+        {"config_entry": entry.entry_id},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["soc"][0] == 0.5
+
+
+async def test_no_battery(hass, freezer, load_entry, day_of_rates):
+    """Ensure nothing is planned unless a battery is configured."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+    assert hass.states.get("sensor.battery_plan_action") is None
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_PLAN_BATTERY,
+            {"config_entry": entry.entry_id},
+            blocking=True,
+            return_response=True,
+        )
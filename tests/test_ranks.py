@@ -0,0 +1,116 @@
+"""Test ranking the rates, and keeping statistics over a rolling horizon."""
+from array import array
+import math
+import random
+import statistics
+
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.octopus_export.const import DOMAIN
+from custom_components.octopus_export.ranks import RateRanks, RollingStats
+from custom_components.octopus_export.rate_series import RateSeries
+
+NAN = math.nan
+
+
+def test_ranks():
+    """Ensure rates are ranked highest first, with gaps and other slots ignored."""
+    rates = RateSeries(10, array("d", [0.2, 0.1, NAN, 0.3, 0.2, 0.05, 0.3, 0.4]))
+    ranks = RateRanks(rates, 10, 17)
+
+    assert len(ranks) == 6
+    ranked = [ranks.rank(value) for value in (0.3, 0.2, 0.1, 0.4, 0.25)]
+    assert ranked == [1, 3, 5, 1, 3]
+    assert ranks.percent_rank(0.2) == 100 * 4 / 6
+    assert ranks.min_slot == 15
+    # The earliest of the slots sharing the highest rate
+    assert ranks.max_slot == 13
+    assert ranks.mean == statistics.fmean([0.2, 0.1, 0.3, 0.2, 0.05, 0.3])
+    # Sorted, the rates are 0.05, 0.1, 0.2, 0.2, 0.3 and 0.3
+    percentiles = [ranks.percentile(percent) for percent in (0, 10, 50, 90, 100)]
+    assert percentiles == pytest.approx([0.05, 0.075, 0.2, 0.3, 0.3])
+
+
+def test_no_ranks():
+    """Ensure an empty range has no statistics."""
+    ranks = RateRanks(RateSeries(10, array("d", [0.2])), 20, 30)
+
+    assert len(ranks) == 0
+    assert ranks.rank(0.1) == 1
+    assert ranks.percent_rank(0.1) is None
+    assert ranks.percentile(90) is None
+    assert ranks.min_slot is None and ranks.max_slot is None
+    assert ranks.mean is None
+
+
+def test_rolling_stats_match_each_horizon():
+    """Ensure the statistics kept as the horizon moves match those of the slots."""
+    rng = random.Random(24)
+    values = [
+        round(rng.uniform(0, 0.3), 2) if rng.random() > 0.1 else NAN for _ in range(200)
+    ]
+    rates = RateSeries(1000, array("d", values))
+    stats = RollingStats(rates, 48)
+
+    slot = 990
+    for _ in range(300):
+        slot += rng.choice([0, 1, 1, 1, 2, 5, 60, -3])
+        stats.advance(slot)
+        horizon = [
+            (other, value)
+            for other in range(slot, slot + 48)
+            if (value := rates.get_slot(other)) is not None
+        ]
+
+        assert len(stats) == len(horizon)
+        if not horizon:
+            assert stats.min is None and stats.max is None and stats.mean is None
+            continue
+        assert stats.min == min(horizon, key=lambda item: item[1])
+        assert stats.max == max(horizon, key=lambda item: item[1])
+        assert math.isclose(stats.mean, statistics.fmean(value for _, value in horizon))
+
+
+async def test_rate_statistic_sensors(hass, freezer, load_entry, day_of_rates):
+    """Ensure the sensors follow the current slot, without rebuilding the indexes."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    entry = await load_entry(day_of_rates)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    # Today's rates rise from 0.1 by 0.001 a slot, and the current one is 0.124
+    state = hass.states.get("sensor.agile_export_rate_rank_today")
+    assert state.state == "24"
+    assert state.attributes == {
+        "rates": 48,
+        "percent_rank": 52.1,
+        "friendly_name": "Agile Export Rate Rank Today",
+        "icon": "mdi:podium",
+    }
+    assert hass.states.get("sensor.agile_export_rate_90th_percentile_today").state == (
+        "0.1423"
+    )
+
+    # Rates are only held until midnight
+    state = hass.states.get("sensor.agile_export_rate_min_next_24h")
+    assert state.state == "0.124"
+    assert state.attributes["at"] == "2023-01-03T12:00:00+00:00"
+    state = hass.states.get("sensor.agile_export_rate_max_next_24h")
+    assert state.state == "0.147"
+    assert state.attributes["at"] == "2023-01-03T23:30:00+00:00"
+    assert hass.states.get("sensor.agile_export_rate_mean_next_24h").state == "0.1355"
+
+    ranks = coordinator.ranks_today
+    horizon = coordinator.rates_ahead
+    freezer.tick(1800)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.agile_export_rate_rank_today").state == "23"
+    assert hass.states.get("sensor.agile_export_rate_min_next_24h").state == "0.125"
+    assert hass.states.get("sensor.agile_export_rate_mean_next_24h").state == "0.136"
+    assert coordinator.ranks_today is ranks
+    assert coordinator.rates_ahead is horizon
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,56 @@
+"""Test the slot-indexed rate series."""
+from datetime import datetime, timedelta, timezone
+import math
+
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SLOT = timedelta(minutes=30)
+
+
+def test_lookup_and_gaps():
+    """Ensure rates are found by time, with gaps and out of range slots missing."""
+    series = RateSeries.from_items([(START, 0.1), (START + 2 * SLOT, 0.3)])
+
+    assert len(series) == 3
+    assert series.get(START + timedelta(minutes=10)) == 0.1
+    assert series.get(START + SLOT) is None
+    assert series.get(START - SLOT) is None
+    assert series.get(START + 3 * SLOT) is None
+    assert series.end == START + 3 * SLOT
+
+
+def test_merge_prefers_new_rates_and_fills_gaps():
+    """Ensure merged rates overwrite old ones without gaps erasing them."""
+    old = RateSeries.from_items([(START, 0.1), (START + SLOT, 0.2)])
+    new = RateSeries.from_items([(START + SLOT, 0.25), (START + 4 * SLOT, 0.5)])
+
+    merged = old.merge(new)
+
+    assert list(merged.items()) == [
+        (slot_of(START), 0.1),
+        (slot_of(START + SLOT), 0.25),
+        (slot_of(START + 4 * SLOT), 0.5),
+    ]
+    assert merged.get(START + 2 * SLOT) is None
+
+
+def test_slice_and_trim_strip_gaps():
+    """Ensure slices don't start or end with gaps."""
+    series = RateSeries.from_items([(START, 0.1), (START + 3 * SLOT, 0.4)])
+
+    assert series.slice(START + SLOT, START + 3 * SLOT) == RateSeries()
+    assert series.trim(slot_of(START + SLOT)).start == START + 3 * SLOT
+    assert series.slice(START, START + 2 * SLOT).end == START + SLOT
+
+
+def test_json_round_trip():
+    """Ensure the compact JSON form preserves rates and gaps."""
+    series = RateSeries.from_items([(START, 0.1), (START + 2 * SLOT, 0.3)])
+
+    data = series.as_json()
+
+    assert data == {"start": 1672531200, "values": [0.1, None, 0.3]}
+    restored = RateSeries.from_json(data)
+    assert restored == series
+    assert math.isnan(restored.values[1])
@@ -0,0 +1,47 @@
+"""Test the publication-aware refresh scheduler."""
+from datetime import datetime, timedelta, timezone
+
+from custom_components.octopus_export.scheduler import RefreshScheduler
+
+UTC = timezone.utc
+
+
+def test_quiet_until_publication():
+    """Ensure the scheduler waits for publication when today's rates are held."""
+    scheduler = RefreshScheduler()
+    now = datetime(2023, 1, 10, 13, 0, tzinfo=UTC)
+    rates_until = datetime(2023, 1, 10, 23, 0, tzinfo=UTC)
+
+    assert scheduler.next_refresh(now, rates_until) == datetime(
+        2023, 1, 10, 16, 0, tzinfo=UTC
+    )
+
+
+def test_liveness_check_after_publication():
+    """Ensure only liveness checks are made once tomorrow's rates are held."""
+    scheduler = RefreshScheduler()
+    now = datetime(2023, 1, 10, 17, 0, tzinfo=UTC)
+    rates_until = datetime(2023, 1, 11, 23, 0, tzinfo=UTC)
+
+    assert scheduler.next_refresh(now, rates_until) == now + timedelta(hours=6)
+
+
+def test_backoff_while_awaiting_publication():
+    """Ensure polling backs off while due rates are missing, and resets when found."""
+    scheduler = RefreshScheduler()
+    now = datetime(2023, 7, 10, 15, 0, tzinfo=UTC)  # 16:00 BST
+    rates_until = datetime(2023, 7, 10, 22, 0, tzinfo=UTC)
+
+    delays = [scheduler.next_refresh(now, rates_until) - now for _ in range(6)]
+    assert delays == [
+        timedelta(minutes=5),
+        timedelta(minutes=10),
+        timedelta(minutes=20),
+        timedelta(minutes=40),
+        timedelta(hours=1),
+        timedelta(hours=1),
+    ]
+
+    # Tomorrow's rates (to 23:00 BST) have been published
+    rates_until = datetime(2023, 7, 11, 22, 0, tzinfo=UTC)
+    assert scheduler.next_refresh(now, rates_until) == now + timedelta(hours=6)
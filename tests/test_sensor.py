@@ -0,0 +1,75 @@
+"""Test the octopus_export sensors."""
+from homeassistant.helpers.json import json_bytes
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.octopus_export.const import CONF_SLIM_ATTRIBUTES
+
+ENTITY_ID = "sensor.agile_export_rate"
+
+
+def _recorded_attributes(state):
+    """Encode a state's attributes as the recorder would store them."""
+    unrecorded = state.state_info["unrecorded_attributes"] if state.state_info else ()
+    return json_bytes(
+        {key: value for key, value in state.attributes.items() if key not in unrecorded}
+    )
+
+
+async def test_rate_tables_are_not_recorded(hass, freezer, load_entry, day_of_rates):
+    """
+    Ensure rate tables stay out of the recorder, measuring bytes written in a day.
+
+    The recorder writes each distinct set of attributes once, so a day's cost is the
+    total size of the distinct sets seen at each slot boundary.
+    """
+    freezer.move_to("2023-01-03T00:00:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    entry = await load_entry(day_of_rates)
+
+    written_before: set[bytes] = set()
+    written_after: set[bytes] = set()
+    for _ in range(48):
+        state = hass.states.get(ENTITY_ID)
+        assert "rates_today" in state.attributes
+        written_before.add(json_bytes(dict(state.attributes)))
+        written_after.add(_recorded_attributes(state))
+        freezer.tick(1800)
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+
+    bytes_before = sum(map(len, written_before))
+    bytes_after = sum(map(len, written_after))
+    print(f"Attribute bytes recorded per day: {bytes_before} -> {bytes_after}")
+    assert bytes_after * 5 < bytes_before
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_slim_attributes(hass, freezer, load_entry, day_of_rates):
+    """Ensure rate tables can be left out of the state attributes entirely."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates, {CONF_SLIM_ATTRIBUTES: True})
+
+    state = hass.states.get(ENTITY_ID)
+    assert float(state.state) == 0.124
+    assert "rates_today" not in state.attributes
+    assert "rates_tomorrow" not in state.attributes
+    assert "current_slot" in state.attributes
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_best_window_sensors(hass, freezer, load_entry, day_of_rates):
+    """Ensure the best upcoming window is described by its sensors."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+
+    assert hass.states.get("sensor.best_export_window_start").state == (
+        "2023-01-03T22:00:00+00:00"
+    )
+    assert hass.states.get("sensor.best_export_window_end").state == (
+        "2023-01-04T00:00:00+00:00"
+    )
+    assert float(hass.states.get("sensor.best_export_window_rate").state) == 0.1455
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,104 @@
+"""Test the integration's services."""
+from homeassistant.exceptions import ServiceValidationError
+import pytest
+
+from custom_components.octopus_export.const import DOMAIN
+from custom_components.octopus_export.rate_series import SLOT_SECONDS
+from custom_components.octopus_export.services import (
+    SERVICE_FIND_WINDOW,
+    SERVICE_GET_RATES,
+)
+
+
+async def test_get_rates_returns_columns(hass, freezer, load_entry, day_of_rates):
+    """Ensure rates are returned as a start time and a column of values."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_RATES,
+        {
+            "config_entry": entry.entry_id,
+            "start": "2023-01-03T16:00:00+00:00",
+            "end": "2023-01-03T17:30:00+00:00",
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert response == {
+        "start": 1672761600,
+        "slot_seconds": SLOT_SECONDS,
+        "values": [0.132, 0.133, 0.134],
+    }
+
+    # Without a range, everything held is returned
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_RATES,
+        {"config_entry": entry.entry_id},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["start"] == day_of_rates.start_slot * SLOT_SECONDS
+    assert len(response["values"]) == 48
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_get_rates_requires_loaded_entry(hass, freezer, load_entry, day_of_rates):
+    """Ensure an unknown or unloaded entry is rejected."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+    for entry_id in (entry.entry_id, "unknown"):
+        with pytest.raises(ServiceValidationError):
+            await hass.services.async_call(
+                DOMAIN,
+                SERVICE_GET_RATES,
+                {"config_entry": entry_id},
+                blocking=True,
+                return_response=True,
+            )
+
+
+async def test_find_window(hass, freezer, load_entry, day_of_rates):
+    """Ensure the best slots within a range can be found."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_FIND_WINDOW,
+        {
+            "config_entry": entry.entry_id,
+            "slots": 2,
+            "end": "2023-01-03T16:00:00+00:00",
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert response["start"] == "2023-01-03T15:00:00+00:00"
+    assert response["end"] == "2023-01-03T16:00:00+00:00"
+    assert response["average"] == pytest.approx(0.1305)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_FIND_WINDOW,
+        {
+            "config_entry": entry.entry_id,
+            "slots": 2,
+            "contiguous": False,
+            "highest": False,
+            "start": "2023-01-03T00:00:00+00:00",
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert response["slots"] == [
+        "2023-01-03T00:00:00+00:00",
+        "2023-01-03T00:30:00+00:00",
+    ]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
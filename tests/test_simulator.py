@@ -0,0 +1,218 @@
+"""Test the real fetch and parse paths against the local API simulator."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from aiohttp import ClientSession
+from homeassistant.config_entries import ConfigEntryState
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export.const import CONF_REGION, DOMAIN
+from custom_components.octopus_export.octopus_api import (
+    AgileTariff,
+    ExportMeter,
+    OctopusApiClient,
+    ProductService,
+)
+from custom_components.octopus_export.rate_series import slot_of
+
+from .common import async_wait_for_start
+from .harness import async_run_load
+from .simulator import EXPORT_PRODUCT, OctopusApiSimulator, default_rate
+
+TARIFF = f"E-1R-{EXPORT_PRODUCT}-A"
+NEW_EXPORT_PRODUCT = "AGILE-OUTGOING-23-01-04"
+
+
+async def test_setup_requests(hass, freezer, simulator):
+    """Ensure setting up entries discovers the product once, and fetches rates."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    entries = []
+    for region in ("A", "B"):
+        entry = MockConfigEntry(domain=DOMAIN, data={CONF_REGION: region})
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        entries.append(entry)
+    for entry in entries:
+        await async_wait_for_start(hass, entry)
+
+    # Two and a half days of rates fill more than the default page of 100
+    assert simulator.requests == {
+        "products": 1,
+        "product": 1,
+        "standard-unit-rates": 4,
+    }
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.tariff.tariff == f"E-1R-{EXPORT_PRODUCT}-B"
+    assert coordinator.rates.end == datetime(2023, 1, 4, 23, tzinfo=timezone.utc)
+    assert coordinator.rates.get_slot(slot_of(datetime(2023, 1, 3, 12))) == (
+        default_rate(slot_of(datetime(2023, 1, 3, 12))) / 100
+    )
+
+    # Later refreshes ask only for slots beyond those held, revalidating the page
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    assert simulator.requests["standard-unit-rates"] == 6
+    assert simulator.log[-1].query["period_from"] == "2023-01-04T23:00:00Z"
+    assert coordinator.tariff._client.stats["standard-unit-rates"].not_modified == 1
+
+
+async def test_product_discovery_matches_agile_export(hass, simulator):
+    """Ensure only Agile Outgoing is matched, and an unchanged list costs no details."""
+    async with ClientSession() as session:
+        service = ProductService(OctopusApiClient(session))
+        product = await service.async_get_export_product()
+        assert product.code == EXPORT_PRODUCT
+        assert await service.async_get_export_product(product) is product
+        assert simulator.requests == {"products": 2, "product": 1}
+
+        # A newer version of the product is preferred
+        simulator.products.append(
+            {
+                "code": NEW_EXPORT_PRODUCT,
+                "direction": "EXPORT",
+                "display_name": "Agile Outgoing Octopus January 2023",
+                "brand": "OCTOPUS_ENERGY",
+                "is_business": False,
+                "available_from": "2023-01-04T00:00:00Z",
+            }
+        )
+        product = await service.async_get_export_product(product)
+        assert product.code == NEW_EXPORT_PRODUCT
+        assert product.tariff_codes["A"] == f"E-1R-{NEW_EXPORT_PRODUCT}-A"
+
+
+async def test_product_rollover(hass, freezer, simulator, wait_for_start):
+    """Ensure a new product is picked up by a refresh, without reloading the entry."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    await hass.config.async_update(time_zone="UTC")
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_REGION: "A"})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await wait_for_start(entry)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    simulator.products.append(
+        {
+            "code": NEW_EXPORT_PRODUCT,
+            "direction": "EXPORT",
+            "display_name": "Agile Outgoing Octopus January 2023",
+            "available_from": "2023-01-04T00:00:00Z",
+        }
+    )
+    simulator.product_rate_fns[NEW_EXPORT_PRODUCT] = lambda slot: 50.0
+
+    # The product isn't checked again until a day has passed
+    freezer.move_to("2023-01-04T00:10:00Z")
+    await coordinator.async_refresh()
+    assert coordinator.tariff.product == EXPORT_PRODUCT
+
+    freezer.move_to("2023-01-04T13:10:00Z")
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.tariff.tariff == f"E-1R-{NEW_EXPORT_PRODUCT}-A"
+    assert hass.data[DOMAIN][entry.entry_id] is coordinator
+    assert entry.state is ConfigEntryState.LOADED
+
+    # Rates from the current slot on come from the new tariff, and older ones stay
+    assert simulator.log[-1].query["period_from"] == "2023-01-04T13:00:00Z"
+    assert coordinator.rates.get(datetime(2023, 1, 4, 12, 30, tzinfo=timezone.utc)) == (
+        default_rate(slot_of(datetime(2023, 1, 4, 12, 30))) / 100
+    )
+    assert coordinator.rates.end == datetime(2023, 1, 5, 23, tzinfo=timezone.utc)
+    assert hass.states.get("sensor.agile_export_rate").state == "0.5"
+
+    # The new tariff is remembered across restarts
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    assert hass.data[DOMAIN][entry.entry_id].tariff.product == NEW_EXPORT_PRODUCT
+    await wait_for_start(entry)
+
+
+async def test_rates_follow_pages(hass, freezer, simulator):
+    """Ensure every page of rates is fetched for a period."""
+    freezer.move_to("2023-01-03T12:00:00Z")
+    simulator.max_page_size = 10
+    async with ClientSession() as session:
+        tariff = AgileTariff(OctopusApiClient(session), EXPORT_PRODUCT, TARIFF)
+        start = datetime(2023, 1, 2, tzinfo=timezone.utc)
+        rates = await tariff.fetch_data(start, start + timedelta(days=1))
+
+    assert len(rates) == 48
+    assert rates.start == start
+    assert simulator.requests["standard-unit-rates"] == 5
+
+
+async def test_retries_rate_limited_and_failed_requests(hass, simulator, no_backoff):
+    """Ensure 429 and server errors are retried, honouring Retry-After."""
+    simulator.fail_next(429, endpoint="products", retry_after="0")
+    simulator.fail_next(503, count=2, endpoint="product")
+    async with ClientSession() as session:
+        client = OctopusApiClient(session)
+        product = await ProductService(client).async_get_export_product()
+
+    assert product.code == EXPORT_PRODUCT
+    assert simulator.requests == {"products": 2, "product": 3}
+    assert client.stats["products"].attempts == 2
+    assert client.stats["product"].attempts == 3
+    assert client.stats["product"].failures == 0
+
+
+async def test_gives_up_after_repeated_failures(hass, simulator, no_backoff):
+    """Ensure a request fails once every attempt has."""
+    simulator.fail_next(500, count=10)
+    async with ClientSession() as session:
+        client = OctopusApiClient(session, max_attempts=3)
+        with pytest.raises(Exception):
+            await ProductService(client).async_get_export_product()
+
+    assert simulator.requests == {"products": 3}
+    assert client.stats["products"].failures == 1
+
+
+async def test_latency_is_measured(hass, simulator):
+    """Ensure injected latency shows in the client's statistics."""
+    simulator.latency = 0.05
+    async with ClientSession() as session:
+        client = OctopusApiClient(session)
+        await ProductService(client).async_get_export_product()
+
+    assert client.stats["products"].last_latency >= 0.05
+
+
+async def test_dst_change(hass, freezer, simulator):
+    """Ensure the day the clocks go forward has 46 slots, in rates and readings."""
+    freezer.move_to("2023-03-26T12:00:00Z")
+    await hass.config.async_update(time_zone="Europe/London")
+    start = datetime(2023, 3, 26, tzinfo=timezone.utc)
+    simulator.readings = {start + n * timedelta(minutes=30): 0.5 for n in range(46)}
+
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_REGION: "A"})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await async_wait_for_start(hass, entry)
+    rates_today = hass.data[DOMAIN][entry.entry_id].rates_today
+    assert len(rates_today) == 46
+    assert "01:00" not in rates_today and "02:00" in rates_today
+
+    async with ClientSession() as session:
+        meter = ExportMeter(OctopusApiClient(session), "1", "2", "sk_test")
+        readings = await meter.fetch_readings(start, start + timedelta(days=1))
+    assert len(readings) == 46
+    assert readings.start == start
+
+
+async def test_load(hass, socket_enabled):
+    """Run a small load test, reporting request counts, latency and CPU time."""
+    # Time isn't frozen, as that would stop the clocks used to measure the refreshes
+    async with OctopusApiSimulator() as simulator:
+        report = await async_run_load(hass, simulator, entries=14, rounds=3)
+
+    print(report.summary())
+    assert report.requests == {
+        "products": 1,
+        "product": 1,
+        "standard-unit-rates": 14 * (2 + 3),
+    }
+    assert len(report.refresh_latencies) == 14 * 3
+    assert 0 < report.percentile(50) <= report.percentile(99)
+    assert report.integration_cpu > 0
@@ -0,0 +1,104 @@
+"""Test the shared slot clock and the entities that follow it."""
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.octopus_export.const import CONF_REGION, DOMAIN
+from custom_components.octopus_export.coordinator import OctopusTariffUpdateCoordinator
+from custom_components.octopus_export.octopus_api import AgileTariff
+from custom_components.octopus_export.rate_series import RateSeries
+from custom_components.octopus_export.sensor import CurrentRateSensor
+from custom_components.octopus_export.slot_clock import async_get_slot_clock
+from custom_components.octopus_export.storage import TariffCache
+
+
+def _utc(value):
+    """Parse a UTC timestamp string."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+async def test_clock_announces_each_slot_once(hass, freezer):
+    """Ensure every subscriber hears of each boundary from one shared timer."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    clock = async_get_slot_clock(hass)
+    first: list[datetime] = []
+    second: list[datetime] = []
+    unsubscribe_first = clock.async_subscribe(first.append)
+    unsubscribe_second = clock.async_subscribe(second.append)
+
+    # A late timer still announces the boundary it was scheduled for
+    freezer.move_to("2023-01-03T12:30:02Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert first == [_utc("2023-01-03T12:30:00Z")]
+    assert second == first
+
+    # The next boundary is taken from the clock, so the delay doesn't accumulate
+    freezer.move_to("2023-01-03T13:00:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert first == [_utc("2023-01-03T12:30:00Z"), _utc("2023-01-03T13:00:00Z")]
+
+    unsubscribe_first()
+    freezer.move_to("2023-01-03T13:30:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert len(first) == 2
+    assert len(second) == 3
+
+    # The timer stops once nothing is subscribed
+    unsubscribe_second()
+    freezer.move_to("2023-01-03T14:00:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert len(second) == 3
+
+
+class _RateOnlySensor(CurrentRateSensor):
+    """A slot-tracking sensor without slot-specific attributes."""
+
+    @property
+    def extra_state_attributes(self):
+        """Return no attributes."""
+        return None
+
+
+async def test_entity_writes_state_only_when_changed(hass, freezer):
+    """Ensure a new slot only writes state when the entity's state changes."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    config_entry = MockConfigEntry(domain=DOMAIN, data={CONF_REGION: "A"})
+    tariff = AgileTariff(
+        None, "AGILE-OUTGOING-19-05-13", "E-1R-AGILE-OUTGOING-19-05-13-A"
+    )
+    cache = TariffCache(hass, config_entry.entry_id)
+    cache.async_save = AsyncMock()
+    coordinator = OctopusTariffUpdateCoordinator(hass, config_entry, cache, tariff)
+    coordinator.rates = RateSeries.from_items(
+        [
+            (_utc("2023-01-03T12:00:00Z"), 0.1),
+            (_utc("2023-01-03T12:30:00Z"), 0.1),
+            (_utc("2023-01-03T13:00:00Z"), 0.2),
+        ]
+    )
+
+    sensor = _RateOnlySensor(coordinator, config_entry)
+    sensor.hass = hass
+    sensor.entity_id = "sensor.agile_export_rate"
+    sensor.async_write_ha_state = Mock()
+    await sensor.async_added_to_hass()
+
+    freezer.move_to("2023-01-03T12:30:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    sensor.async_write_ha_state.assert_not_called()
+
+    freezer.move_to("2023-01-03T13:00:00Z")
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    sensor.async_write_ha_state.assert_called_once()
+
+    await sensor.async_remove()
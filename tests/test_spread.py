@@ -0,0 +1,129 @@
+"""Test comparing export rates with the paired import rates."""
+from array import array
+from datetime import datetime, timezone
+import math
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.octopus_export.const import (
+    CONF_IMPORT_RATES,
+    CONF_REGION,
+    DOMAIN,
+)
+from custom_components.octopus_export.rate_series import RateSeries, slot_of
+from custom_components.octopus_export.spread import RateSpread
+
+from .simulator import EXPORT_PRODUCT, IMPORT_PRODUCT
+
+NAN = math.nan
+
+
+def test_spread_aligns_both_series():
+    """Ensure the spread covers both series, without beating where either is missing."""
+    export = RateSeries(10, array("d", [0.1, 0.3, NAN, 0.25, 0.2]))
+    import_ = RateSeries(11, array("d", [0.2, 0.1, 0.2, 0.3, 0.1, 0.1]))
+    spread = RateSpread(export, import_)
+
+    assert spread.start_slot == 10
+    assert spread.end_slot == 17
+    assert spread.get_slot(10) is None
+    assert spread.get_slot(11) == 0.3 - 0.2
+    assert spread.get_slot(12) is None
+    assert spread.get_slot(14) == 0.2 - 0.3
+    assert spread.get_slot(17) is None
+    assert [spread.export_beats_import(slot) for slot in range(9, 18)] == [
+        False,
+        False,
+        True,
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+    assert spread.next_beating_slot(0) == 11
+    assert spread.next_beating_slot(12) == 13
+    assert spread.next_beating_slot(14) is None
+    assert spread.beating_slots(10, 17) == [11, 13]
+    assert spread.beating_slots(12, 13) == []
+
+
+def test_spread_without_import_rates():
+    """Ensure nothing beats import until there are import rates."""
+    spread = RateSpread(RateSeries(10, array("d", [0.1])), RateSeries())
+
+    assert spread.get_slot(10) is None
+    assert not spread.export_beats_import(10)
+    assert spread.next_beating_slot(0) is None
+
+
+async def test_paired_import_rates(hass, freezer, simulator, wait_for_start):
+    """Ensure import rates are found and fetched alongside export, and compared."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    simulator.product_rate_fns[IMPORT_PRODUCT] = lambda slot: 10.0
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_REGION: "A"}, options={CONF_IMPORT_RATES: True}
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await wait_for_start(entry)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    # Both products' details, then two pages of rates from each tariff
+    assert simulator.requests == {
+        "products": 1,
+        "product": 2,
+        "standard-unit-rates": 4,
+    }
+    assert coordinator.tariff.paired.tariff == f"E-1R-{IMPORT_PRODUCT}-A"
+    assert coordinator.import_rates.end == coordinator.rates.end
+
+    # Export pays 0.11 in the current slot, and beats import from 10:30 to midnight
+    assert hass.states.get("sensor.agile_import_rate").state == "0.1"
+    state = hass.states.get("sensor.agile_export_import_spread")
+    assert float(state.state) == 0.01
+    assert state.attributes["export_beats_import"] is True
+    assert state.attributes["next_export_beats_import"] == "2023-01-03T12:00:00+00:00"
+    assert hass.states.get("binary_sensor.agile_export_beats_import").state == "on"
+    assert coordinator.spread.beating_slots(
+        slot_of(datetime(2023, 1, 4, tzinfo=timezone.utc)),
+        slot_of(datetime(2023, 1, 5, tzinfo=timezone.utc)),
+    ) == list(
+        range(
+            slot_of(datetime(2023, 1, 4, 10, 30, tzinfo=timezone.utc)),
+            slot_of(datetime(2023, 1, 4, 23, tzinfo=timezone.utc)),
+        )
+    )
+
+    # Later refreshes ask each tariff only for slots beyond those held
+    await coordinator.async_refresh()
+    assert simulator.requests["standard-unit-rates"] == 6
+    assert {
+        request.path.split("/")[3]: request.query["period_from"]
+        for request in simulator.log[-2:]
+    } == {
+        EXPORT_PRODUCT: "2023-01-04T23:00:00Z",
+        IMPORT_PRODUCT: "2023-01-04T23:00:00Z",
+    }
+
+    # Both tariffs and their rates are restored on restart, without the API
+    freezer.tick(60)
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.tariff.paired.product == IMPORT_PRODUCT
+    assert hass.states.get("sensor.agile_import_rate").state == "0.1"
+    await wait_for_start(entry)
+    assert simulator.requests["product"] == 2
+
+
+async def test_no_import_rates_by_default(hass, freezer, load_entry, day_of_rates):
+    """Ensure import rates are only fetched when asked for."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    entry = await load_entry(day_of_rates)
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    assert coordinator.tariff.paired is None
+    assert not coordinator.import_rates
+    assert hass.states.get("sensor.agile_import_rate") is None
+    assert hass.states.get("binary_sensor.agile_export_beats_import") is None
@@ -0,0 +1,49 @@
+"""Test precomputed transitions and the timer applying them."""
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.octopus_export.rate_series import slot_of, slot_start
+from custom_components.octopus_export.transitions import (
+    TransitionTimer,
+    find_transitions,
+)
+
+
+def test_find_transitions():
+    """Ensure only changes of state are listed, ending with off."""
+    on_slots = {11, 12, 15}
+
+    assert find_transitions(10, 17, on_slots.__contains__) == [
+        (10, False),
+        (11, True),
+        (13, False),
+        (15, True),
+        (16, False),
+    ]
+    assert find_transitions(11, 13, on_slots.__contains__) == [(11, True), (13, False)]
+    assert find_transitions(20, 10, on_slots.__contains__) == [(20, False)]
+
+
+async def test_timer_applies_due_transitions(hass, freezer):
+    """Ensure subscribers are only called when their own transitions fall due."""
+    freezer.move_to("2023-01-03T12:10:00Z")
+    now_slot = slot_of(dt_util.utcnow())
+    timer = TransitionTimer(hass)
+    first: list[bool] = []
+    second: list[bool] = []
+
+    timer.async_set(first.append, [(now_slot, True), (now_slot + 2, False)])
+    timer.async_set(second.append, [(now_slot + 1, True), (now_slot + 3, False)])
+    assert first == [True]
+    assert second == []
+
+    for offset in range(1, 4):
+        freezer.move_to(slot_start(now_slot + offset))
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+
+    assert first == [True, False]
+    assert second == [True, False]
+
+    timer.async_remove(first.append)
+    timer.async_remove(second.append)
@@ -0,0 +1,80 @@
+"""Test searches for the best slots."""
+import random
+
+from custom_components.octopus_export.rate_series import RateSeries
+from custom_components.octopus_export.windows import (
+    WindowEngine,
+    find_best_slots,
+    find_contiguous_window,
+)
+
+
+def _brute_force_window(by_slot, length, start_slot, end_slot, highest):
+    """Find the best run of slots by summing every candidate."""
+    best = None
+    for first in range(start_slot, end_slot - length + 1):
+        run = range(first, first + length)
+        if all(slot in by_slot for slot in run):
+            total = sum(by_slot[slot] for slot in run)
+            if best is None or (total > best[1] if highest else total < best[1]):
+                best = (first, total)
+    return best
+
+
+def test_contiguous_window_matches_brute_force():
+    """Ensure the prefix-sum search agrees with summing every run."""
+    rng = random.Random(1)
+    by_slot = {slot: round(rng.uniform(-0.05, 0.4), 4) for slot in range(1000, 1200)}
+    for gap in rng.sample(sorted(by_slot), 20):
+        del by_slot[gap]
+    rates = RateSeries.from_slots(by_slot)
+
+    for length in (1, 3, 8):
+        for highest in (True, False):
+            window = find_contiguous_window(rates, length, 1010, 1190, highest)
+            first, total = _brute_force_window(by_slot, length, 1010, 1190, highest)
+            assert window is not None
+            assert window.slots == tuple(range(first, first + length))
+            assert abs(window.average - total / length) < 1e-9
+
+
+def test_contiguous_window_skips_gaps():
+    """Ensure runs including a gap, or running out of range, aren't chosen."""
+    rates = RateSeries.from_slots({100: 0.1, 101: 0.9, 103: 0.9, 104: 0.2})
+
+    window = find_contiguous_window(rates, 2, 100, 105)
+    assert window is not None
+    assert window.slots == (103, 104)
+    assert find_contiguous_window(rates, 3, 100, 105) is None
+    assert find_contiguous_window(rates, 2, 104, 200) is None
+
+
+def test_best_slots():
+    """Ensure the best slots are chosen from anywhere in range, in slot order."""
+    rates = RateSeries.from_slots({100: 0.3, 101: 0.1, 102: 0.5, 104: 0.4, 105: 0.2})
+
+    best = find_best_slots(rates, 2, 100, 106)
+    assert best is not None
+    assert best.slots == (102, 104)
+    assert abs(best.average - 0.45) < 1e-9
+
+    cheapest = find_best_slots(rates, 2, 100, 106, highest=False)
+    assert cheapest is not None
+    assert cheapest.slots == (101, 105)
+
+    assert find_best_slots(rates, 6, 100, 106) is None
+
+
+def test_engine_reuses_results_until_passed():
+    """Ensure later searches reuse a result until its first slot has passed."""
+    rates = RateSeries.from_slots({100: 0.1, 101: 0.2, 102: 0.5, 103: 0.4, 104: 0.3})
+    engine = WindowEngine(rates)
+
+    first = engine.find(2, 100)
+    assert first is not None
+    assert first.slots == (102, 103)
+    assert engine.find(2, 102) is first
+
+    later = engine.find(2, 103)
+    assert later is not None
+    assert later.slots == (103, 104)